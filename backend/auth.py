@@ -1,8 +1,12 @@
-from fastapi import HTTPException, Depends, Request
+from fastapi import HTTPException, Depends, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models import ApiKeyDB, ApiKeyUsageDB
+from auth_cache import CachedApiKey, api_key_cache, credential_digest, last_used_writer
+from rate_limit import RateLimitDecision, rate_limiter
+from dataclasses import replace
 from datetime import datetime, timedelta
 import hashlib
 import secrets
@@ -20,11 +24,12 @@ class ApiKeyAuth:
         return self
 
 # Create a dependency for API key authentication
-def verify_api_key(
+async def verify_api_key(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     request: Request = None,
-    db: Session = Depends(get_db)
-) -> ApiKeyDB:
+    response: Response = None,
+    db: AsyncSession = Depends(get_async_db)
+) -> CachedApiKey:
     """
     Verify API key and secret from Authorization header
     Format: Bearer <api_key>:<api_secret>
@@ -38,60 +43,70 @@ def verify_api_key(
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid API credentials format")
     
-    # Find API key in database
-    api_key_record = db.query(ApiKeyDB).filter(
-        ApiKeyDB.api_key == api_key,
-        ApiKeyDB.is_active == True
-    ).first()
+    # Serve previously verified credentials from the in-process cache
+    digest = credential_digest(api_key, api_secret)
+    api_key_record = api_key_cache.get(digest)
     
-    if not api_key_record:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-    
-    # Verify API secret
-    if api_key_record.api_secret != api_secret:
-        raise HTTPException(status_code=401, detail="Invalid API secret")
+    if api_key_record is None:
+        # Find API key in database
+        result = await db.execute(
+            select(ApiKeyDB).where(
+                ApiKeyDB.api_key == api_key,
+                ApiKeyDB.is_active == True
+            )
+        )
+        db_record = result.scalars().first()
+        
+        if not db_record:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        
+        # Verify API secret
+        if db_record.api_secret != api_secret:
+            raise HTTPException(status_code=401, detail="Invalid API secret")
+        
+        api_key_record = CachedApiKey.from_record(db_record)
+        api_key_cache.put(digest, api_key_record)
     
     # Check rate limiting
-    if not check_rate_limit(api_key_record, db):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    decision = await check_rate_limit(api_key_record)
+    if not decision.allowed:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=decision.headers())
+    if response is not None:
+        response.headers.update(decision.headers())
     
-    # Log API usage
-    log_api_usage(api_key_record, request, db)
+    # Log API usage (written after the response by UsageLoggingMiddleware)
+    log_api_usage(api_key_record, request)
     
-    # Update last used timestamp
-    api_key_record.last_used = datetime.utcnow()
-    db.commit()
+    # Update last used timestamp (written to the database on a coalesced timer) on a per-request
+    # copy: the cached record is shared by concurrent requests
+    api_key_record = replace(api_key_record, last_used=datetime.utcnow())
+    last_used_writer.touch(api_key_record.id, api_key_record.last_used)
     
     return api_key_record
 
-def check_rate_limit(api_key_record: ApiKeyDB, db: Session) -> bool:
-    """Check if API key is within rate limits"""
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-    
-    usage_count = db.query(ApiKeyUsageDB).filter(
-        ApiKeyUsageDB.api_key_id == api_key_record.id,
-        ApiKeyUsageDB.created_at >= one_hour_ago
-    ).count()
-    
-    return usage_count < api_key_record.rate_limit
+async def check_rate_limit(api_key_record: CachedApiKey) -> RateLimitDecision:
+    """Check if API key is within rate limits (requests per hour from ApiKeyDB.rate_limit)"""
+    limit = api_key_record.rate_limit if api_key_record.rate_limit is not None else 1000
+    return await rate_limiter.hit_async(f"api_key:{api_key_record.id}", limit)
 
-def log_api_usage(api_key_record: ApiKeyDB, request: Request, db: Session):
-    """Log API usage for monitoring and rate limiting"""
-    if request:
-        usage = ApiKeyUsageDB(
-            api_key_id=api_key_record.id,
-            endpoint=request.url.path,
-            method=request.method,
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent"),
-            created_at=datetime.utcnow()
-        )
-        db.add(usage)
-        db.commit()
+def log_api_usage(api_key_record: CachedApiKey, request: Request) -> Optional[dict]:
+    """Stage an API usage row for monitoring; the usage recorder inserts it in batches"""
+    if not request:
+        return None
+    usage = {
+        "api_key_id": api_key_record.id,
+        "endpoint": request.url.path,
+        "method": request.method,
+        "ip_address": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent"),
+        "created_at": datetime.utcnow()
+    }
+    request.state.api_usage = usage
+    return usage
 
 def require_permissions(permissions: list):
     """Decorator to require specific permissions"""
-    def permission_checker(api_key_record: ApiKeyDB = Depends(verify_api_key)):
+    async def permission_checker(api_key_record: CachedApiKey = Depends(verify_api_key)):
         if api_key_record.permissions:
             user_permissions = api_key_record.permissions
             if not all(perm in user_permissions for perm in permissions):
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, update
+from config import API_KEY_CACHE_TTL_SECONDS, API_KEY_CACHE_MAX_ENTRIES, API_KEY_LAST_USED_FLUSH_SECONDS
+from db import SessionLocal
+from models import ApiKeyDB
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedApiKey:
+    """Detached snapshot of a verified ApiKeyDB row, safe to share across requests"""
+    id: int
+    app_name: str
+    api_key: str
+    is_active: bool
+    permissions: Optional[List[str]]
+    rate_limit: int
+    user_id: Optional[int]
+    created_at: Optional[datetime]
+    last_used: Optional[datetime]
+
+    @classmethod
+    def from_record(cls, record: ApiKeyDB) -> "CachedApiKey":
+        return cls(
+            id=record.id,
+            app_name=record.app_name,
+            api_key=record.api_key,
+            is_active=record.is_active,
+            permissions=list(record.permissions) if record.permissions is not None else None,
+            rate_limit=record.rate_limit,
+            user_id=record.user_id,
+            created_at=record.created_at,
+            last_used=record.last_used,
+        )
+
+
+def credential_digest(api_key: str, api_secret: str) -> str:
+    """Cache key for a key/secret pair, so raw secrets are never held in the cache"""
+    return hashlib.sha256(f"{api_key}:{api_secret}".encode("utf-8")).hexdigest()
+
+
+class ApiKeyCache:
+    """Bounded TTL + LRU cache of verified API key records"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # digest -> (expires_at, CachedApiKey)
+        self._digests_by_id: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, digest: str) -> Optional[CachedApiKey]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, record = entry
+            if expires_at <= now:
+                self._remove(digest)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return record
+
+    def put(self, digest: str, record: CachedApiKey) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + self.ttl_seconds, record)
+            self._entries.move_to_end(digest)
+            self._digests_by_id.setdefault(record.id, set()).add(digest)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, api_key_id: int) -> None:
+        """Drop every cached entry for an API key (after toggle/delete)"""
+        with self._lock:
+            for digest in self._digests_by_id.pop(api_key_id, set()):
+                self._entries.pop(digest, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._digests_by_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, digest: str) -> None:
+        _, record = self._entries.pop(digest)
+        digests = self._digests_by_id.get(record.id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._digests_by_id[record.id]
+
+
+class LastUsedWriter:
+    """Coalesces last_used updates and writes them in one statement per interval"""
+
+    def __init__(self, session_factory, interval_seconds: float):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._pending: Dict[int, datetime] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.rows_written = 0
+
+    def touch(self, api_key_id: int, when: datetime) -> None:
+        with self._lock:
+            self._pending[api_key_id] = when
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        db = self.session_factory()
+        try:
+            # One executemany for all touched keys; rows deleted meanwhile are simply skipped
+            api_keys = ApiKeyDB.__table__
+            db.execute(
+                update(api_keys)
+                .where(api_keys.c.id == bindparam("key_id"))
+                .values(last_used=bindparam("when")),
+                [{"key_id": api_key_id, "when": when} for api_key_id, when in pending.items()],
+            )
+            db.commit()
+            self.flushes += 1
+            self.rows_written += len(pending)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to flush last_used for %d API keys", len(pending))
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushes": self.flushes, "rows_written": self.rows_written}
+
+
+api_key_cache = ApiKeyCache(API_KEY_CACHE_TTL_SECONDS, API_KEY_CACHE_MAX_ENTRIES)
+last_used_writer = LastUsedWriter(SessionLocal, API_KEY_LAST_USED_FLUSH_SECONDS)
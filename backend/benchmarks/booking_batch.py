@@ -0,0 +1,83 @@
+"""
+Group booking throughput: N calls to POST /bookings vs one POST /bookings/batch.
+
+Runs the app in-process with TestClient against a temp SQLite database
+(or --database-url), so the numbers include request parsing, policy evaluation,
+the inserts, rollup upserts and commits, but not network round trips.
+
+    cd backend
+    python -m benchmarks.booking_batch --travelers 50 200 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--travelers", type=int, nargs="+", default=[50, 200, 500], help="bookings per group")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.setdefault("APP_ENV", "development")
+
+    from datetime import datetime
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    import migrations
+    from db import SessionLocal, engine
+    from main import app
+    from models import UserDB
+
+    largest = max(args.travelers)
+    now = datetime.utcnow()
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        db.execute(insert(UserDB), [
+            {"org_id": 1, "email": f"traveler{i}@acme.com", "status": "active", "created_at": now, "updated_at": now}
+            for i in range(largest)
+        ])
+        db.commit()
+
+    def booking(i):
+        return {"traveler_email": f"traveler{i}@acme.com",
+                "items": [{"id": f"flights-{i}", "mode": "flights", "price": 350 + i % 100, "currency": "USD"},
+                          {"id": f"hotels-{i}", "mode": "hotels", "price": 180, "currency": "USD"}]}
+
+    results = {}
+    with TestClient(app) as client:
+        client.post("/bookings", json=booking(0))  # warm up imports, pools and the policy cache
+        for n in args.travelers:
+            bookings = [booking(i) for i in range(n)]
+
+            start = time.perf_counter()
+            for body in bookings:
+                assert client.post("/bookings", json=body).status_code == 200
+            single_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            response = client.post("/bookings/batch", json={"bookings": bookings})
+            batch_ms = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200 and response.json()["created"] == n
+
+            results[n] = {"single_ms": round(single_ms, 1), "batch_ms": round(batch_ms, 1),
+                          "speedup": round(single_ms / batch_ms, 1)}
+
+    if args.json:
+        print(json.dumps({"benchmark": "booking_batch", "config": vars(args), "results": results}))
+        return
+
+    print(f"{'travelers':>10} {'N x POST ms':>12} {'batch ms':>10} {'speedup':>8}")
+    for n, r in results.items():
+        print(f"{n:>10} {r['single_ms']:>12} {r['batch_ms']:>10} {r['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Per-mode spend and out-of-policy counts: deserializing bookings.items in Python
+vs one indexed GROUP BY over booking_items.
+
+Seeds BOOKINGS (with ITEMS items each) into a temp SQLite database (or --database-url).
+
+    cd backend
+    python -m benchmarks.booking_items --bookings 200000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--bookings", type=int, default=200000)
+    parser.add_argument("--items", type=int, default=3, help="items per booking")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def best_ms(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1), result
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    from datetime import datetime
+    from sqlalchemy import case, func, insert, select
+    from booking_items import item_rows
+    from db import Base, SessionLocal, engine
+    from models import BookingDB, BookingItemDB, UserDB
+
+    modes = ("flights", "hotels", "cars")
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.scalar(select(BookingDB.id).limit(1)) is None:
+            now = datetime.utcnow()
+            db.execute(insert(UserDB), [{"org_id": 1, "email": "bench@acme.com", "created_at": now, "updated_at": now}])
+            for offset in range(0, args.bookings, 10000):
+                bookings = []
+                for i in range(offset, min(offset + 10000, args.bookings)):
+                    items = [{"id": f"{i}-{n}", "mode": modes[(i + n) % 3], "price": 100 + (i * 7 + n) % 400,
+                              "currency": "USD", "policyStatus": "out" if (i + n) % 5 == 0 else "in"}
+                             for n in range(args.items)]
+                    bookings.append({"id": f"B{i:09d}", "user_id": 1, "items": items, "total_amount": 0,
+                                     "currency": "USD", "status": "confirmed", "created_at": now, "updated_at": now})
+                db.execute(insert(BookingDB), bookings)
+                db.execute(insert(BookingItemDB), [row for b in bookings for row in item_rows(b["id"], b["items"])])
+            db.commit()
+
+    def from_json():
+        totals = {}
+        with SessionLocal() as db:
+            for (items,) in db.execute(select(BookingDB.items).execution_options(yield_per=2000)):
+                for item in items:
+                    total = totals.setdefault(item["mode"], [0.0, 0])
+                    total[0] += item["price"]
+                    total[1] += item.get("policyStatus") == "out"
+        return {mode: (round(amount, 2), out) for mode, (amount, out) in totals.items()}
+
+    def from_sql():
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(BookingItemDB.mode, func.sum(BookingItemDB.price_amount),
+                       func.sum(case((BookingItemDB.is_in_policy.is_(False), 1), else_=0)))
+                .group_by(BookingItemDB.mode)
+            ).all()
+        return {mode: (round(float(amount), 2), int(out)) for mode, amount, out in rows}
+
+    def out_of_policy_flights():
+        with SessionLocal() as db:
+            return db.scalar(select(func.count()).select_from(BookingItemDB)
+                             .where(BookingItemDB.mode == "flights", BookingItemDB.is_in_policy.is_(False)))
+
+    json_ms, json_result = best_ms(from_json, args.repeat)
+    sql_ms, sql_result = best_ms(from_sql, args.repeat)
+    assert json_result == sql_result, (json_result, sql_result)
+    oop_ms, _ = best_ms(out_of_policy_flights, args.repeat)
+    results = {"json_per_mode_ms": json_ms, "sql_per_mode_ms": sql_ms, "sql_oop_flights_count_ms": oop_ms}
+
+    if args.json:
+        print(json.dumps({"benchmark": "booking_items", "config": vars(args), "results": results}))
+        return
+
+    print(f"bookings={args.bookings} items/booking={args.items}")
+    for name, ms in results.items():
+        print(f"{name:<28} {ms:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Compare the blocking SessionLocal path (sync `def` handler on the threadpool) with the
+AsyncSession path (`async def` handler) under high concurrency.
+
+    sync / async          two minimal handlers running the same select(); on SQLite a
+                          `sleep_ms()` SQL function models a network round trip to RDS
+                          inside the driver call (--db-latency-ms); against MySQL use
+                          --db-latency-ms 0 and the real network latency
+    app-sync / app-async  the real app (main:app, every middleware): GET /travelers, and
+                          the same handler as it was before the async port (`def`,
+                          SessionLocal) mounted next to it; no simulated latency
+
+The routers only have the async mode now, so app-sync is the baseline the port replaced.
+
+    cd backend
+    python -m benchmarks.db_modes --concurrency 200 --requests 4000 --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# mode -> (uvicorn factory, path)
+MODES = {
+    "sync": ("benchmarks.db_modes:create_app", "/sync/users"),
+    "async": ("benchmarks.db_modes:create_app", "/async/users"),
+    "app-sync": ("benchmarks.db_modes:create_full_app", "/bench/sync/travelers"),
+    "app-async": ("benchmarks.db_modes:create_full_app", "/travelers"),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--rows", type=int, default=1000, help="users to seed")
+    parser.add_argument("--page-size", type=int, default=20, help="rows returned per request")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000, help="requests per mode")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="simulated DB round trip (SQLite only)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def drive(url, total, concurrency):
+    import httpx
+
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency), timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+    }
+
+
+def seed_users(rows):
+    from datetime import datetime
+    from sqlalchemy import insert, select
+    import migrations
+    from db import SessionLocal, engine
+    from models import UserDB
+
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        if db.scalar(select(UserDB.id).limit(1)) is None:
+            now = datetime.utcnow()
+            db.execute(insert(UserDB), [
+                {"org_id": 1, "email": f"user{i}@acme.com", "status": "active", "created_at": now, "updated_at": now}
+                for i in range(rows)
+            ])
+            db.commit()
+
+
+def create_app():
+    """uvicorn factory for the server subprocess; configured through BENCH_* env vars"""
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import event, select, text
+    from db import engine, async_engine, get_async_db, get_db
+    from models import UserDB
+
+    rows = int(os.environ["BENCH_ROWS"])
+    page_size = int(os.environ["BENCH_PAGE_SIZE"])
+    latency_ms = float(os.environ["BENCH_DB_LATENCY_MS"])
+
+    is_sqlite = engine.dialect.name == "sqlite"
+    if is_sqlite:
+        def register_sleep(dbapi_connection, _record):
+            dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+        event.listen(engine, "connect", register_sleep)
+        event.listen(async_engine.sync_engine, "connect", register_sleep)
+
+    seed_users(rows)
+
+    query = select(UserDB.id, UserDB.email).order_by(UserDB.id).limit(page_size)
+    round_trip = text("SELECT sleep_ms(:ms)") if is_sqlite and latency_ms > 0 else None
+
+    app = FastAPI()
+
+    @app.get("/sync/users")
+    def sync_users(db=Depends(get_db)):
+        if round_trip is not None:
+            db.execute(round_trip, {"ms": latency_ms})
+        return [{"id": row.id, "email": row.email} for row in db.execute(query)]
+
+    @app.get("/async/users")
+    async def async_users(db=Depends(get_async_db)):
+        if round_trip is not None:
+            await db.execute(round_trip, {"ms": latency_ms})
+        return [{"id": row.id, "email": row.email} for row in await db.execute(query)]
+
+    return app
+
+
+def create_full_app():
+    """main:app plus the pre-port sync version of GET /travelers, for the app-* modes"""
+    from fastapi import Depends, Response
+    from db import get_db
+    from pagination import PageParams, page_params, page_response
+    from routers.travelers import traveler_pager
+    from main import app
+
+    seed_users(int(os.environ["BENCH_ROWS"]))
+
+    @app.get("/bench/sync/travelers")
+    def sync_travelers(response: Response, page: PageParams = Depends(page_params), db=Depends(get_db)):
+        items, next_cursor = traveler_pager.page(db.execute(traveler_pager.statement(page)).all(), page)
+        return page_response(items, next_cursor, page, response)
+
+    return app
+
+
+def wait_until_ready(url, timeout=30):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"benchmark server did not start: {url}")
+
+
+def main():
+    args = parse_args()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env["BENCH_ROWS"] = str(args.rows)
+    env["BENCH_PAGE_SIZE"] = str(args.page_size)
+    env["BENCH_DB_LATENCY_MS"] = str(args.db_latency_ms)
+    env["HTTP_LOG_ENABLED"] = "false"
+    env.setdefault("APP_ENV", "development")
+    # The sync modes serve requests from the sync engine, so give it the same pool as the async one
+    env.setdefault("DB_SYNC_POOL_SIZE", env.get("DB_POOL_SIZE", "10"))
+    env.setdefault("DB_SYNC_MAX_OVERFLOW", env.get("DB_MAX_OVERFLOW", "10"))
+
+    results = {}
+    for factory in dict.fromkeys(MODES[mode][0] for mode in args.modes):
+        # Server runs in its own process so the load generator does not share its GIL
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", factory, "--factory",
+             "--port", str(args.port), "--log-level", "warning", "--no-access-log"],
+            cwd=backend_dir, env=env,
+        )
+        try:
+            modes = [mode for mode in args.modes if MODES[mode][0] == factory]
+            wait_until_ready(f"http://127.0.0.1:{args.port}{MODES[modes[0]][1]}")
+            for mode in modes:
+                url = f"http://127.0.0.1:{args.port}{MODES[mode][1]}?limit={args.page_size}"
+                asyncio.run(drive(url, min(args.requests, 200), args.concurrency))  # warm pools
+                results[mode] = asyncio.run(drive(url, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(10)
+
+    if args.json:
+        print(json.dumps({"benchmark": "db_modes", "config": vars(args), "results": results}))
+        return
+
+    print(f"concurrency={args.concurrency} requests={args.requests} db_latency_ms={args.db_latency_ms}")
+    print(f"{'mode':<10} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
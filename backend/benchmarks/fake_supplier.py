@@ -0,0 +1,59 @@
+"""
+Fake search supplier for load-testing the search fan-out locally.
+
+Serves GET /search/{flights,hotels,cars} with the same synthetic inventory as the
+in-process suppliers, after a configurable delay. Run one or more instances and
+point the backend at them:
+
+    cd backend
+    FAKE_SUPPLIER_NAME=fake-air FAKE_SUPPLIER_LATENCY_MS=120 FAKE_SUPPLIER_JITTER_MS=80 \
+        uvicorn benchmarks.fake_supplier:app --port 9101
+    SEARCH_SUPPLIERS_JSON='[{"name": "fake-air", "modes": ["flights"], "url": "http://127.0.0.1:9101", "timeout_ms": 400}]' \
+        uvicorn main:app
+
+Per-request overrides: ?latency_ms=..., ?error_rate=...
+"""
+import asyncio
+import os
+import random
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+
+from models import SearchParams
+from search_engine import mk_offers
+
+NAME = os.getenv("FAKE_SUPPLIER_NAME", "fake-supplier")
+LATENCY_MS = float(os.getenv("FAKE_SUPPLIER_LATENCY_MS", "100"))
+JITTER_MS = float(os.getenv("FAKE_SUPPLIER_JITTER_MS", "0"))
+# Fraction of requests that take this long instead, to exercise per-supplier timeouts
+SLOW_RATE = float(os.getenv("FAKE_SUPPLIER_SLOW_RATE", "0"))
+SLOW_MS = float(os.getenv("FAKE_SUPPLIER_SLOW_MS", "2000"))
+ERROR_RATE = float(os.getenv("FAKE_SUPPLIER_ERROR_RATE", "0"))
+OFFERS = int(os.getenv("FAKE_SUPPLIER_OFFERS", "10"))
+
+app = FastAPI(title=f"Fake supplier {NAME}")
+
+
+@app.get("/search/{mode}")
+async def search(mode: str, origin: Optional[str] = None, destination: Optional[str] = None,
+                 departDate: Optional[str] = None, returnDate: Optional[str] = None, city: Optional[str] = None,
+                 latency_ms: Optional[float] = None, error_rate: Optional[float] = None):
+    if mode not in ("flights", "hotels", "cars"):
+        raise HTTPException(status_code=404, detail="Unknown mode")
+
+    delay = latency_ms if latency_ms is not None else LATENCY_MS + random.uniform(0, JITTER_MS)
+    if latency_ms is None and random.random() < SLOW_RATE:
+        delay = SLOW_MS
+    await asyncio.sleep(delay / 1000)
+
+    if random.random() < (error_rate if error_rate is not None else ERROR_RATE):
+        raise HTTPException(status_code=503, detail="Supplier unavailable")
+
+    params = SearchParams(mode=mode, origin=origin, destination=destination,
+                          departDate=departDate, returnDate=returnDate, city=city)
+    # Offer ids are namespaced by the backend's HttpSupplier, so return the bare ids here
+    return [
+        {**offer.model_dump(), "id": offer.id.split(":", 1)[1]}
+        for offer in mk_offers(params, NAME, OFFERS)
+    ]
@@ -0,0 +1,143 @@
+"""
+Search latency while a login burst hashes passwords: bcrypt on the shared threadpool
+(PASSWORD_HASH_WORKERS=0, the old behaviour) vs the bounded password hashing process pool.
+
+Starts the real app with uvicorn for each mode, measures /search/flights alone, then again
+while --login-concurrency clients post /auth/login in a loop. Logins rejected with 503
+(pool saturated) are counted, not retried.
+
+    cd backend
+    python -m benchmarks.login_burst --workers 1 --login-concurrency 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.db_modes import percentile, wait_until_ready
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="PASSWORD_HASH_WORKERS for the process pool run")
+    parser.add_argument("--max-pending", type=int, default=8, help="PASSWORD_HASH_MAX_PENDING for the process pool run")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--login-concurrency", type=int, default=40)
+    parser.add_argument("--search-concurrency", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each measurement")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+async def measure(base, seconds, search_concurrency, login_concurrency):
+    import httpx
+
+    search_ms = []
+    logins = {"ok": 0, "rejected": 0, "other": 0}
+    deadline = time.monotonic() + seconds
+
+    async with httpx.AsyncClient(base_url=base, timeout=60,
+                                 limits=httpx.Limits(max_connections=search_concurrency + login_concurrency)) as client:
+        async def searcher(n):
+            i = 0
+            while time.monotonic() < deadline:
+                i += 1
+                start = time.perf_counter()
+                # Vary the query so every request runs the supplier fan-out
+                response = await client.get("/search/flights", params={"origin": "ORD", "destination": f"J{n}{i}"})
+                if response.status_code == 200:
+                    search_ms.append((time.perf_counter() - start) * 1000)
+
+        async def login():
+            while time.monotonic() < deadline:
+                response = await client.post("/auth/login", json={"email": "burst@acme.com", "password": "correct horse"})
+                if response.status_code == 200:
+                    logins["ok"] += 1
+                elif response.status_code == 503:
+                    logins["rejected"] += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                else:
+                    logins["other"] += 1
+
+        await asyncio.gather(*(searcher(n) for n in range(search_concurrency)),
+                             *(login() for _ in range(login_concurrency)))
+
+    return {
+        "searches": len(search_ms),
+        "search_p50_ms": round(percentile(search_ms, 50), 1),
+        "search_p95_ms": round(percentile(search_ms, 95), 1),
+        "search_p99_ms": round(percentile(search_ms, 99), 1),
+        "logins_ok": logins["ok"],
+        "logins_503": logins["rejected"],
+        "logins_other": logins["other"],
+    }
+
+
+def seed(database_url, rounds):
+    os.environ["DATABASE_URL"] = database_url
+    from datetime import datetime
+    import bcrypt
+    from db import Base, SessionLocal, engine
+    from models import UserDB
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        password_hash = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds)).decode("utf-8")
+        db.add(UserDB(org_id=1, email="burst@acme.com", status="active", password_hash=password_hash,
+                      created_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+        db.commit()
+
+
+def run_mode(args, backend_dir, database_url, workers, max_pending):
+    env = dict(os.environ, DATABASE_URL=database_url, PASSWORD_HASH_WORKERS=str(workers),
+               PASSWORD_HASH_MAX_PENDING=str(max_pending), BCRYPT_ROUNDS=str(args.rounds),
+               SEARCH_CACHE_ENABLED="false", APP_ENV=os.environ.get("APP_ENV", "development"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=backend_dir, env=env,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(f"{base}/healthz")
+        asyncio.run(measure(base, 1.0, args.search_concurrency, 1))  # warm up
+        idle = asyncio.run(measure(base, args.seconds, args.search_concurrency, 0))
+        burst = asyncio.run(measure(base, args.seconds, args.search_concurrency, args.login_concurrency))
+    finally:
+        server.terminate()
+        server.wait(10)
+    return {"idle": idle, "burst": burst}
+
+
+def main():
+    args = parse_args()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(database_url, args.rounds)
+
+    # The old behaviour had no bound on queued hashes
+    results = {
+        "threadpool": run_mode(args, backend_dir, database_url, 0, 1_000_000),
+        "process_pool": run_mode(args, backend_dir, database_url, args.workers, args.max_pending),
+    }
+
+    if args.json:
+        print(json.dumps({"benchmark": "login_burst", "config": vars(args), "results": results}))
+        return
+
+    print(f"bcrypt rounds={args.rounds} login clients={args.login_concurrency} search clients={args.search_concurrency} "
+          f"pool workers={args.workers} max pending={args.max_pending}")
+    print(f"{'mode':<13} {'phase':<6} {'searches':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'logins':>7} {'503s':>6}")
+    for mode, phases in results.items():
+        for phase, r in phases.items():
+            print(f"{mode:<13} {phase:<6} {r['searches']:>9} {r['search_p50_ms']:>8} {r['search_p95_ms']:>8} "
+                  f"{r['search_p99_ms']:>8} {r['logins_ok']:>7} {r['logins_503']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-request cost of MetricsMiddleware: a bare ASGI endpoint called directly
+(no server, no sockets) with and without the middleware, with and without the
+http_request log line. The log is written behind the request, so the table also
+reports what the writer thread spends formatting and writing each line (to /dev/null).
+
+    cd backend
+    python -m benchmarks.metrics_overhead --requests 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+class _Route:
+    path = "/policies/{policy_id}"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, requests):
+    scope = {"type": "http", "method": "GET", "path": "/policies/7", "headers": [(b"x-request-id", b"abc")],
+             "client": ("127.0.0.1", 5000)}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        return None
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    args = parse_args()
+    from observability import HttpMetrics, MetricsMiddleware, RequestLogWriter
+
+    # Not started: lines queue up during the run and are written afterwards, timed separately
+    request_log = RequestLogWriter(open(os.devnull, "w"), max_pending=args.requests)
+    cases = {
+        "bare": endpoint,
+        "metrics": MetricsMiddleware(endpoint, HttpMetrics()),
+        "metrics_and_log": MetricsMiddleware(endpoint, HttpMetrics(), request_log=request_log),
+    }
+    results = {name: round(asyncio.run(drive(app, args.requests)), 2) for name, app in cases.items()}
+    results["metrics_overhead_us"] = round(results["metrics"] - results["bare"], 2)
+    results["log_overhead_us"] = round(results["metrics_and_log"] - results["metrics"], 2)
+    start = time.perf_counter()
+    request_log.flush()
+    results["log_writer_us"] = round((time.perf_counter() - start) / args.requests * 1e6, 2)
+
+    if args.json:
+        print(json.dumps({"benchmark": "metrics_overhead", "config": vars(args), "results": results}))
+        return
+
+    for name, us in results.items():
+        print(f"{name:<22} {us:>8} us/request")
+
+
+if __name__ == "__main__":
+    main()
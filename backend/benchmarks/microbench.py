@@ -0,0 +1,236 @@
+"""
+Microbenchmarks for the code that runs on every request, against fixture databases with
+1k / 100k / 1M api_key_usage rows (configurable with --usage-rows).
+
+    verify_api_key[cached]    verify_api_key with the credential in api_key_cache
+    verify_api_key[db]        verify_api_key with an api_keys lookup (cache cleared each call)
+    check_rate_limit          the GCRA limiter behind verify_api_key (RATE_LIMIT_BACKEND)
+    usage_window_count        COUNT(*) of one key's api_key_usage rows in the last hour, i.e.
+                              what a limiter counting usage rows would run per request
+    log_api_usage             staging the usage row on request.state
+    require_permissions       the permission_checker dependency, permissions granted
+    mk_offers                 10 synthetic flight offers
+    offers_serialize          10 offers to JSON bytes as a List[Offer] response_model does
+    policy_validate           20 PolicyDB rows validated into List[Policy] (from_attributes)
+
+Fixtures are SQLite files under --fixture-dir, built once and reused. Every run prints a
+table or, with --json, one JSON document; --append adds that document as one line to a
+JSONL file, tagged with the git commit, for charting results per commit.
+
+    cd backend
+    python -m benchmarks.microbench --usage-rows 1000 100000 1000000 --append /tmp/microbench.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+API_KEYS = 100
+POLICIES = 200
+USAGE_SPREAD_DAYS = 30
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usage-rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--iterations", type=int, default=20000, help="calls per CPU-only benchmark")
+    parser.add_argument("--db-iterations", type=int, default=1000, help="calls per benchmark that queries the database")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many timed runs")
+    parser.add_argument("--fixture-dir", default=os.path.join(tempfile.gettempdir(), "laasy-microbench"))
+    parser.add_argument("--append", default=None, help="append this run as one JSON line to this file")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def best_us(fn, iterations, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.perf_counter() - start) / iterations * 1e6)
+    return min(timings)
+
+
+def best_async_us(make_coro, iterations, repeat):
+    async def timed():
+        await make_coro()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await make_coro()
+            timings.append((time.perf_counter() - start) / iterations * 1e6)
+        return min(timings)
+
+    return asyncio.run(timed())
+
+
+def build_fixture(path, usage_rows):
+    """api_keys, policies and `usage_rows` api_key_usage rows spread over the last 30 days"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, func, insert, select
+    from db import Base
+    from models import ApiKeyDB, ApiKeyUsageDB, PolicyDB
+
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            if conn.scalar(select(func.count()).select_from(ApiKeyUsageDB)) == usage_rows:
+                return
+        engine.dispose()
+        os.remove(path)
+        Base.metadata.create_all(bind=engine)
+
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(insert(ApiKeyDB), [
+                {"id": k, "app_name": f"app{k}", "api_key": f"key{k}", "api_secret": f"secret{k}", "is_active": True,
+                 "permissions": ["bookings", "trips", "reports"], "rate_limit": 10 ** 9, "created_at": now}
+                for k in range(1, API_KEYS + 1)
+            ])
+            conn.execute(insert(PolicyDB), [
+                {"org_id": 1, "name": f"Policy {i}", "status": "published" if i % 2 else "draft", "created_by": 1,
+                 "created_at": now - timedelta(minutes=i), "updated_at": now}
+                for i in range(POLICIES)
+            ])
+            step = timedelta(days=USAGE_SPREAD_DAYS) / max(1, usage_rows)
+            for offset in range(0, usage_rows, 50000):
+                conn.execute(insert(ApiKeyUsageDB), [
+                    {"api_key_id": i % API_KEYS + 1, "endpoint": "/bookings", "method": "POST",
+                     "ip_address": "10.0.0.1", "user_agent": "microbench", "response_code": 200,
+                     "created_at": now - step * i}
+                    for i in range(offset, min(offset + 50000, usage_rows))
+                ])
+    finally:
+        engine.dispose()
+
+
+def run_size(path, args):
+    from datetime import datetime, timedelta
+    from fastapi import Response
+    from fastapi.security import HTTPAuthorizationCredentials
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session
+    from starlette.requests import Request
+    from typing import List
+    import auth
+    from auth_cache import api_key_cache
+    from models import ApiKeyUsageDB, Offer, Policy, PolicyDB, SearchParams
+    from search_engine import mk_offers
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="key7:secret7")
+    scope = {"type": "http", "method": "POST", "path": "/bookings", "query_string": b"", "client": ("10.0.0.1", 5000),
+             "headers": [(b"user-agent", b"microbench"), (b"host", b"localhost")], "server": ("localhost", 80),
+             "scheme": "http", "root_path": ""}
+
+    async def verify(cached):
+        if not cached:
+            api_key_cache.clear()
+        async with session_factory() as db:
+            return await auth.verify_api_key(credentials, Request(scope), Response(), db)
+
+    record = asyncio.run(verify(False))
+    checker = auth.require_permissions(["bookings", "trips"])
+    params = SearchParams(mode="flights", origin="ORD", destination="JFK", departDate="2025-11-25")
+    offers = mk_offers(params, "bench")
+    offers_adapter = TypeAdapter(List[Offer])
+    policy_adapter = TypeAdapter(List[Policy])
+    with Session(sync_engine) as db:
+        policies = db.scalars(select(PolicyDB).order_by(PolicyDB.created_at.desc(), PolicyDB.id.desc()).limit(20)).all()
+        db.expunge_all()
+
+    def usage_window_count():
+        with sync_engine.connect() as conn:
+            return conn.scalar(select(func.count()).select_from(ApiKeyUsageDB).where(
+                ApiKeyUsageDB.api_key_id == record.id,
+                ApiKeyUsageDB.created_at >= datetime.utcnow() - timedelta(hours=1),
+            ))
+
+    def serialize_offers():
+        # FastAPI: validate against response_model, dump in JSON mode, then json.dumps in JSONResponse
+        return json.dumps(offers_adapter.dump_python(offers_adapter.validate_python(offers), mode="json")).encode("utf-8")
+
+    n, db_n, repeat = args.iterations, args.db_iterations, args.repeat
+    results = {
+        "verify_api_key[cached]": best_async_us(lambda: verify(True), db_n, repeat),
+        "verify_api_key[db]": best_async_us(lambda: verify(False), db_n, repeat),
+        "check_rate_limit": best_async_us(lambda: auth.check_rate_limit(record), n, repeat),
+        "usage_window_count": best_us(usage_window_count, db_n, repeat),
+        "log_api_usage": best_us(lambda: auth.log_api_usage(record, Request(scope)), n, repeat),
+        "require_permissions": best_async_us(lambda: checker(api_key_record=record), n, repeat),
+        "mk_offers": best_us(lambda: mk_offers(params, "bench"), n // 10, repeat),
+        "offers_serialize": best_us(serialize_offers, n // 10, repeat),
+        "policy_validate": best_us(lambda: policy_adapter.validate_python(policies, from_attributes=True), n // 10, repeat),
+    }
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+    return {name: round(us, 2) for name, us in results.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.fixture_dir, exist_ok=True)
+    scratch = os.path.join(args.fixture_dir, "scratch.db")
+    # The app's own engines (last_used flushes, usage recorder) point at a scratch database
+    os.environ["DATABASE_URL"] = "sqlite:///" + scratch
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
+    from db import Base, engine
+    from auth_cache import last_used_writer
+
+    Base.metadata.create_all(bind=engine)
+    results = {}
+    for usage_rows in args.usage_rows:
+        path = os.path.join(args.fixture_dir, f"usage-{usage_rows}.db")
+        start = time.perf_counter()
+        build_fixture(path, usage_rows)
+        print(f"fixture {usage_rows} usage rows ready in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results[usage_rows] = run_size(path, args)
+    last_used_writer.flush()
+
+    report = {
+        "benchmark": "microbench",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "unit": "us_per_call",
+        "results": results,
+    }
+    if args.append:
+        with open(args.append, "a") as f:
+            f.write(json.dumps(report) + "\n")
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    names = list(next(iter(results.values())))
+    print(f"commit={report['commit']} python={report['python']} (us per call, best of {args.repeat})")
+    print(f"{'benchmark':<24}" + "".join(f"{f'{rows} rows':>14}" for rows in results))
+    for name in names:
+        print(f"{name:<24}" + "".join(f"{results[rows][name]:>14}" for rows in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Memory and latency of list endpoints on a large table: the old load-everything
+query vs keyset pages with and without field projections.
+
+Seeds USERS into a temp SQLite database (or --database-url) and runs the same
+statements the /travelers endpoint builds. Peak memory is measured with tracemalloc.
+
+    cd backend
+    python -m benchmarks.pagination --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def measure(fn, repeat):
+    """Best wall time (ms) and the tracemalloc peak (KiB) of one run"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(best, 2), round(peak / 1024, 1), result
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, select
+    from db import Base, SessionLocal, engine
+    from models import UserDB
+    from pagination import PageParams, decode_cursor
+    from routers.travelers import traveler_pager
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.scalar(select(UserDB.id).limit(1)) is None:
+            start = datetime(2024, 1, 1)
+            for offset in range(0, args.rows, 10000):
+                db.execute(insert(UserDB), [
+                    {"org_id": 1, "email": f"user{i}@acme.com", "display_name": f"User {i}", "status": "active",
+                     "meta_json": {"department": "sales", "cost_center": i % 97},
+                     "created_at": start + timedelta(seconds=i // 2), "updated_at": start}
+                    for i in range(offset, min(offset + 10000, args.rows))
+                ])
+            db.commit()
+        total = db.scalar(select(UserDB.id).order_by(UserDB.id.desc()).limit(1))
+
+    def legacy():
+        # What list_travelers did before: every row as an ORM object, whole response in memory
+        with SessionLocal() as db:
+            users = db.execute(select(UserDB)).scalars().all()
+            return [{"id": str(u.id), "name": u.email.split("@")[0].title(), "email": u.email,
+                     "loyalty": {"air": "", "hotel": "", "car": ""}} for u in users]
+
+    def keyset(page):
+        with SessionLocal() as db:
+            rows = db.execute(traveler_pager.statement(page)).all()
+            return traveler_pager.page(rows, page)
+
+    def offset_page(offset):
+        with SessionLocal() as db:
+            stmt = select(UserDB).order_by(UserDB.created_at, UserDB.id).offset(offset).limit(args.limit)
+            return db.execute(stmt).scalars().all()
+
+    def walk_all(fields):
+        page = PageParams(limit=1000, after=None, fields=fields)
+        count = 0
+        while True:
+            items, cursor = keyset(page)
+            count += len(items)
+            if not cursor:
+                return count
+            page = PageParams(limit=1000, after=decode_cursor(cursor), fields=fields)
+
+    # A cursor near the end of the table, as a client paging deep would hold
+    with SessionLocal() as db:
+        deep_row = db.execute(
+            select(UserDB.created_at, UserDB.id).order_by(UserDB.created_at, UserDB.id).offset(max(0, total - args.limit - 1)).limit(1)
+        ).one()
+
+    cases = {
+        "legacy_all_rows": legacy,
+        "keyset_first_page": lambda: keyset(PageParams(args.limit, None, None)),
+        "keyset_first_page_fields_id_email": lambda: keyset(PageParams(args.limit, None, ["id", "email"])),
+        "keyset_deep_page": lambda: keyset(PageParams(args.limit, (deep_row.created_at, deep_row.id), None)),
+        "offset_deep_page": lambda: offset_page(max(0, total - args.limit)),
+        "keyset_walk_all_1000": lambda: walk_all(None),
+        "keyset_walk_all_1000_fields_id": lambda: walk_all(["id"]),
+    }
+    results = {}
+    for name, fn in cases.items():
+        ms, peak_kib, _ = measure(fn, args.repeat)
+        results[name] = {"ms": ms, "peak_kib": peak_kib}
+
+    if args.json:
+        print(json.dumps({"benchmark": "pagination", "config": vars(args), "results": results}))
+        return
+
+    print(f"rows={args.rows} page={args.limit}")
+    print(f"{'case':<36} {'ms':>10} {'peak KiB':>10}")
+    for name, r in results.items():
+        print(f"{name:<36} {r['ms']:>10} {r['peak_kib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
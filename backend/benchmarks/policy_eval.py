@@ -0,0 +1,106 @@
+"""
+Per-offer vs vectorized policy evaluation.
+
+Builds synthetic flight/hotel/car offers, checks that policy_batch.evaluate_columns()
+agrees with CompiledPolicy.violations() offer by offer, and times both paths.
+"lists" times evaluation of list columns (what /policies/{id}/evaluate receives),
+"+extract" adds building those columns from Offer objects, and "arrays" evaluates
+columns already held as typed numpy arrays (prepare_columns()).
+
+    cd backend
+    python -m benchmarks.policy_eval --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from models import SearchParams
+from policy_batch import columns_from_offers, evaluate_columns, prepare_columns
+from policy_engine import CompiledPolicy
+from search_engine import mk_offers
+
+RULES = [
+    ("hotel.max_nightly_rate", "<=", "250"),
+    ("flights.allowed_cabins", "in", "Economy,PremiumEconomy"),
+    ("flights.max_stops", "<=", "0"),
+    ("cars.max_daily_rate", "<=", "80"),
+    ("cars.allowed_vehicle_classes", "in", "Economy,Compact,Intermediate"),
+    ("trip.max_price", "<=", "600"),
+]
+
+
+def make_offers(size):
+    offers = []
+    per_mode = size // 3
+    for i, mode in enumerate(("flights", "hotels", "cars")):
+        count = per_mode if i < 2 else size - 2 * per_mode
+        params = SearchParams(mode=mode, origin="SFO", destination="JFK", city="New York", departDate="2026-11-01")
+        offers.extend(mk_offers(params, f"bench-{mode}", count))
+    return offers
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def run(size, repeat):
+    policy = CompiledPolicy.compile(1, 1, RULES)
+    offers = make_offers(size)
+    fields = sorted({rule.field for rules in policy.rules_by_mode.values() for rule in rules})
+    columns = columns_from_offers(offers, fields)
+    arrays = prepare_columns(columns)
+
+    per_offer_ms, reasons = best_of(lambda: [policy.violations(o) for o in offers], repeat)
+    columnar_ms, batch = best_of(lambda: evaluate_columns(policy, columns), repeat)
+    arrays_ms, typed = best_of(lambda: evaluate_columns(policy, arrays), repeat)
+    extract_ms, _ = best_of(lambda: evaluate_columns(policy, columns_from_offers(offers, fields)), repeat)
+
+    expected = np.array([not r for r in reasons])
+    if not (np.array_equal(expected, batch.compliant) and np.array_equal(expected, typed.compliant)):
+        raise AssertionError(f"vectorized result differs from per-offer result at size {size}")
+    for rule, mask in zip(batch.rules, batch.violations):
+        per_offer = sum(1 for r in reasons for reason in r if reason.startswith(f"{rule.key} {rule.op} "))
+        if per_offer != int(mask.sum()):
+            raise AssertionError(f"violation count for {rule.key} differs at size {size}")
+
+    return {
+        "offers": size,
+        "compliant": int(batch.compliant.sum()),
+        "per_offer_ms": round(per_offer_ms, 3),
+        "columnar_ms": round(columnar_ms, 3),
+        "columnar_with_extract_ms": round(extract_ms, 3),
+        "typed_arrays_ms": round(arrays_ms, 3),
+        "speedup": round(per_offer_ms / columnar_ms, 1),
+        "speedup_typed_arrays": round(per_offer_ms / arrays_ms, 1),
+        "speedup_with_extract": round(per_offer_ms / extract_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [run(size, args.repeat) for size in args.sizes]
+    if args.json:
+        print(json.dumps({"benchmark": "policy_eval", "config": vars(args), "results": results}))
+        return
+
+    print(f"{'offers':>8} {'per-offer ms':>13} {'lists ms':>9} {'+extract ms':>12} {'arrays ms':>10} "
+          f"{'lists':>7} {'+extract':>9} {'arrays':>8}")
+    for r in results:
+        print(f"{r['offers']:>8} {r['per_offer_ms']:>13} {r['columnar_ms']:>9} {r['columnar_with_extract_ms']:>12} "
+              f"{r['typed_arrays_ms']:>10} {r['speedup']:>6}x {r['speedup_with_extract']:>8}x {r['speedup_typed_arrays']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
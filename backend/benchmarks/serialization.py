@@ -0,0 +1,108 @@
+"""
+Response serialization: FastAPI's response_model path vs fast_json (FAST_JSON_ENABLED).
+
+FastAPI dumps returned models to dicts, validates them against the response_model,
+dumps them again in JSON mode and encodes with json.dumps. fast_json serializes with a
+cached TypeAdapter straight to bytes, skipping validation for lists that already are
+Offer models. Both paths must produce the same JSON document; the benchmark checks that
+first. The bytes can differ in float formatting only: pydantic-core writes 1e-05 as
+0.00001 and 1e+16 as 1e16, so every payload includes such floats and the table reports
+whether the bytes matched too.
+
+    offers     List[Offer] from mk_offers, as the search endpoints return (validate=False)
+    policies   List[Policy] page dicts, as list_policies returns (validated)
+
+    cd backend
+    python -m benchmarks.serialization --sizes 10 1000 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000], help="items per response")
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def best_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def payloads(size):
+    from models import SearchParams
+    from search_engine import mk_offers
+
+    offers = []
+    for mode in ("flights", "hotels", "cars"):
+        params = SearchParams(mode=mode, origin="SFO", destination="JFK", city="New York", departDate="2026-11-01")
+        offers.extend(mk_offers(params, f"bench-{mode}", size // 3 + 1))
+    offers = offers[:size]
+    # Exponent-form floats, which json.dumps and pydantic-core format differently
+    offers[0] = offers[0].model_copy(update={"price": 1e-05, "details": {**(offers[0].details or {}), "points": 1e16}})
+    policies = [{"id": i, "name": f"Policy {i} – Europe", "status": "published" if i % 2 else "draft"}
+                for i in range(size)]
+    return {"offers": offers, "policies": policies}
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from fast_json import dump_json
+    from models import Offer, Policy
+
+    types = {"offers": (List[Offer], False), "policies": (List[Policy], True)}
+    fields = {name: create_model_field("Response", response_type, mode="serialization")
+              for name, (response_type, _) in types.items()}
+
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(name, content):
+        serialized = loop.run_until_complete(serialize_response(field=fields[name], response_content=content))
+        return JSONResponse(serialized).body
+
+    results = {}
+    for size in args.sizes:
+        for name, content in payloads(size).items():
+            response_type, validate = types[name]
+            baseline_ms, expected = best_ms(lambda: fastapi_path(name, content), args.repeat)
+            fast_ms, body = best_ms(lambda: dump_json(response_type, content, validate), args.repeat)
+            assert json.loads(body) == json.loads(expected), f"{name}[{size}]: fast path JSON differs from FastAPI's"
+            results[f"{name}[{size}]"] = {
+                "bytes": len(body),
+                "same_bytes": body == expected,
+                "fastapi_ms": round(baseline_ms, 3),
+                "fast_json_ms": round(fast_ms, 3),
+                "speedup": round(baseline_ms / fast_ms, 1),
+            }
+
+    loop.close()
+
+    if args.json:
+        print(json.dumps({"benchmark": "serialization", "config": vars(args), "results": results}))
+        return
+
+    print(f"{'response':<18} {'bytes':>11} {'same bytes':>11} {'fastapi ms':>11} {'fast_json ms':>13} {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:<18} {r['bytes']:>11} {str(r['same_bytes']):>11} {r['fastapi_ms']:>11} "
+              f"{r['fast_json_ms']:>13} {r['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cost of authenticating a request from a signed session token vs looking the caller up.
+
+Times SessionTokens.verify (with and without the pre-keyed HMAC state), issue, and for
+comparison a primary-key user lookup through SessionLocal on a temp SQLite database
+(a networked MySQL round trip costs far more).
+
+    cd backend
+    python -m benchmarks.session_tokens --iterations 100000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def per_call_us(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.setdefault("SESSION_SIGNING_KEYS", "k1:" + "a" * 40 + ",k2:" + "b" * 40)
+
+    from datetime import datetime
+    from db import Base, SessionLocal, engine
+    from models import UserDB
+    from session_tokens import SessionTokens, session_tokens
+
+    token = session_tokens.issue(42, 1, "Traveler")
+    secret = "a" * 40
+
+    class UnkeyedTokens(SessionTokens):
+        # Re-derives the HMAC key state on every call, as hmac.new(secret, msg) would
+        def _sign(self, kid, signing_input):
+            return hmac.new(secret.encode("utf-8"), signing_input, hashlib.sha256).digest()
+
+    unkeyed = UnkeyedTokens({"k1": secret}, "k1", 3600)
+    assert unkeyed.verify(token) == session_tokens.verify(token)
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(UserDB(id=42, org_id=1, email="bench@acme.com", created_at=datetime.utcnow()))
+        db.commit()
+
+    def db_lookup():
+        with SessionLocal() as db:
+            return db.get(UserDB, 42)
+
+    results = {
+        "verify_us": per_call_us(lambda: session_tokens.verify(token), args.iterations),
+        "verify_unkeyed_hmac_us": per_call_us(lambda: unkeyed.verify(token), args.iterations),
+        "issue_us": per_call_us(lambda: session_tokens.issue(42, 1, "Traveler"), args.iterations),
+        "sqlite_user_lookup_us": per_call_us(db_lookup, max(1, args.iterations // 20)),
+    }
+
+    if args.json:
+        print(json.dumps({"benchmark": "session_tokens", "config": vars(args), "results": results}))
+        return
+
+    print(f"token length={len(token)} bytes")
+    for name, us in results.items():
+        print(f"{name:<24} {us:>10} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Worker cold start: process spawn to first successful response, as an autoscaler sees it.
+
+Starts `uvicorn main:app` --runs times against a migrated temp SQLite database (or
+--database-url) and polls until /livez, then /readyz, answer 200. Runs with and without
+SCHEMA_CHECK_ON_STARTUP.
+
+It also counts the statements that the old import-time Base.metadata.create_all issued
+on every boot against an existing schema (one reflection query per table), and those of
+the schema version check that replaces it. --rtt-ms turns the counts into the time they
+would cost at a given database round trip (RDS in another AZ: ~1 ms, cross-region: more).
+
+    cd backend
+    python -m benchmarks.startup --runs 5 --rtt-ms 1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="database round trip used for the estimates")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    return parser.parse_args()
+
+
+def cold_start(backend_dir, env, port, timeout=60):
+    """(ms until /livez answered, ms until /readyz answered) for one fresh worker"""
+    import httpx
+
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=backend_dir, env=env,
+    )
+    try:
+        marks = {}
+        with httpx.Client(base_url=base, timeout=1) as client:
+            for path in ("/livez", "/readyz"):
+                while path not in marks:
+                    if time.perf_counter() - started > timeout or server.poll() is not None:
+                        raise RuntimeError(f"worker did not answer {path}")
+                    try:
+                        if client.get(path).status_code == 200:
+                            marks[path] = (time.perf_counter() - started) * 1000
+                    except httpx.HTTPError:
+                        time.sleep(0.005)
+        return marks["/livez"], marks["/readyz"]
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def count_statements(fn, engine):
+    from sqlalchemy import event
+
+    count = 0
+
+    def before(*_):
+        nonlocal count
+        count += 1
+
+    fn()  # first use pays for connecting and compiling; count and time the steady state
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        start = time.perf_counter()
+        fn()
+        return count, (time.perf_counter() - start) * 1000
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def main():
+    args = parse_args()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+
+    import migrations
+    from db import Base, engine
+
+    migrations.upgrade(engine)
+    # Against a schema that already exists, as on every worker boot but the first
+    create_all = count_statements(lambda: Base.metadata.create_all(bind=engine), engine)
+    version_check = count_statements(lambda: migrations.check(engine), engine)
+    engine.dispose()
+
+    results = {"statements": {}, "cold_start": {}}
+    for name, (statements, local_ms) in (("import_time_create_all", create_all), ("schema_version_check", version_check)):
+        results["statements"][name] = {"statements": statements, "local_ms": round(local_ms, 2),
+                                       "at_rtt_ms": round(statements * args.rtt_ms, 1)}
+
+    for mode, check in (("no_schema_check", "false"), ("schema_check", "true")):
+        env = dict(os.environ, HTTP_LOG_ENABLED="false", SCHEMA_CHECK_ON_STARTUP=check,
+                   APP_ENV=os.environ.get("APP_ENV", "development"))
+        cold_start(backend_dir, env, args.port)  # warm the OS file cache and .pyc files
+        runs = [cold_start(backend_dir, env, args.port) for _ in range(args.runs)]
+        results["cold_start"][mode] = {
+            "livez_median_ms": round(statistics.median(r[0] for r in runs), 1),
+            "livez_min_ms": round(min(r[0] for r in runs), 1),
+            "readyz_median_ms": round(statistics.median(r[1] for r in runs), 1),
+        }
+
+    if args.json:
+        print(json.dumps({"benchmark": "startup", "config": vars(args), "results": results}))
+        return
+
+    print(f"{len(Base.metadata.tables)} tables, estimates at {args.rtt_ms} ms database round trip")
+    print(f"{'per boot':<24} {'statements':>11} {'local ms':>9} {'at rtt ms':>10}")
+    for name, r in results["statements"].items():
+        print(f"{name:<24} {r['statements']:>11} {r['local_ms']:>9} {r['at_rtt_ms']:>10}")
+    print()
+    print(f"{'cold start':<24} {'livez p50 ms':>13} {'livez min ms':>13} {'readyz p50 ms':>14}")
+    for mode, r in results["cold_start"].items():
+        print(f"{mode:<24} {r['livez_median_ms']:>13} {r['livez_min_ms']:>13} {r['readyz_median_ms']:>14}")
+
+
+if __name__ == "__main__":
+    main()
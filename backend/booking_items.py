@@ -0,0 +1,54 @@
+import logging
+from typing import Iterable, List
+
+from sqlalchemy import exists, insert, select
+from sqlalchemy.engine import Connection
+
+from models import BookingDB, BookingItemDB
+from rollups import item_in_policy
+
+logger = logging.getLogger(__name__)
+
+
+def item_rows(booking_id: str, items: Iterable[dict]) -> List[dict]:
+    """booking_items rows for one booking's JSON items"""
+    return [
+        {
+            "booking_id": booking_id,
+            "mode": item["mode"],
+            "supplier_ref": item.get("id"),
+            "is_in_policy": item_in_policy(item),
+            "price_amount": round(float(item.get("price") or 0), 2),
+            "price_currency": item.get("currency") or "USD",
+            "item_json": item,
+        }
+        for item in items
+    ]
+
+
+def backfill(conn: Connection, batch_size: int = 1000) -> dict:
+    """
+    Copy bookings.items into booking_items for bookings that have no item rows yet (schema migration 4).
+    Reads bookings in id order, batch_size at a time, inside the caller's transaction.
+    """
+    bookings = 0
+    items = 0
+    last_id = ""
+    missing = ~exists().where(BookingItemDB.booking_id == BookingDB.id)
+    while True:
+        batch = conn.execute(
+            select(BookingDB.id, BookingDB.items)
+            .where(BookingDB.id > last_id, missing)
+            .order_by(BookingDB.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        rows = [row for booking in batch for row in item_rows(booking.id, booking.items or [])]
+        if rows:
+            conn.execute(insert(BookingItemDB), rows)
+        bookings += len(batch)
+        items += len(rows)
+        last_id = batch[-1].id
+        logger.info("Backfilled %d bookings (%d items) up to %s", bookings, items, last_id)
+    return {"bookings": bookings, "items": items}
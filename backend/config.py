@@ -1,4 +1,5 @@
 import os
+import re
 
 # Use DATABASE_URL directly from environment, with fallback to individual components
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -12,3 +13,164 @@ if not DATABASE_URL:
     DB_PORT = os.getenv("DB_PORT", "3306")
     DB_NAME = os.getenv("DB_NAME", "devcorptravel")
     DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Async driver URL for the AsyncEngine every router uses; derived from DATABASE_URL unless set explicitly
+ASYNC_DRIVERS = {
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "mysql://": "mysql+aiomysql://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
+
+def to_async_url(url: str) -> str:
+    for sync_prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Connection pool sizing; size workers so that workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW +
+# DB_SYNC_POOL_SIZE + DB_SYNC_MAX_OVERFLOW) stays below the RDS max_connections limit
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# The sync engine only serves the usage and last_used writer threads (one connection each) in a
+# worker, and manage.py jobs, so its pool stays small
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "2"))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "1"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+# Per-connection session variables (MySQL only), e.g. DB_SESSION_VARIABLES="innodb_lock_wait_timeout=5"
+# DB_STATEMENT_TIMEOUT_MS maps to max_execution_time, which caps SELECT statements
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+def parse_session_variables(raw: str) -> dict:
+    variables = {}
+    for pair in filter(None, (p.strip() for p in raw.split(","))):
+        name, _, value = pair.partition("=")
+        name, value = name.strip(), value.strip()
+        if not re.fullmatch(r"[a-z_]+", name) or not re.fullmatch(r"[0-9A-Za-z_.']+", value):
+            raise ValueError(f"Invalid DB_SESSION_VARIABLES entry: {pair}")
+        variables[name] = value
+    return variables
+
+DB_SESSION_VARIABLES = parse_session_variables(os.getenv("DB_SESSION_VARIABLES", ""))
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    DB_SESSION_VARIABLES.setdefault("max_execution_time", str(DB_STATEMENT_TIMEOUT_MS))
+
+# API key authentication cache. Toggling or deleting a key invalidates it in this worker only;
+# other workers keep accepting a deactivated or deleted key until their entry expires, so the TTL
+# is the revocation lag. Kept short: even a few seconds saves nearly every lookup for busy keys
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "5"))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+API_KEY_LAST_USED_FLUSH_SECONDS = float(os.getenv("API_KEY_LAST_USED_FLUSH_SECONDS", "30"))
+# POST /api-keys/bootstrap mints the first admin key without authentication; it only exists while
+# this is set, so enable it for the first start of a new deployment and unset it afterwards
+API_KEY_BOOTSTRAP_ENABLED = os.getenv("API_KEY_BOOTSTRAP_ENABLED", "false").lower() == "true"
+
+# API key rate limiting: "memory" (per worker) or "sqlite" (shared by workers on one host)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/laasy-rate-limit.sqlite3")
+RATE_LIMIT_PERIOD_SECONDS = float(os.getenv("RATE_LIMIT_PERIOD_SECONDS", "3600"))
+
+# Write-behind API key usage logging
+USAGE_QUEUE_MAX_SIZE = int(os.getenv("USAGE_QUEUE_MAX_SIZE", "10000"))
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "500"))
+USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "1.0"))
+# 0 drops rows immediately when the queue is full; >0 makes that request wait up to this long
+# for room first (it yields to the event loop while waiting, other requests keep running)
+USAGE_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("USAGE_ENQUEUE_TIMEOUT_SECONDS", "0"))
+
+# Multi-supplier search fan-out
+# Overall budget for one search; suppliers still running after it are dropped from the response
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "0.6"))
+# JSON list of suppliers (see search_engine.build_suppliers); empty uses in-process synthetic suppliers
+SEARCH_SUPPLIERS_JSON = os.getenv("SEARCH_SUPPLIERS_JSON", "")
+SEARCH_SYNTHETIC_SUPPLIERS = int(os.getenv("SEARCH_SYNTHETIC_SUPPLIERS", "2"))
+SEARCH_SYNTHETIC_LATENCY_MS = float(os.getenv("SEARCH_SYNTHETIC_LATENCY_MS", "0"))
+SEARCH_BREAKER_FAILURES = int(os.getenv("SEARCH_BREAKER_FAILURES", "5"))
+SEARCH_BREAKER_RESET_SECONDS = float(os.getenv("SEARCH_BREAKER_RESET_SECONDS", "30"))
+
+# Search result cache (per process)
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL_FLIGHTS = float(os.getenv("SEARCH_CACHE_TTL_FLIGHTS", "60"))
+SEARCH_CACHE_TTL_HOTELS = float(os.getenv("SEARCH_CACHE_TTL_HOTELS", "300"))
+SEARCH_CACHE_TTL_CARS = float(os.getenv("SEARCH_CACHE_TTL_CARS", "300"))
+# How long past its TTL an entry may still be served while a background refresh runs
+SEARCH_CACHE_STALE_SECONDS = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", "120"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Compiled travel policies; publish invalidates this process, the TTL bounds staleness in other workers
+POLICY_CACHE_TTL_SECONDS = float(os.getenv("POLICY_CACHE_TTL_SECONDS", "60"))
+
+# List endpoint pagination
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+# POST /bookings/batch: most bookings accepted in one request (one transaction)
+BOOKING_BATCH_MAX_SIZE = int(os.getenv("BOOKING_BATCH_MAX_SIZE", "500"))
+
+# Idempotent replays of mutating booking requests by X-Request-Id:
+# "memory" (per worker) or "database" (idempotency_keys table, shared by all workers)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# How long a duplicate waits for the in-flight original before answering 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Password hashing: bcrypt runs in this many processes (0 = default threadpool); logins beyond
+# PASSWORD_HASH_MAX_PENDING running or queued hashes get 503 with Retry-After
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = float(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# nice() increment for the hashing processes, so request handling wins CPU contention
+PASSWORD_HASH_NICENESS = int(os.getenv("PASSWORD_HASH_NICENESS", "10"))
+
+# Signed session tokens: SESSION_SIGNING_KEYS="<kid>:<secret>,..." (keep retired keys listed until
+# their tokens expire); new tokens are signed with SESSION_ACTIVE_KID, default the first key
+def parse_signing_keys(raw: str) -> dict:
+    keys = {}
+    for pair in filter(None, (p.strip() for p in raw.split(","))):
+        kid, _, secret = pair.partition(":")
+        kid, secret = kid.strip(), secret.strip()
+        if not re.fullmatch(r"[0-9A-Za-z_.-]+", kid) or len(secret) < 32:
+            raise ValueError(f"Invalid SESSION_SIGNING_KEYS entry for kid {kid!r} (secrets need 32+ characters)")
+        keys[kid] = secret
+    return keys
+
+SESSION_SIGNING_KEYS = parse_signing_keys(os.getenv("SESSION_SIGNING_KEYS", ""))
+# Without SESSION_SIGNING_KEYS a worker refuses to start, unless APP_ENV=development (random per-process key)
+APP_ENV = os.getenv("APP_ENV", "production").lower()
+DEV_MODE = APP_ENV == "development"
+SESSION_ACTIVE_KID = os.getenv("SESSION_ACTIVE_KID", next(iter(SESSION_SIGNING_KEYS), ""))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(8 * 3600)))
+
+# Request metrics (/metrics) and structured http_request logs
+HTTP_LOG_ENABLED = os.getenv("HTTP_LOG_ENABLED", "true").lower() == "true"
+HTTP_LOG_EXCLUDE_PATHS = [p.strip() for p in os.getenv("HTTP_LOG_EXCLUDE_PATHS", "/metrics,/healthz,/livez,/readyz").split(",") if p.strip()]
+
+# Per-request SQL instrumentation: query count and DB time in Server-Timing and /metrics,
+# a warning when one statement repeats SQL_N_PLUS_ONE_THRESHOLD times in a request (N+1),
+# and a slow-query log (parameters redacted) for statements over SQL_SLOW_QUERY_MS
+SQL_INSTRUMENTATION_ENABLED = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "true").lower() == "true"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Opt-in fast path for list/search responses: serialize straight to JSON bytes with a cached
+# pydantic TypeAdapter instead of FastAPI's dump -> validate -> dump -> json.dumps. Same JSON
+# values; floats in exponent form are formatted differently (0.00001 instead of 1e-05)
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "false").lower() == "true"
+
+# Health probes: /livez touches nothing; /readyz reuses one database check for this long
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "5"))
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+
+# Schema is created and migrated by `python manage.py init-db`, not at startup; with this set a
+# worker refuses to start when the database's schema version differs from the build's
+SCHEMA_CHECK_ON_STARTUP = os.getenv("SCHEMA_CHECK_ON_STARTUP", "false").lower() == "true"
+
+# Bulk exports: rows fetched per server-side cursor round trip (and per streamed chunk)
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "2000"))
@@ -1,16 +1,42 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_SESSION_VARIABLES
+)
+from db_pool import apply_session_variables, attach_pool_stats, pool_options
+from sql_instrumentation import attach_query_tracking
 
+# Sync engine for the background writer threads, manage.py and batch jobs; no request handler uses it
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=True
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=DB_ECHO,
+    **pool_options(DATABASE_URL, "sync", DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW, DB_POOL_TIMEOUT)
 )
+attach_pool_stats(engine, "sync")
+attach_query_tracking(engine)
+apply_session_variables(engine, DB_SESSION_VARIABLES)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the routers (aiomysql for MySQL, aiosqlite locally)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=DB_ECHO,
+    **pool_options(ASYNC_DATABASE_URL, "async", DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, is_async=True)
+)
+attach_pool_stats(async_engine.sync_engine, "async")
+attach_query_tracking(async_engine.sync_engine)
+apply_session_variables(async_engine.sync_engine, DB_SESSION_VARIABLES)
+
+# expire_on_commit=False so ORM objects can still be serialized after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
@@ -20,3 +46,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,155 @@
+import threading
+import time
+from typing import Dict, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats:
+    """Checkout latency, exhaustion events and connection churn for one engine's connection pool"""
+
+    def __init__(self, name: str, max_overflow: int = 0):
+        self.name = name
+        self.max_overflow = max_overflow
+        self.pool: Pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.exhausted = 0
+        self.connects = 0
+
+    def record_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def record_exhausted(self) -> None:
+        with self._lock:
+            self.exhausted += 1
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            timed = sum(self.wait_buckets)
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checkout_wait_avg_ms": round(self.wait_total_ms / timed, 3) if timed else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max_ms, 3),
+                "checkout_wait_buckets_ms": {
+                    **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                    "gt_last": self.wait_buckets[-1],
+                },
+                "exhausted": self.exhausted,
+                "connects": self.connects,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # overflow() is negative while the pool is still below pool_size
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": self.max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return data
+
+
+pool_stats: Dict[str, PoolStats] = {}
+
+
+def instrumented_pool_class(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """
+    QueuePool subclass that times the public connect() call (waiting for a free connection, plus opening
+    or pre-pinging one) and counts pool-timeout errors; checkouts, checkins and connects come from pool events
+    """
+
+    class InstrumentedPool(base):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.record_exhausted()
+                raise
+            stats.record_wait((time.perf_counter() - start) * 1000)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def pool_options(url: str, name: str, pool_size: int, max_overflow: int, pool_timeout: float,
+                 is_async: bool = False) -> dict:
+    """create_engine() pool keyword arguments; in-memory SQLite keeps its default single-connection pool"""
+    if ":memory:" in url:
+        return {}
+    stats = pool_stats.setdefault(name, PoolStats(name, max_overflow))
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return {
+        "poolclass": instrumented_pool_class(base, stats),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+    }
+
+
+def attach_pool_stats(engine, name: str) -> None:
+    stats = pool_stats.get(name)
+    if stats is None:
+        return
+    stats.pool = engine.pool
+
+    # Pool events registered on the engine follow it across dispose(), which builds a new pool
+    @event.listens_for(engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        stats.count("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.count("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _count_checkin(dbapi_connection, connection_record):
+        stats.count("checkins")
+
+    @event.listens_for(engine, "engine_disposed")
+    def _track_recreated_pool(disposed_engine):
+        stats.pool = disposed_engine.pool
+
+
+def apply_session_variables(engine, variables: Dict[str, str]) -> None:
+    """Run SET SESSION for each variable on every new MySQL connection (e.g. max_execution_time)"""
+    if not variables or engine.dialect.name != "mysql":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_session_variables(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in variables.items():
+                cursor.execute(f"SET SESSION {name} = {value}")
+        finally:
+            cursor.close()
+
+
+def snapshot() -> dict:
+    return {name: stats.snapshot() for name, stats in pool_stats.items()}
@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
+
+from config import EXPORT_YIELD_PER
+from db import AsyncSessionLocal
+from models import BookingDB, TripDB, UserDB
+
+
+def _iso(value: Optional[Any]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+@dataclass
+class ExportSpec:
+    """One exportable table: its keyset-ordered query and how a row becomes CSV / NDJSON fields"""
+    name: str
+    statement: Callable[[int, datetime, datetime], Select]
+    created_col: Any
+    id_col: Any
+    columns: List[str]
+    csv_row: Callable[[Any], list]
+    json_row: Callable[[Any], dict]
+
+
+def booking_statement(org_id: int, start: datetime, end: datetime) -> Select:
+    return (
+        select(BookingDB.id, BookingDB.user_id, UserDB.email, BookingDB.policy_id, BookingDB.status,
+               BookingDB.total_amount, BookingDB.currency, BookingDB.items, BookingDB.created_at)
+        .join(UserDB, UserDB.id == BookingDB.user_id)
+        .where(UserDB.org_id == org_id, BookingDB.created_at >= start, BookingDB.created_at < end)
+    )
+
+
+def booking_json(row) -> dict:
+    return {
+        "id": row.id, "user_id": row.user_id, "traveler_email": row.email, "policy_id": row.policy_id,
+        "status": row.status, "total_amount": row.total_amount, "currency": row.currency,
+        "items": row.items or [], "created_at": _iso(row.created_at),
+    }
+
+
+def booking_csv(row) -> list:
+    items = row.items or []
+    return [
+        row.id, row.user_id, row.email, row.policy_id, row.status, row.total_amount, row.currency,
+        len(items), ";".join(sorted({i.get("mode", "") for i in items})),
+        sum(1 for i in items if i.get("policyStatus") == "out"), _iso(row.created_at),
+    ]
+
+
+def trip_statement(org_id: int, start: datetime, end: datetime) -> Select:
+    return (
+        select(TripDB.id, TripDB.traveler_id, TripDB.booking_id, TripDB.trip_title, TripDB.status,
+               TripDB.start_date, TripDB.end_date, TripDB.created_at)
+        .where(TripDB.org_id == org_id, TripDB.created_at >= start, TripDB.created_at < end)
+    )
+
+
+def trip_json(row) -> dict:
+    return {
+        "id": row.id, "traveler_id": row.traveler_id, "booking_id": row.booking_id, "title": row.trip_title,
+        "status": row.status, "start_date": _iso(row.start_date), "end_date": _iso(row.end_date),
+        "created_at": _iso(row.created_at),
+    }
+
+
+TRIP_COLUMNS = ["id", "traveler_id", "booking_id", "title", "status", "start_date", "end_date", "created_at"]
+
+
+def trip_csv(row) -> list:
+    data = trip_json(row)
+    return [data[column] for column in TRIP_COLUMNS]
+
+
+EXPORTS = {
+    "bookings": ExportSpec(
+        name="bookings",
+        statement=booking_statement,
+        created_col=BookingDB.created_at,
+        id_col=BookingDB.id,
+        columns=["id", "user_id", "traveler_email", "policy_id", "status", "total_amount", "currency",
+                 "item_count", "modes", "out_of_policy_items", "created_at"],
+        csv_row=booking_csv,
+        json_row=booking_json,
+    ),
+    "trips": ExportSpec(
+        name="trips",
+        statement=trip_statement,
+        created_col=TripDB.created_at,
+        id_col=TripDB.id,
+        columns=TRIP_COLUMNS,
+        csv_row=trip_csv,
+        json_row=trip_json,
+    ),
+}
+
+
+def export_statement(spec: ExportSpec, org_id: int, start: date, end: date,
+                     after: Optional[Tuple[datetime, Any]] = None) -> Select:
+    """Rows created on [start, end] (inclusive days) in (created_at, id) order, optionally after a resume point"""
+    stmt = spec.statement(
+        org_id,
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    )
+    if after is not None:
+        created_at, row_id = after
+        stmt = stmt.where(
+            spec.created_col >= created_at,
+            or_(spec.created_col > created_at, spec.id_col > row_id),
+        )
+    return stmt.order_by(spec.created_col, spec.id_col)
+
+
+class _CsvBuffer:
+    def __init__(self, columns: List[str]):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+        self.writer.writerow(columns)
+
+    def add(self, values: list) -> None:
+        self.writer.writerow(values)
+
+    def take(self) -> str:
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class _NdjsonBuffer:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def add(self, data: dict) -> None:
+        self.lines.append(json.dumps(data, separators=(",", ":")))
+        self.lines.append("\n")
+
+    def take(self) -> str:
+        data = "".join(self.lines)
+        self.lines.clear()
+        return data
+
+
+async def stream_export(spec: ExportSpec, org_id: int, start: date, end: date, format: str,
+                        compress: bool = False, after: Optional[Tuple[datetime, Any]] = None,
+                        session_factory=AsyncSessionLocal) -> AsyncIterator[bytes]:
+    """
+    Encoded export chunks, one per partition of EXPORT_YIELD_PER rows.
+    Rows come from a server-side cursor (stream + yield_per), so memory does not grow with the export.
+    The generator owns its session: the request's session is already closed while the body streams.
+    """
+    stmt = export_statement(spec, org_id, start, end, after).execution_options(yield_per=EXPORT_YIELD_PER)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip container
+    is_csv = format == "csv"
+    buffer = _CsvBuffer(spec.columns) if is_csv else _NdjsonBuffer()
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    async with session_factory() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            for row in partition:
+                if is_csv:
+                    buffer.add(spec.csv_row(row))
+                else:
+                    buffer.add(spec.json_row(row))
+            text = buffer.take()
+            if text:
+                chunk = encode(text)
+                if chunk:
+                    yield chunk
+
+    tail = encode(buffer.take())
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
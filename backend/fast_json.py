@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from config import FAST_JSON_ENABLED
+
+
+class RawJSONResponse(Response):
+    """A body that is already JSON bytes; FastAPI sends Response objects as-is"""
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def adapter(response_type: Any) -> TypeAdapter:
+    """One compiled validator/serializer per response type, built on first use"""
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type: Any, content: Any, validate: bool = True) -> bytes:
+    """
+    `content` as the JSON FastAPI would send for response_model=`response_type`: same
+    keys, aliases, defaults and values, serialized to bytes in one pass by pydantic-core.
+    Floats in exponent form are written differently than json.dumps does (0.00001 for
+    1e-05, 1e16 for 1e+16), so the bytes are not always identical.
+    validate=False skips validation for content that already is `response_type`
+    (e.g. a list of Offer models), which FastAPI would dump to dicts and validate again.
+    """
+    type_adapter = adapter(response_type)
+    if validate:
+        content = type_adapter.validate_python(content, from_attributes=True)
+    return type_adapter.dump_json(content, by_alias=True)
+
+
+def typed_response(response_type: Any, content: Any, response: Optional[Response] = None, validate: bool = True):
+    """
+    With FAST_JSON_ENABLED, `content` pre-serialized as a RawJSONResponse carrying the
+    headers and status code dependencies set on `response`; otherwise `content` unchanged,
+    for FastAPI's response_model handling.
+    """
+    if not FAST_JSON_ENABLED:
+        return content
+    headers = None
+    status_code = 200
+    if response is not None:
+        # Minus the placeholder body's length, as page_response does for projected pages
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        status_code = response.status_code or 200
+    return RawJSONResponse(dump_json(response_type, content, validate), status_code=status_code, headers=headers)
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from config import READINESS_CACHE_SECONDS, READINESS_TIMEOUT_SECONDS
+from db import async_engine
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealth:
+    """
+    Cached database reachability for the readiness probe. At most one SELECT 1 runs per
+    `cache_seconds`, however many probes (load balancer, orchestrator, several workers'
+    sidecars) arrive; concurrent probes during a refresh wait for that one query.
+    """
+
+    def __init__(self, engine, cache_seconds: float, timeout_seconds: float):
+        self.engine = engine
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self._lock = asyncio.Lock()
+        self._checked_at: Optional[float] = None
+        self._ok = False
+        self._error: Optional[str] = None
+        self.checks = 0
+        self.failures = 0
+
+    async def check(self) -> dict:
+        if self._fresh():
+            return self._status()
+        async with self._lock:
+            if not self._fresh():
+                await self._refresh()
+        return self._status()
+
+    def _fresh(self) -> bool:
+        return self._checked_at is not None and time.monotonic() - self._checked_at < self.cache_seconds
+
+    async def _refresh(self) -> None:
+        self.checks += 1
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async with self.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            self._ok, self._error = True, None
+        except Exception as exc:
+            self.failures += 1
+            if self._ok or self._error is None:
+                logger.warning("Database readiness check failed: %r", exc)
+            self._ok, self._error = False, type(exc).__name__
+        self._checked_at = time.monotonic()
+
+    def _status(self) -> dict:
+        return {
+            "status": "ready" if self._ok else "unavailable",
+            "database": "ok" if self._ok else self._error,
+            "checked_ago_ms": round((time.monotonic() - self._checked_at) * 1000),
+        }
+
+    @property
+    def ok(self) -> bool:
+        return self._ok
+
+
+database_health = DatabaseHealth(async_engine, READINESS_CACHE_SECONDS, READINESS_TIMEOUT_SECONDS)
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from config import (IDEMPOTENCY_BACKEND, IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS,
+                    IDEMPOTENCY_WAIT_SECONDS)
+from db import AsyncSessionLocal
+from models import IdempotencyKeyDB
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-Id"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# A claim left behind by a worker that died mid-request blocks retries of that request id this long
+CLAIM_SECONDS = 60.0
+
+
+def fingerprint(payload: Any) -> str:
+    """Digest of a request body, so a reused request id with a different body is rejected, not replayed"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class IdempotencyRecord:
+    fingerprint: str
+    # None while the original request is still executing
+    response: Optional[Any]
+
+    @property
+    def complete(self) -> bool:
+        return self.response is not None
+
+
+class IdempotencyStore(ABC):
+    """request key -> claimed / completed response, with expiry"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        ...
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str) -> bool:
+        """Atomically start executing `key`; False if someone else holds or completed it"""
+
+    @abstractmethod
+    async def complete(self, key: str, response: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Drop a claim whose request failed, so a retry executes again"""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryStore(IdempotencyStore):
+    """
+    Bounded TTL + LRU store of completed responses; replays only reach the worker that handled the original.
+    Claims of requests still executing are kept apart and never evicted (they expire after CLAIM_SECONDS),
+    so a full table cannot let a duplicate of an in-flight request execute again.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, IdempotencyRecord]]" = OrderedDict()
+        self._claims: Dict[str, Tuple[float, IdempotencyRecord]] = {}
+        self.evictions = 0
+
+    # No awaits inside these methods, so each one is atomic on the event loop
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        now = self.clock()
+        claim = self._claims.get(key)
+        if claim is not None:
+            if claim[0] > now:
+                return claim[1]
+            del self._claims[key]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def claim(self, key: str, fingerprint: str) -> bool:
+        if await self.get(key) is not None:
+            return False
+        self._claims[key] = (self.clock() + CLAIM_SECONDS, IdempotencyRecord(fingerprint, None))
+        return True
+
+    async def complete(self, key: str, response: Any) -> None:
+        claim = self._claims.pop(key, None)
+        if claim is None:
+            return
+        self._entries[key] = (self.clock() + self.ttl_seconds, IdempotencyRecord(claim[1].fingerprint, response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def release(self, key: str) -> None:
+        self._claims.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "claims": len(self._claims), "max_entries": self.max_entries,
+                "evictions": self.evictions}
+
+
+class DatabaseStore(IdempotencyStore):
+    """idempotency_keys rows shared by every worker; the primary key makes claims atomic"""
+
+    def __init__(self, session_factory, ttl_seconds: float, purge_every: int = 500):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._claims = 0
+        self.purged = 0
+
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        async with self.session_factory() as db:
+            row = (await db.execute(
+                select(IdempotencyKeyDB.fingerprint, IdempotencyKeyDB.response)
+                .where(IdempotencyKeyDB.key == key, IdempotencyKeyDB.expires_at > datetime.utcnow())
+            )).first()
+        return IdempotencyRecord(row.fingerprint, row.response) if row else None
+
+    async def claim(self, key: str, fingerprint: str) -> bool:
+        now = datetime.utcnow()
+        self._claims += 1
+        async with self.session_factory() as db:
+            if self._claims % self.purge_every == 0:
+                self.purged += (await db.execute(
+                    delete(IdempotencyKeyDB).where(IdempotencyKeyDB.expires_at <= now)
+                )).rowcount
+            else:
+                # An expired row for this key must not block the insert
+                await db.execute(
+                    delete(IdempotencyKeyDB).where(IdempotencyKeyDB.key == key, IdempotencyKeyDB.expires_at <= now)
+                )
+            db.add(IdempotencyKeyDB(key=key, fingerprint=fingerprint, response=None, created_at=now,
+                                    expires_at=now + timedelta(seconds=CLAIM_SECONDS)))
+            try:
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                return False
+        return True
+
+    async def complete(self, key: str, response: Any) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                update(IdempotencyKeyDB)
+                .where(IdempotencyKeyDB.key == key)
+                .values(response=response, expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds))
+            )
+            await db.commit()
+
+    async def release(self, key: str) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(IdempotencyKeyDB).where(IdempotencyKeyDB.key == key, IdempotencyKeyDB.response.is_(None))
+            )
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {"purged": self.purged}
+
+
+class IdempotencyGuard:
+    """
+    Runs a mutating handler at most once per request id. A replay gets the stored response;
+    a duplicate that arrives while the original is executing waits for it (an asyncio.Event
+    in this worker, polling the store for one running in another worker) instead of executing.
+    Only successful responses are stored: if the original fails, the claim is released and
+    the next attempt executes again.
+    """
+
+    def __init__(self, store: IdempotencyStore, wait_seconds: float):
+        self.store = store
+        self.wait_seconds = wait_seconds
+        self._inflight: Dict[str, asyncio.Event] = {}
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.replays = 0
+        self.waits = 0
+        self.conflicts = 0
+        self.timeouts = 0
+
+    async def run(self, request_id: Optional[str], scope: str, payload: Any,
+                  execute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(JSON-serializable response, whether it was replayed); without a request id just executes"""
+        if not request_id:
+            return await execute(), False
+        self.requests += 1
+        key = f"{scope}:{request_id}"
+        digest = fingerprint(payload)
+        deadline = time.monotonic() + self.wait_seconds
+        poll = 0.02
+        waited = False
+
+        while True:
+            record = await self.store.get(key)
+            if record is None and await self.store.claim(key, digest):
+                self.misses += 1
+                break
+            if record is not None:
+                self.hits += 1
+                if record.fingerprint != digest:
+                    self.conflicts += 1
+                    raise HTTPException(status_code=422, detail=f"{REQUEST_ID_HEADER} was already used with a different request body")
+                if record.complete:
+                    self.replays += 1
+                    return record.response, True
+            # The original is still executing here or in another worker
+            if not waited:
+                waited = True
+                self.waits += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise HTTPException(status_code=409, detail=f"A request with this {REQUEST_ID_HEADER} is still in progress")
+            event = self._inflight.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(poll, remaining))
+                poll = min(poll * 2, 0.5)
+
+        event = self._inflight[key] = asyncio.Event()
+        try:
+            try:
+                response = await execute()
+            except BaseException:
+                await self._release(key)
+                raise
+            try:
+                await self.store.complete(key, response)
+            except Exception:
+                # The change is committed, so keep the claim: duplicates get 409 until it expires, never a re-run
+                logger.exception("Failed to store idempotent response for %s", key)
+            return response, False
+        finally:
+            self._inflight.pop(key, None)
+            event.set()
+
+    async def _release(self, key: str) -> None:
+        try:
+            await self.store.release(key)
+        except Exception:
+            logger.exception("Failed to release idempotency claim for %s", key)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "requests": self.requests,
+            "hits": self.hits,
+            "misses": self.misses,
+            "replays": self.replays,
+            "waits": self.waits,
+            "conflicts": self.conflicts,
+            "timeouts": self.timeouts,
+            "inflight": len(self._inflight),
+            **self.store.stats(),
+        }
+
+
+def create_store(spec: str = IDEMPOTENCY_BACKEND) -> IdempotencyStore:
+    if spec == "memory":
+        return MemoryStore(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES)
+    if spec == "database":
+        return DatabaseStore(AsyncSessionLocal, IDEMPOTENCY_TTL_SECONDS)
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND: {spec}")
+
+
+idempotency = IdempotencyGuard(create_store(), wait_seconds=IDEMPOTENCY_WAIT_SECONDS)
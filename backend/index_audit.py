@@ -0,0 +1,307 @@
+"""
+EXPLAIN every statement the routers issue and report the ones that read a whole table.
+
+`python manage.py audit-indexes` builds a scratch database, seeds it, drives each router
+through the app (TestClient) while capturing the statements and parameters sent to the
+driver, then EXPLAINs every distinct SELECT / UPDATE / DELETE on the engine that issued it:
+
+    sqlite      EXPLAIN QUERY PLAN; "SCAN <table>" without an index is a full scan
+    mysql       EXPLAIN; access type ALL is a full scan
+    postgresql  EXPLAIN; "Seq Scan on <table>" is a full scan
+
+The schema is either the SQLAlchemy models (migrations.upgrade) or one of the MySQL
+scripts the deployments were built from, loaded as-is into an empty MySQL database:
+statements the models issue that such a schema cannot run are reported under "errors".
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> ([(file or zip archive, member in the archive or None), ...]); "models" uses migrations.upgrade
+SCHEMA_SCRIPTS = {
+    "mysql-init": [(os.path.join(REPO_DIR, "mysql-init", "00_init.sql"), None)],
+    "devcorptravel": [
+        (os.path.join(REPO_DIR, "devcorptravel_sql", "devcorptravel_sql_bundle.zip"),
+         "devcorptravel_sql/devcorptravel_schema.sql"),
+        (os.path.join(REPO_DIR, "devcorptravel_sql", "V5__hot_path_indexes.sql"), None),
+    ],
+}
+SCHEMAS = ["models", *SCHEMA_SCRIPTS]
+
+EXPLAINED = ("select", "update", "delete", "with")
+# The scripts create and switch to their own database; the audit loads them into the URL's
+SKIPPED_SCRIPT_STATEMENTS = ("create database", "use ")
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+PASSWORD = "audit-password"
+
+
+def read_script(path: str, member: Optional[str]) -> str:
+    if member is None:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    with zipfile.ZipFile(path) as archive:
+        return archive.read(member).decode("utf-8")
+
+
+def script_statements(script: str) -> List[str]:
+    """Semicolon-terminated statements of a DDL script, minus comments and CREATE DATABASE / USE"""
+    lines = [line for line in script.splitlines() if not line.lstrip().startswith("--")]
+    statements = []
+    for statement in "\n".join(lines).split(";"):
+        statement = statement.strip()
+        if statement and not statement.lower().startswith(SKIPPED_SCRIPT_STATEMENTS):
+            statements.append(statement)
+    return statements
+
+
+def load_schema(engine, schema: str) -> dict:
+    if schema == "models":
+        import migrations
+
+        return migrations.upgrade(engine)
+    if engine.dialect.name != "mysql":
+        raise ValueError(f"The {schema} schema is MySQL DDL; pass the URL of an empty MySQL database")
+    loaded = 0
+    with engine.begin() as conn:
+        for path, member in SCHEMA_SCRIPTS[schema]:
+            for statement in script_statements(read_script(path, member)):
+                conn.exec_driver_sql(statement)
+                loaded += 1
+    return {"statements": loaded}
+
+
+def seed(engine, rows: int, api_key_id: int) -> None:
+    """`rows` users, trips, bookings and api_key_usage rows, so plans reflect tables that are not tiny"""
+    from models import ApiKeyUsageDB, BookingDB, PolicyDB, TripDB, UserDB
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(UserDB), [
+            {"org_id": 1, "email": f"traveler{i}@audit.example", "status": "active",
+             "created_at": now - timedelta(minutes=i), "updated_at": now}
+            for i in range(rows)
+        ])
+        conn.execute(insert(PolicyDB), [
+            {"org_id": 1, "name": f"Policy {i}", "status": "draft", "created_by": 1,
+             "created_at": now - timedelta(minutes=i), "updated_at": now}
+            for i in range(min(rows, 100))
+        ])
+        conn.execute(insert(BookingDB), [
+            {"id": f"seed-{i}", "user_id": i % rows + 1, "items": [], "total_amount": 100, "currency": "USD",
+             "status": "confirmed", "created_at": now - timedelta(minutes=i), "updated_at": now}
+            for i in range(rows)
+        ])
+        conn.execute(insert(TripDB), [
+            {"org_id": 1, "traveler_id": i % rows + 1, "start_date": now, "end_date": now + timedelta(days=2),
+             "status": "upcoming", "trip_title": f"Trip {i}", "created_at": now - timedelta(minutes=i), "updated_at": now}
+            for i in range(rows)
+        ])
+        conn.execute(insert(ApiKeyUsageDB), [
+            {"api_key_id": api_key_id, "endpoint": "/bookings", "method": "POST", "response_code": 200,
+             "created_at": now - timedelta(seconds=i)}
+            for i in range(rows)
+        ])
+
+
+class StatementCapture:
+    """Distinct statements sent to the driver, with the first parameters seen and the routes that sent them"""
+
+    def __init__(self, engines: dict):
+        self.engines = engines
+        self.route = "<setup>"
+        self.statements: Dict[tuple, dict] = {}
+
+    def _listener(self, engine_name: str):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if executemany or not statement.lstrip().lower().startswith(EXPLAINED):
+                return
+            entry = self.statements.setdefault((engine_name, statement), {"parameters": parameters, "routes": []})
+            if self.route not in entry["routes"]:
+                entry["routes"].append(self.route)
+
+        return before_cursor_execute
+
+    def __enter__(self):
+        self._listeners = [(engine, self._listener(name)) for name, engine in self.engines.items()]
+        for engine, listener in self._listeners:
+            event.listen(engine, "before_cursor_execute", listener)
+        return self
+
+    def __exit__(self, *exc):
+        for engine, listener in self._listeners:
+            event.remove(engine, "before_cursor_execute", listener)
+
+
+def exercise_routes(client, capture: StatementCapture, sync_engine, seed_rows: int) -> Dict[str, int]:
+    """Call every router endpoint that touches the database; route template -> status code"""
+    from pagination import NEXT_CURSOR_HEADER
+
+    statuses = {}
+
+    def call(method: str, route: str, path: Optional[str] = None, **kwargs):
+        capture.route = f"{method} {route}"
+        response = client.request(method, path or route, **kwargs)
+        statuses[capture.route] = response.status_code
+        return response
+
+    def paged(route: str, **kwargs):
+        response = call("GET", route, params={"limit": 5}, **kwargs)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor:
+            call("GET", route, params={"limit": 5, "cursor": cursor}, **kwargs)
+        return response
+
+    bootstrap = call("POST", "/api-keys/bootstrap")
+    admin = None
+    if bootstrap.status_code == 200:
+        key = bootstrap.json()
+        admin = {"Authorization": f"Bearer {key['api_key']}:{key['api_secret']}"}
+        if seed_rows:
+            capture.route = "<seed>"
+            seed(sync_engine, seed_rows, key["id"])
+
+    email = f"audit-{uuid.uuid4().hex[:8]}@audit.example"
+    call("POST", "/auth/initiate-registration", json={"email": email})
+    call("POST", "/auth/register", json={"email": email, "password": PASSWORD})
+    login = call("POST", "/auth/login", json={"email": email, "password": PASSWORD})
+    session = {}
+    if login.status_code == 200:
+        session = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    call("GET", "/auth/me", headers=session)
+    call("PUT", "/auth/profile", headers=session,
+         json={"full_name": "Audit User", "role": "Traveler", "company_name": "Audit", "team_size": "1-10"})
+
+    policy = call("POST", "/policies", json={"name": f"Audit {email}",
+                                             "rules": [{"key": "hotel.max_nightly_rate", "op": "<=", "value": "250"}]})
+    paged("/policies")
+    if policy.status_code == 200:
+        policy_id = policy.json()["id"]
+        call("POST", "/policies/{policy_id}/publish", f"/policies/{policy_id}/publish")
+        call("POST", "/policies/{policy_id}/evaluate", f"/policies/{policy_id}/evaluate",
+             json={"columns": {"mode": ["hotels", "flights"], "price": [180, 320], "nightly_rate": [180, None]}})
+
+    booking = {"traveler_email": "traveler1@audit.example",
+               "items": [{"id": "flights-audit", "mode": "flights", "price": 250, "currency": "USD"}]}
+    call("POST", "/bookings", json=booking, headers={**session, "X-Request-Id": str(uuid.uuid4())})
+    call("POST", "/bookings/batch", json={"bookings": [booking, {**booking, "traveler_email": email}]})
+
+    paged("/trips")
+    travelers = paged("/travelers")
+    if travelers.status_code == 200 and travelers.json():
+        traveler_id = travelers.json()[0]["id"]
+        call("GET", "/travelers/{traveler_id}", f"/travelers/{traveler_id}")
+        call("PUT", "/travelers/{traveler_id}", f"/travelers/{traveler_id}", json={"email": travelers.json()[0]["email"]})
+
+    today = date.today()
+    window = {"from": (today - timedelta(days=30)).isoformat(), "to": today.isoformat()}
+    call("GET", "/reports/spend", params={"group_by": "traveler,mode,policy"})
+    call("GET", "/reports/compliance", params={"group_by": "day"})
+    for kind in ("bookings", "trips"):
+        call("GET", "/reports/export/{kind}", f"/reports/export/{kind}", params=window)
+
+    if admin is not None:
+        generated = call("POST", "/api-keys/generate", params={"app_name": "audit"}, headers=admin)
+        paged("/api-keys/", headers=admin)
+        if generated.status_code == 200:
+            key_id = generated.json()["id"]
+            call("GET", "/api-keys/{api_key_id}", f"/api-keys/{key_id}", headers=admin)
+            call("PUT", "/api-keys/{api_key_id}/toggle", f"/api-keys/{key_id}/toggle", headers=admin)
+        call("GET", "/api-keys/my/status", headers=admin)
+    return statuses
+
+
+def full_scans(dialect: str, plan: List[dict]) -> List[str]:
+    """Tables the plan reads in full"""
+    tables = []
+    for row in plan:
+        if dialect == "sqlite":
+            match = _SQLITE_SCAN.match(row["detail"])
+            if match:
+                tables.append(match.group(1))
+        elif dialect == "mysql":
+            if row.get("type") == "ALL" and row.get("table") and not row["table"].startswith("<"):
+                tables.append(row["table"])
+        else:
+            tables.extend(_POSTGRES_SCAN.findall(next(iter(row.values()))))
+    return tables
+
+
+def describe(dialect: str, row: dict) -> str:
+    if dialect == "sqlite":
+        return row["detail"]
+    if dialect == "mysql":
+        return f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}"
+    return next(iter(row.values())).strip()
+
+
+async def explain_async(engine, statement: str, parameters) -> List[dict]:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(explain_prefix(engine.dialect.name) + statement, parameters)
+        return [dict(row._mapping) for row in result]
+
+
+def explain_sync(engine, statement: str, parameters) -> List[dict]:
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(explain_prefix(engine.dialect.name) + statement, parameters)
+        return [dict(row._mapping) for row in result]
+
+
+def explain_prefix(dialect: str) -> str:
+    return "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+
+
+def explain_all(capture: StatementCapture, sync_engine, async_engine) -> dict:
+    dialect = sync_engine.dialect.name
+    loop = asyncio.new_event_loop()
+    scans, errors, explained = [], [], 0
+    try:
+        for (engine_name, statement), entry in capture.statements.items():
+            sql = " ".join(statement.split())
+            try:
+                if engine_name == "async":
+                    plan = loop.run_until_complete(explain_async(async_engine, statement, entry["parameters"]))
+                else:
+                    plan = explain_sync(sync_engine, statement, entry["parameters"])
+            except DBAPIError as exc:
+                errors.append({"routes": entry["routes"], "statement": sql, "error": str(exc.orig)})
+                continue
+            explained += 1
+            for table in full_scans(dialect, plan):
+                scans.append({"table": table, "routes": entry["routes"], "statement": sql,
+                              "plan": [describe(dialect, row) for row in plan]})
+    finally:
+        loop.run_until_complete(async_engine.dispose())
+        loop.close()
+    return {"explained": explained, "full_scans": scans, "errors": errors}
+
+
+def run(schema: str = "models", seed_rows: int = 1000) -> dict:
+    """Audit the database at DATABASE_URL, which should be an empty scratch database"""
+    from fastapi.testclient import TestClient
+    from db import async_engine, engine
+    from main import app
+
+    loaded = load_schema(engine, schema)
+    capture = StatementCapture({"sync": engine, "async": async_engine.sync_engine})
+    with capture, TestClient(app, raise_server_exceptions=False) as client:
+        statuses = exercise_routes(client, capture, engine, seed_rows if schema == "models" else 0)
+    report = explain_all(capture, engine, async_engine)
+    tables = sorted({scan["table"] for scan in report["full_scans"]})
+    logger.info("%d statements explained, %d full scans (%s), %d errors", report["explained"],
+                len(report["full_scans"]), ", ".join(tables) or "none", len(report["errors"]))
+    return {"database": engine.dialect.name, "schema": schema, "loaded": loaded, "requests": statuses, **report}
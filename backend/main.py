@@ -1,16 +1,43 @@
 import logging
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
-from db import get_db, engine, Base
+from config import SCHEMA_CHECK_ON_STARTUP
+from db import engine
 from models import Policy  # etc.
+import migrations
+from health import database_health
+from auth_cache import last_used_writer
+from usage_recorder import UsageLoggingMiddleware, usage_recorder
+from password_hashing import password_hasher
+from observability import MetricsMiddleware, http_metrics, http_request_log, metrics_exclude_paths
+from sql_instrumentation import QueryTrackingMiddleware, sql_metrics
 
 # Import routers
-from routers import auth, policies, booking, trips, travelers, search, arranger, notifications, reports
+from routers import auth, policies, booking, trips, travelers, search, arranger, notifications, reports, api_keys, internal
 
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI(title="LaaSyCorpTravel-MVP APIs")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEMA_CHECK_ON_STARTUP:
+        # One query against schema_migrations; fails the worker before it takes traffic
+        migrations.check(engine)
+    usage_recorder.start()
+    password_hasher.start()
+    if http_request_log is not None:
+        http_request_log.start()
+    yield
+    password_hasher.stop()
+    if http_request_log is not None:
+        http_request_log.stop()
+    # Flush queued API usage rows before the worker exits
+    usage_recorder.stop()
+    # Persist any coalesced API key last_used timestamps before the worker exits
+    last_used_writer.flush()
+
+app = FastAPI(title="LaaSyCorpTravel-MVP APIs", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,15 +48,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Record API key usage (with response codes) after each response
+app.add_middleware(UsageLoggingMiddleware, recorder=usage_recorder)
+
+# Attribute SQL statements to the request: Server-Timing header, per-route DB metrics, N+1 warnings
+app.add_middleware(QueryTrackingMiddleware, metrics=sql_metrics)
+
+# Outermost: time every request end to end and emit its http_request log line
+app.add_middleware(MetricsMiddleware, metrics=http_metrics, request_log=http_request_log, exclude_paths=metrics_exclude_paths)
+
+# Tables are created and migrated by `python manage.py init-db`, not on every worker boot
 
-@app.get("/healthz")
-def health_check(db=Depends(get_db)):
-    # simple test query to verify RDS connection
-    db.execute(text("SELECT 1"))
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is serving requests; touches no dependencies"""
     return {"status": "ok"}
 
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: database reachable, checked at most once per READINESS_CACHE_SECONDS"""
+    status = await database_health.check()
+    return JSONResponse(status, status_code=200 if database_health.ok else 503)
+
+# Kept for existing probes; same cached check as /readyz
+app.add_api_route("/healthz", readiness, methods=["GET"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(http_metrics.render() + sql_metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(policies.router, prefix="/policies", tags=["policies"])
@@ -40,3 +88,5 @@ app.include_router(search.router, prefix="/search", tags=["search"])
 app.include_router(arranger.router, prefix="/arranger", tags=["arranger"])
 app.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 app.include_router(reports.router, prefix="/reports", tags=["reports"])
+app.include_router(api_keys.router, prefix="/api-keys", tags=["api-keys"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
@@ -0,0 +1,78 @@
+"""
+Operational commands.
+
+    cd backend
+    python manage.py init-db
+    python manage.py audit-indexes [--schema devcorptravel --database-url mysql+pymysql://...]
+    python manage.py rebuild-rollups [--org-id 1] [--from 2025-10-01 --to 2025-10-31]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+from datetime import date
+
+
+def init_db(args):
+    import migrations
+    from db import engine
+
+    return migrations.upgrade(engine, target=args.target)
+
+
+def audit_indexes(args):
+    # Never the configured DATABASE_URL: the audit seeds rows and calls every write endpoint
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "audit.db")
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["HTTP_LOG_ENABLED"] = "false"  # access log lines would interleave with the JSON report
+    os.environ["API_KEY_BOOTSTRAP_ENABLED"] = "true"  # the audit mints its admin key through the endpoint
+    os.environ.setdefault("APP_ENV", "development")
+    import index_audit
+
+    try:
+        return index_audit.run(schema=args.schema, seed_rows=args.seed_rows)
+    except ValueError as exc:
+        raise SystemExit(f"audit-indexes: {exc}")
+
+
+def rebuild_rollups(args):
+    import rollups
+    from db import SessionLocal
+
+    return rollups.rebuild(SessionLocal, org_id=args.org_id, start=args.start, end=args.end, batch_size=args.batch_size)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init-db", help="create the schema / apply pending migrations (run before deploying)")
+    init.add_argument("--target", type=int, default=None, help="stop at this schema version (default: latest)")
+    init.set_defaults(handler=init_db)
+
+    audit = commands.add_parser("audit-indexes", help="EXPLAIN every router query on a seeded scratch database, report full scans")
+    audit.add_argument("--database-url", default=None, help="empty scratch database (default: temp SQLite file)")
+    audit.add_argument("--schema", choices=["models", "mysql-init", "devcorptravel"], default="models",
+                       help="SQLAlchemy models via migrations, or one of the MySQL schema scripts (MySQL only)")
+    audit.add_argument("--seed-rows", type=int, default=1000, help="users, trips, bookings and usage rows to seed")
+    audit.set_defaults(handler=audit_indexes)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="recompute booking_rollups_daily from booking_items")
+    rebuild.add_argument("--org-id", type=int, default=None)
+    rebuild.add_argument("--from", dest="start", type=date.fromisoformat, default=None, help="first day (inclusive)")
+    rebuild.add_argument("--to", dest="end", type=date.fromisoformat, default=None, help="last day (inclusive)")
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    args = parse_args(argv)
+    print(json.dumps(args.handler(args), default=str))
+
+
+if __name__ == "__main__":
+    main()
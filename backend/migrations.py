@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+from db import Base
+import booking_items
+import models  # noqa: F401  (registers every table on Base.metadata)
+from models import ApiKeyUsageDB, SchemaMigrationDB, TripDB, UserDB
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _baseline(conn: Connection) -> None:
+    # Creates whatever tables are missing, so databases built by the old import-time create_all adopt it as-is
+    Base.metadata.create_all(bind=conn)
+
+
+def _index(table, name: str):
+    return next(index for index in table.indexes if index.name == name)
+
+
+# Access paths found by `python manage.py audit-indexes`
+HOT_PATH_INDEXES = [
+    _index(UserDB.__table__, "ix_users_email_id"),
+    _index(ApiKeyUsageDB.__table__, "ix_api_key_usage_key_created_at"),
+    _index(TripDB.__table__, "ix_trips_traveler_created_at_id"),
+]
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    for index in HOT_PATH_INDEXES:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _declared_indexes(conn: Connection) -> None:
+    # create_all never adds indexes to tables that already exist, so databases that adopted the
+    # baseline lack every index declared after their tables were created (e.g. the keyset ones)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _booking_items(conn: Connection) -> None:
+    # Bookings created before booking_items existed only have their items as JSON on the booking
+    booking_items.backfill(conn)
+
+
+# Applied in order by `python manage.py init-db` before a deploy, never at import or worker startup.
+# Each one runs in its own transaction and is recorded in schema_migrations; workers only compare
+# that version with SCHEMA_VERSION (SCHEMA_CHECK_ON_STARTUP) instead of reflecting every table.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "hot path indexes", _hot_path_indexes),
+    Migration(3, "every declared index", _declared_indexes),
+    Migration(4, "booking_items from bookings.items", _booking_items),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+class SchemaVersionMismatch(RuntimeError):
+    pass
+
+
+def current_version(conn: Connection) -> int:
+    """Highest applied migration; 0 for a database that was never migrated"""
+    if not inspect(conn).has_table(SchemaMigrationDB.__tablename__):
+        return 0
+    return conn.scalar(select(func.max(SchemaMigrationDB.version))) or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> dict:
+    target = SCHEMA_VERSION if target is None else target
+    with engine.connect() as conn:
+        start = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if start < migration.version <= target:
+            with engine.begin() as conn:
+                logger.info("Applying migration %d: %s", migration.version, migration.name)
+                migration.apply(conn)
+                SchemaMigrationDB.__table__.create(bind=conn, checkfirst=True)
+                conn.execute(SchemaMigrationDB.__table__.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+                ))
+            applied.append(migration.version)
+    return {"from": start, "to": max([start, *applied]), "applied": applied}
+
+
+def check(engine: Engine) -> int:
+    """The database's schema version; raises SchemaVersionMismatch unless it is SCHEMA_VERSION"""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionMismatch(
+            f"Database schema is at version {version}, this build expects {SCHEMA_VERSION}; "
+            "run `python manage.py init-db`"
+        )
+    return version
@@ -1,8 +1,9 @@
-from pydantic import BaseModel
-from typing import List, Literal, Optional, Dict, Any
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, Boolean, ForeignKey
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any, Union
+from sqlalchemy import Column, Integer, String, Float, Numeric, Date, DateTime, Text, JSON, Boolean, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from db import Base
+from config import BOOKING_BATCH_MAX_SIZE
 
 Mode = Literal["flights", "hotels", "cars"]
 
@@ -43,6 +44,27 @@ class PolicyCreate(BaseModel):
     name: str
     rules: List[PolicyRule]
 
+class PolicyEvaluateRequest(BaseModel):
+    # Columnar offers: "mode" and "price" plus any detail fields the rules read (cabin, nightly_rate, ...)
+    columns: Dict[str, List[Any]]
+    encoding: Literal["bitmap", "list"] = "bitmap"
+
+class PolicyRuleViolations(BaseModel):
+    key: str
+    op: str
+    value: str
+    violations: int
+    mask: Union[str, List[bool]]
+
+class PolicyEvaluateResponse(BaseModel):
+    policyId: int
+    versionId: Optional[int] = None
+    count: int
+    compliantCount: int
+    # "bitmap" encoding: base64, 8 offers per byte, offer 0 in the lowest bit of byte 0
+    compliant: Union[str, List[bool]]
+    rules: List[PolicyRuleViolations]
+
 class Offer(BaseModel):
     id: str
     mode: Mode
@@ -51,6 +73,7 @@ class Offer(BaseModel):
     price: float
     currency: str = "USD"
     policyStatus: Literal["in", "out"] = "in"
+    policyReasons: Optional[List[str]] = None
     details: Optional[Dict[str, Any]] = None
 
 class SearchParams(BaseModel):
@@ -66,13 +89,32 @@ class BookingItem(BaseModel):
     mode: Mode
     price: float
     currency: str = "USD"
+    # Set by create_booking from the org policy; a client may send "out" (e.g. from the offer) but not "in"
+    policyStatus: Optional[Literal["in", "out"]] = None
+    details: Optional[Dict[str, Any]] = None
 
 class BookingRequest(BaseModel):
+    # Traveler to book for; defaults to the signed-in user (or, without a session token, the first user)
+    traveler_email: Optional[str] = None
     items: List[BookingItem]
 
 class BookingResponse(BaseModel):
     id: str
 
+class BookingBatchRequest(BaseModel):
+    bookings: List[BookingRequest] = Field(..., min_length=1, max_length=BOOKING_BATCH_MAX_SIZE)
+
+class BookingBatchResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: Literal["created", "error"]
+    error: Optional[str] = None
+
+class BookingBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBatchResult]
+
 class Trip(BaseModel):
     id: str
     traveler: str
@@ -85,6 +127,11 @@ class Trip(BaseModel):
 # SQLAlchemy Database Models
 class UserDB(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Login / registration lookups and booking's email IN (...) ORDER BY id
+        Index("ix_users_email_id", "email", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     org_id = Column(Integer, nullable=False)
@@ -104,6 +151,7 @@ class UserDB(Base):
 
 class PolicyDB(Base):
     __tablename__ = "policies"
+    __table_args__ = (Index("ix_policies_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     org_id = Column(Integer, nullable=False)
@@ -115,6 +163,33 @@ class PolicyDB(Base):
     
     # Relationships
     bookings = relationship("BookingDB", back_populates="policy")
+    versions = relationship("PolicyVersionDB", back_populates="policy")
+
+
+class PolicyVersionDB(Base):
+    __tablename__ = "policy_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    policy_id = Column(Integer, ForeignKey("policies.id"), nullable=False)
+    version_num = Column(Integer, nullable=False)
+    status = Column(String(40), default="draft")
+
+    # Relationships
+    policy = relationship("PolicyDB", back_populates="versions")
+    rules = relationship("PolicyRuleDB", back_populates="version")
+
+
+class PolicyRuleDB(Base):
+    __tablename__ = "policy_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    policy_version_id = Column(Integer, ForeignKey("policy_versions.id"), nullable=False)
+    rule_key = Column(String(120))
+    rule_op = Column(String(8))
+    rule_value = Column(String(255))
+
+    # Relationships
+    version = relationship("PolicyVersionDB", back_populates="rules")
 
 
 class BookingDB(Base):
@@ -123,7 +198,7 @@ class BookingDB(Base):
     id = Column(String(50), primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     policy_id = Column(Integer, ForeignKey("policies.id"), nullable=True)
-    items = Column(JSON, nullable=False)  # Store booking items as JSON
+    items = Column(JSON, nullable=False)  # Booking items as submitted; booking_items holds the queryable copy
     total_amount = Column(Float, nullable=False)
     currency = Column(String(3), default="USD")
     status = Column(String(50), default="confirmed")
@@ -133,11 +208,54 @@ class BookingDB(Base):
     # Relationships
     user = relationship("UserDB", back_populates="bookings")
     policy = relationship("PolicyDB", back_populates="bookings")
+    line_items = relationship("BookingItemDB", back_populates="booking")
     # trips = relationship("TripDB", back_populates="booking")  # Removed due to schema mismatch
 
 
+class BookingItemDB(Base):
+    """One row per booked item, written with the booking (see booking_items.py)"""
+    __tablename__ = "booking_items"
+    __table_args__ = (
+        Index("ix_booking_items_booking_id", "booking_id"),
+        Index("ix_booking_items_mode_in_policy", "mode", "is_in_policy"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    booking_id = Column(String(50), ForeignKey("bookings.id"), nullable=False)
+    mode = Column(String(20), nullable=False)
+    supplier_ref = Column(String(200))
+    is_in_policy = Column(Boolean, nullable=False, default=True)
+    price_amount = Column(Numeric(12, 2), nullable=False)
+    price_currency = Column(String(3), nullable=False, default="USD")
+    item_json = Column(JSON)
+
+    booking = relationship("BookingDB", back_populates="line_items")
+
+
+class BookingRollupDB(Base):
+    """Daily booking item totals, maintained incrementally by create_booking (see rollups.py)"""
+    __tablename__ = "booking_rollups_daily"
+    __table_args__ = (
+        UniqueConstraint("org_id", "day", "mode", "in_policy", "user_id", "policy_id", "currency",
+                         name="uq_booking_rollups_daily"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    mode = Column(String(20), nullable=False)
+    in_policy = Column(Boolean, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    # 0 when the booking had no policy: NULLs would never collide in the unique key
+    policy_id = Column(Integer, nullable=False, default=0)
+    currency = Column(String(3), nullable=False, default="USD")
+    item_count = Column(Integer, nullable=False, default=0)
+    amount_total = Column(Float, nullable=False, default=0)
+
+
 class TripDB(Base):
     __tablename__ = "trips"
+    __table_args__ = (Index("ix_trips_traveler_created_at_id", "traveler_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     org_id = Column(Integer, nullable=False)
@@ -157,6 +275,7 @@ class TripDB(Base):
 
 class ApiKeyDB(Base):
     __tablename__ = "api_keys"
+    __table_args__ = (Index("ix_api_keys_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     app_name = Column(String(255), nullable=False)
@@ -176,6 +295,7 @@ class ApiKeyDB(Base):
 
 class ApiKeyUsageDB(Base):
     __tablename__ = "api_key_usage"
+    __table_args__ = (Index("ix_api_key_usage_key_created_at", "api_key_id", "created_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     api_key_id = Column(Integer, ForeignKey("api_keys.id"), nullable=False)
@@ -188,3 +308,24 @@ class ApiKeyUsageDB(Base):
     
     # Relationships
     api_key = relationship("ApiKeyDB", foreign_keys=[api_key_id])
+
+
+class IdempotencyKeyDB(Base):
+    """Stored responses of mutating requests by X-Request-Id (IDEMPOTENCY_BACKEND=database, see idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    # NULL while the original request is still executing
+    response = Column(JSON(none_as_null=True), nullable=True)
+    created_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class SchemaMigrationDB(Base):
+    """Migrations applied to this database (see migrations.py); the highest version is the schema version"""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, nullable=False)
@@ -0,0 +1,219 @@
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, FrozenSet, List, Optional, TextIO, Tuple
+
+from config import HTTP_LOG_ENABLED, HTTP_LOG_EXCLUDE_PATHS
+
+# Upper bounds in seconds; the +Inf bucket is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests that matched no route share one label, so random 404 paths cannot blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestLogWriter:
+    """
+    Write-behind http_request log: requests append a dict, a background thread formats the
+    JSON lines and writes them to the stream in batches. Lines match what a JSON logging
+    handler would emit, with the entry as an object under "message" (CloudWatch: message.<field>).
+    When more than `max_pending` lines are waiting, new ones are dropped and counted.
+    """
+
+    def __init__(self, stream: TextIO, flush_interval: float = 0.25, max_pending: int = 100000):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Deque[Tuple[float, dict]] = deque()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, entry: dict) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        # deque.append is atomic, so the request path takes no lock
+        self._pending.append((time.time(), entry))
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._wake.set()
+            thread.join(timeout)
+        self.flush()
+
+    def flush(self) -> None:
+        lines = []
+        while self._pending:
+            created, entry = self._pending.popleft()
+            lines.append(json.dumps({
+                "timestamp": datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": "INFO",
+                "logger": "http.request",
+                "message": entry,
+            }, separators=(",", ":"), default=str))
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+            except (OSError, ValueError):
+                self.dropped += len(lines)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "written": self.written, "dropped": self.dropped}
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "total", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+class HttpMetrics:
+    """
+    Per (method, route template) latency histogram and status counts, plus an in-flight gauge.
+    Updated from the event loop thread only, so the hot path is a bisect and a few increments.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        stats = self._routes.get((method, route))
+        if stats is None:
+            stats = self._routes[(method, route)] = _RouteStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.count += 1
+        stats.total += seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines: List[str] = [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Completed requests by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        routes = sorted(self._routes.items())
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        self._routes.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request to the end of its response body.
+    Routes are labelled by template (/policies/{policy_id}), read from the scope after routing.
+    Emits one http_request JSON log line per request unless its path is excluded.
+    """
+
+    def __init__(self, app, metrics: HttpMetrics, request_log: Optional[RequestLogWriter] = None,
+                 exclude_paths: FrozenSet[str] = frozenset()):
+        self.app = app
+        self.metrics = metrics
+        self.request_log = request_log
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_flight -= 1
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.metrics.observe(scope["method"], template, status_code, elapsed)
+            if self.request_log is not None and scope["path"] not in self.exclude_paths:
+                self.request_log.record(self._log_entry(scope, template, status_code, elapsed))
+
+    @staticmethod
+    def _log_entry(scope, template: str, status_code: int, elapsed: float) -> dict:
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        client = scope.get("client")
+        entry = {
+            "event": "http_request",
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": template,
+            "status": status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "request_id": request_id,
+            "client_ip": client[0] if client else None,
+        }
+        # Set by sql_instrumentation.QueryTrackingMiddleware when SQL instrumentation is on
+        sql = scope.get("state", {}).get("sql")
+        if sql is not None:
+            entry["db_queries"] = sql.count
+            entry["db_ms"] = round(sql.seconds * 1000, 2)
+        return entry
+
+
+http_metrics = HttpMetrics()
+http_request_log = RequestLogWriter(sys.stdout) if HTTP_LOG_ENABLED else None
+metrics_exclude_paths = frozenset(HTTP_LOG_EXCLUDE_PATHS)
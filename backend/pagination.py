@@ -0,0 +1,123 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.sql import ColumnElement, Select
+
+from config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from fast_json import typed_response
+
+# API field name -> (columns it needs, function building the value from a result row)
+FieldSpec = Tuple[Sequence[ColumnElement], Callable[[Any], Any]]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: Any) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(created_at) if created_at else None), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@dataclass
+class PageParams:
+    limit: int
+    after: Optional[Tuple[Optional[datetime], Any]]
+    fields: Optional[List[str]]
+
+
+def page_params(
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of response fields"),
+) -> PageParams:
+    return PageParams(
+        limit=limit,
+        after=decode_cursor(cursor) if cursor else None,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+    )
+
+
+class KeysetPager:
+    """
+    Keyset pagination on (created_at, id), ascending, with SQL-side projections.
+    Only the columns behind the requested fields (plus the keyset columns) are selected,
+    and rows come back as plain Row tuples rather than ORM objects.
+    NULL created_at rows sort first, as they do on MySQL and SQLite.
+    """
+
+    def __init__(self, created_col: ColumnElement, id_col: ColumnElement, fields: Dict[str, FieldSpec]):
+        self.created_col = created_col
+        self.id_col = id_col
+        self.fields = fields
+
+    def selected_fields(self, page: PageParams) -> List[str]:
+        if page.fields is None:
+            return list(self.fields)
+        unknown = [f for f in page.fields if f not in self.fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return page.fields
+
+    def statement(self, page: PageParams, *criteria) -> Select:
+        columns = {self.created_col.key: self.created_col, self.id_col.key: self.id_col}
+        for name in self.selected_fields(page):
+            for column in self.fields[name][0]:
+                columns.setdefault(column.key, column)
+        stmt = select(*columns.values()).where(*criteria)
+
+        if page.after is not None:
+            created_at, row_id = page.after
+            if created_at is None:
+                stmt = stmt.where(or_(
+                    and_(self.created_col.is_(None), self.id_col > row_id),
+                    self.created_col.is_not(None),
+                ))
+            else:
+                # The leading >= gives the planner an index range on created_at; the OR breaks ties on id
+                stmt = stmt.where(
+                    self.created_col >= created_at,
+                    or_(self.created_col > created_at, self.id_col > row_id),
+                )
+        # One extra row tells us whether there is a next page
+        return stmt.order_by(self.created_col, self.id_col).limit(page.limit + 1)
+
+    def page(self, rows: Sequence[Any], page: PageParams) -> Tuple[List[dict], Optional[str]]:
+        rows = list(rows)
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, self.created_col.key), getattr(last, self.id_col.key))
+        names = self.selected_fields(page)
+        items = [{name: self.fields[name][1](row) for name in names} for row in rows]
+        return items, next_cursor
+
+
+def page_response(items: List[dict], next_cursor: Optional[str], page: PageParams, response: Response,
+                  item_type: Any = Dict[str, Any]):
+    """
+    Body stays a plain list; the next cursor goes in a header.
+    Projected pages are returned as JSONResponse so a full response_model does not reject them.
+    Full pages are serialized as List[item_type] (the route's response_model) on the fast JSON path.
+    """
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if page.fields is not None:
+        # Carry over headers other dependencies set (e.g. rate limits), minus the empty body's length
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        return JSONResponse(items, headers=headers)
+    return typed_response(List[item_type], items, response)
@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import hmac
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException
+
+from config import (BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_NICENESS,
+                    PASSWORD_HASH_RETRY_AFTER_SECONDS, PASSWORD_HASH_WORKERS)
+
+BCRYPT_PREFIXES = ("$2b$", "$2a$", "$2y$")
+
+
+# Run in the worker processes; module-level so they pickle by reference
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _warm() -> None:
+    return None
+
+
+def _init_worker(niceness: int) -> None:
+    # Lower priority: when cores are scarce the scheduler favours the event loop over a login burst
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def is_bcrypt(password_hash: str) -> bool:
+    return password_hash.startswith(BCRYPT_PREFIXES)
+
+
+def legacy_sha256_matches(password: str, password_hash: str) -> bool:
+    # Demo users seeded before bcrypt; constant-time compare of the hex digest
+    return hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), password_hash)
+
+
+class PasswordHasher:
+    """
+    bcrypt in a dedicated process pool, so a login burst burns those processes' CPU and not the
+    event loop's or the shared threadpool's. At most `max_pending` hashes run or wait at once;
+    beyond that callers get 503 with Retry-After instead of queueing without bound.
+    workers=0 runs hashes on the default threadpool (no extra processes).
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int, retry_after: float, niceness: int = 0):
+        self.workers = workers
+        self.niceness = niceness
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_ms = 0.0
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._executor is not None:
+            return
+        # spawn: children import only this module, not a copy of the forked server and its threads
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(self.niceness,))
+        for _ in range(self.workers):
+            self._executor.submit(_warm)
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many concurrent logins, retry shortly",
+                headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            if self.workers > 0:
+                self.start()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    async def hash(self, password: str) -> str:
+        return (await self._run(_hash, password.encode("utf-8"), self.rounds)).decode("utf-8")
+
+    async def verify(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash); a matching legacy sha256 hash comes back rehashed with bcrypt"""
+        if is_bcrypt(password_hash):
+            return await self._run(_check, password.encode("utf-8"), password_hash.encode("utf-8")), None
+        if not legacy_sha256_matches(password, password_hash):
+            return False, None
+        self.rehashed += 1
+        return True, await self.hash(password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "niceness": self.niceness,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_ms": round(self.total_ms / self.completed, 1) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, BCRYPT_ROUNDS, PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    niceness=PASSWORD_HASH_NICENESS,
+)
@@ -0,0 +1,158 @@
+import base64
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from models import Offer
+from policy_engine import CompiledPolicy, CompiledRule, _number, rule_modes
+
+# Columns every batch must carry; any other column is an offer field (details key) that rules may read
+REQUIRED_COLUMNS = ("mode", "price")
+
+NUMPY_COMPARATORS = {
+    "<=": np.less_equal,
+    "<": np.less,
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "==": np.equal,
+}
+
+
+def prepare_columns(columns: Dict[str, Sequence[Any]]) -> Dict[str, np.ndarray]:
+    """
+    Convert list columns to typed arrays once (float64 with NaN, or str with "" for missing values),
+    for callers that keep offers in columnar form and evaluate them repeatedly.
+    Meant for homogeneous columns; mixed-type columns (e.g. bools among numbers) should stay lists.
+    """
+    arrays = {}
+    for name, values in columns.items():
+        try:
+            arrays[name] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            arrays[name] = np.array(["" if v is None else str(v) for v in values])
+    return arrays
+
+
+def columns_from_offers(offers: Sequence[Offer], fields: Sequence[str]) -> Dict[str, List[Any]]:
+    """Columnar view of offers: mode, price and the requested detail fields (None where missing)"""
+    columns: Dict[str, List[Any]] = {
+        "mode": [o.mode for o in offers],
+        "price": [o.price for o in offers],
+    }
+    for name in fields:
+        if name not in columns:
+            columns[name] = [(o.details or {}).get(name) for o in offers]
+    return columns
+
+
+class ColumnView:
+    """Lazily converted numpy views of one column, shared by every rule that reads it"""
+
+    def __init__(self, values: Sequence[Any]):
+        self.values = values
+        self._numbers = None
+        self._strings = None
+
+    def numbers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(float64 values, missing mask); unparseable values are NaN but not missing, so they fail"""
+        if self._numbers is None:
+            try:
+                # C fast path: None becomes NaN, numeric strings are parsed
+                numbers = np.array(self.values, dtype=np.float64)
+                self._numbers = numbers, np.isnan(numbers)
+            except (TypeError, ValueError):
+                parsed = [_number(v) for v in self.values]
+                missing = np.fromiter((v is None or v == "" or (p is not None and math.isnan(p))
+                                       for v, p in zip(self.values, parsed)), dtype=bool, count=len(parsed))
+                numbers = np.array([np.nan if p is None else p for p in parsed], dtype=np.float64)
+                self._numbers = numbers, missing
+        return self._numbers
+
+    def strings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(str() of every value, missing mask)"""
+        if self._strings is None:
+            strings = np.asarray(self.values)
+            if strings.dtype.kind == "U":
+                self._strings = strings, strings == ""
+            else:
+                objects = np.asarray(self.values, dtype=object)
+                # astype(str) calls str() on each object, matching CompiledRule.passes()
+                strings = objects.astype(str)
+                self._strings = strings, np.equal(objects, None) | (strings == "")
+        return self._strings
+
+
+@dataclass
+class BatchEvaluation:
+    compliant: np.ndarray
+    rules: List[CompiledRule]
+    violations: List[np.ndarray]
+
+    @property
+    def count(self) -> int:
+        return len(self.compliant)
+
+
+def evaluate_columns(policy: CompiledPolicy, columns: Dict[str, Sequence[Any]]) -> BatchEvaluation:
+    """
+    Apply every rule of `policy` to a columnar batch of offers with vectorized comparisons.
+    Same semantics as CompiledPolicy.violations(): a rule only applies to offers of its mode,
+    and offers without the rule's field (None, NaN or "") pass it. Columns may be lists or numpy arrays.
+    """
+    for name in REQUIRED_COLUMNS:
+        if name not in columns:
+            raise ValueError(f"Missing column: {name}")
+    count = len(columns["mode"])
+    for name, values in columns.items():
+        if len(values) != count:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {count}")
+
+    modes = np.asarray(columns["mode"])
+    mode_masks: Dict[Tuple[str, ...], np.ndarray] = {}
+    views: Dict[str, ColumnView] = {}
+    # A rule for several modes is listed under each of them; evaluate it once
+    rules: List[CompiledRule] = []
+    seen = set()
+    for mode_rules in policy.rules_by_mode.values():
+        for rule in mode_rules:
+            if id(rule) not in seen:
+                seen.add(id(rule))
+                rules.append(rule)
+
+    compliant = np.ones(count, dtype=bool)
+    violations = []
+    for rule in rules:
+        applies_to = rule_modes(rule.key)
+        applies = mode_masks.get(applies_to)
+        if applies is None:
+            applies = mode_masks[applies_to] = np.isin(modes, applies_to)
+        if rule.field not in columns:
+            violations.append(np.zeros(count, dtype=bool))
+            continue
+        view = views.get(rule.field)
+        if view is None:
+            view = views[rule.field] = ColumnView(columns[rule.field])
+
+        if isinstance(rule.operand, float):
+            values, missing = view.numbers()
+            passes = NUMPY_COMPARATORS[rule.op](values, rule.operand)
+        else:
+            values, missing = view.strings()
+            passes = np.isin(values, list(rule.operand)) if rule.op == "in" else values == rule.operand
+        mask = applies & ~missing & ~passes
+        violations.append(mask)
+        compliant &= ~mask
+
+    return BatchEvaluation(compliant=compliant, rules=rules, violations=violations)
+
+
+def encode_bitmap(mask: np.ndarray) -> str:
+    """Base64 of the mask packed 8 offers per byte, offer 0 in the lowest bit of byte 0"""
+    return base64.b64encode(np.packbits(mask, bitorder="little").tobytes()).decode("ascii")
+
+
+def decode_bitmap(data: str, count: int) -> np.ndarray:
+    packed = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    return np.unpackbits(packed, count=count, bitorder="little").astype(bool)
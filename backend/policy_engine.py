@@ -0,0 +1,242 @@
+import asyncio
+import math
+import operator
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from sqlalchemy import select
+
+from config import POLICY_CACHE_TTL_SECONDS
+from db import AsyncSessionLocal
+from models import Offer, PolicyDB, PolicyRuleDB, PolicyVersionDB
+
+# Rule keys are "<domain>.<name>"; the domain picks the offer mode the rule applies to
+DOMAINS = {
+    "flight": "flights", "flights": "flights", "air": "flights",
+    "hotel": "hotels", "hotels": "hotels",
+    "car": "cars", "cars": "cars",
+}
+ALL_MODES = ("flights", "hotels", "cars")
+
+# Rule names that read a differently named offer field; anything else reads details[<name>]
+FIELD_ALIASES = {
+    "max_price": "price",
+    "max_nightly_rate": "nightly_rate",
+    "max_daily_rate": "daily_rate",
+    "allowed_cabins": "cabin",
+    "allowed_carriers": "carrier",
+    "allowed_vehicle_classes": "vehicleClass",
+    "max_stops": "stops",
+    "max_duration_minutes": "durationMinutes",
+}
+
+COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "<=": operator.le,
+    "<": operator.lt,
+    ">=": operator.ge,
+    ">": operator.gt,
+    "==": operator.eq,
+}
+
+
+def rule_modes(key: str) -> Tuple[str, ...]:
+    domain, _, _ = key.partition(".")
+    mode = DOMAINS.get(domain.lower())
+    return (mode,) if mode else ALL_MODES
+
+
+def rule_field(key: str) -> str:
+    _, _, name = key.partition(".")
+    name = name or key
+    return FIELD_ALIASES.get(name, name)
+
+
+def offer_value(offer: Offer, field_name: str) -> Any:
+    if field_name == "price":
+        return offer.price
+    return (offer.details or {}).get(field_name)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """A rule with its operand parsed once: a float for comparisons, a frozenset for `in`"""
+    key: str
+    op: str
+    raw: str
+    field: str
+    operand: Union[float, str, FrozenSet[str]]
+
+    @classmethod
+    def compile(cls, key: str, op: str, raw: str) -> "CompiledRule":
+        if op == "in":
+            operand: Union[float, str, FrozenSet[str]] = frozenset(v.strip() for v in raw.split(",") if v.strip())
+        elif op in COMPARATORS:
+            number = _number(raw)
+            if number is None and op != "==":
+                raise ValueError(f"Rule {key} {op} needs a numeric value, got {raw!r}")
+            operand = number if number is not None else raw.strip()
+        else:
+            raise ValueError(f"Unsupported rule operator: {op}")
+        return cls(key=key, op=op, raw=raw, field=rule_field(key), operand=operand)
+
+    def passes(self, value: Any) -> bool:
+        if value is None or value == "":
+            # The offer does not carry this attribute, so the rule does not apply to it
+            return True
+        if self.op == "in":
+            return str(value) in self.operand
+        if isinstance(self.operand, float):
+            number = _number(value)
+            if number is not None and math.isnan(number):
+                return True
+            return number is not None and COMPARATORS[self.op](number, self.operand)
+        return str(value) == self.operand
+
+    def reason(self, value: Any) -> str:
+        return f"{self.key} {self.op} {self.raw} (offer has {value})"
+
+
+@dataclass
+class CompiledPolicy:
+    policy_id: Optional[int]
+    version_id: Optional[int]
+    rules_by_mode: Dict[str, List[CompiledRule]] = field(default_factory=dict)
+
+    @classmethod
+    def compile(cls, policy_id: Optional[int], version_id: Optional[int],
+                rules: List[Tuple[str, str, str]]) -> "CompiledPolicy":
+        compiled = cls(policy_id, version_id, {mode: [] for mode in ALL_MODES})
+        for key, op, raw in rules:
+            rule = CompiledRule.compile(key, op, raw)
+            for mode in rule_modes(key):
+                compiled.rules_by_mode[mode].append(rule)
+        return compiled
+
+    def violations(self, offer: Offer) -> List[str]:
+        reasons = []
+        for rule in self.rules_by_mode.get(offer.mode, ()):
+            value = offer_value(offer, rule.field)
+            if not rule.passes(value):
+                reasons.append(rule.reason(value))
+        return reasons
+
+    def annotate(self, offers: List[Offer]) -> List[Offer]:
+        """Copies of `offers` with policyStatus / policyReasons set (cached search results are shared, so never mutated)"""
+        annotated = []
+        for offer in offers:
+            reasons = self.violations(offer)
+            annotated.append(offer.model_copy(update={
+                "policyStatus": "out" if reasons else "in",
+                "policyReasons": reasons or None,
+            }))
+        return annotated
+
+
+EMPTY_POLICY = CompiledPolicy(None, None, {mode: [] for mode in ALL_MODES})
+
+
+class PolicyEngine:
+    """
+    Caches one compiled evaluator per org (its most recently updated published policy)
+    and per policy id. publish_policy calls invalidate(); the TTL covers other workers.
+    """
+
+    def __init__(self, session_factory, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.clock = clock
+        self._by_org: Dict[int, Tuple[float, CompiledPolicy]] = {}
+        self._by_policy: Dict[int, Tuple[float, CompiledPolicy]] = {}
+        self._lock = asyncio.Lock()
+        self.compiles = 0
+        self.hits = 0
+
+    def _cached(self, cache: dict, key: int) -> Optional[CompiledPolicy]:
+        entry = cache.get(key)
+        if entry is not None and self.clock() < entry[0]:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    async def for_org(self, org_id: int) -> CompiledPolicy:
+        compiled = self._cached(self._by_org, org_id)
+        if compiled is not None:
+            return compiled
+        async with self._lock:
+            compiled = self._cached(self._by_org, org_id)
+            if compiled is None:
+                async with self.session_factory() as db:
+                    policy_id = await db.scalar(
+                        select(PolicyDB.id)
+                        .where(PolicyDB.org_id == org_id, PolicyDB.status == "published")
+                        .order_by(PolicyDB.updated_at.desc(), PolicyDB.id.desc())
+                        .limit(1)
+                    )
+                    compiled = await self._load(db, policy_id) if policy_id is not None else EMPTY_POLICY
+                self._by_org[org_id] = (self.clock() + self.ttl, compiled)
+            return compiled
+
+    async def for_policy(self, policy_id: int) -> Optional[CompiledPolicy]:
+        """Compiled latest version of a policy (published or not); None if the policy does not exist"""
+        compiled = self._cached(self._by_policy, policy_id)
+        if compiled is not None:
+            return compiled
+        async with self._lock:
+            compiled = self._cached(self._by_policy, policy_id)
+            if compiled is None:
+                async with self.session_factory() as db:
+                    if await db.get(PolicyDB, policy_id) is None:
+                        return None
+                    compiled = await self._load(db, policy_id)
+            return compiled
+
+    async def _load(self, db, policy_id: int) -> CompiledPolicy:
+        # Prefer the newest published version; a draft-only policy compiles its newest draft
+        version = await db.scalar(
+            select(PolicyVersionDB)
+            .where(PolicyVersionDB.policy_id == policy_id)
+            .order_by((PolicyVersionDB.status == "published").desc(), PolicyVersionDB.version_num.desc())
+            .limit(1)
+        )
+        rules = []
+        if version is not None:
+            result = await db.execute(
+                select(PolicyRuleDB.rule_key, PolicyRuleDB.rule_op, PolicyRuleDB.rule_value)
+                .where(PolicyRuleDB.policy_version_id == version.id)
+                .order_by(PolicyRuleDB.id)
+            )
+            rules = [tuple(row) for row in result]
+        compiled = CompiledPolicy.compile(policy_id, version.id if version else None, rules)
+        self.compiles += 1
+        self._by_policy[policy_id] = (self.clock() + self.ttl, compiled)
+        return compiled
+
+    def invalidate(self, policy_id: Optional[int] = None, org_id: Optional[int] = None) -> None:
+        if policy_id is None:
+            self._by_policy.clear()
+        else:
+            self._by_policy.pop(policy_id, None)
+        if org_id is None:
+            self._by_org.clear()
+        else:
+            self._by_org.pop(org_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "orgs_cached": len(self._by_org),
+            "policies_cached": len(self._by_policy),
+            "compiles": self.compiles,
+            "hits": self.hits,
+            "ttl_seconds": self.ttl,
+        }
+
+
+policy_engine = PolicyEngine(AsyncSessionLocal, ttl=POLICY_CACHE_TTL_SECONDS)
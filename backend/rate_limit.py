@@ -0,0 +1,172 @@
+import asyncio
+import math
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, TypeVar
+
+from config import RATE_LIMIT_BACKEND, RATE_LIMIT_PERIOD_SECONDS, RATE_LIMIT_SQLITE_PATH
+
+T = TypeVar("T")
+
+# A backend update receives the stored theoretical arrival time (or None) and returns
+# (new value to store or None to leave it unchanged, result to hand back to the caller)
+StateUpdate = Callable[[Optional[float]], Tuple[Optional[float], T]]
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimitBackend(ABC):
+    """Stores one float of limiter state per key and applies updates atomically"""
+
+    # True when update() can wait on I/O or another process's lock; async callers then run it in a thread
+    blocking = False
+
+    @abstractmethod
+    def update(self, key: str, fn: StateUpdate) -> T:
+        ...
+
+    @abstractmethod
+    def reset(self, key: Optional[str] = None) -> None:
+        ...
+
+
+class MemoryBackend(RateLimitBackend):
+    """In-process state; limits are enforced per worker"""
+
+    def __init__(self):
+        self._state: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: StateUpdate) -> T:
+        with self._lock:
+            new_value, result = fn(self._state.get(key))
+            if new_value is not None:
+                self._state[key] = new_value
+            return result
+
+    def reset(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._state.clear()
+            else:
+                self._state.pop(key, None)
+
+
+class SQLiteBackend(RateLimitBackend):
+    """File-backed state shared by every worker process on the same host"""
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_state (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, key: str, fn: StateUpdate) -> T:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limit_state WHERE key = ?", (key,)).fetchone()
+            new_value, result = fn(row[0] if row else None)
+            if new_value is not None:
+                conn.execute(
+                    "INSERT INTO rate_limit_state (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_value),
+                )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self, key: Optional[str] = None) -> None:
+        conn = self._connect()
+        if key is None:
+            conn.execute("DELETE FROM rate_limit_state")
+        else:
+            conn.execute("DELETE FROM rate_limit_state WHERE key = ?", (key,))
+
+
+class GcraRateLimiter:
+    """
+    Generic cell rate algorithm: `limit` requests per `period_seconds`, with bursts up to `limit`.
+    The only state per key is the theoretical arrival time (TAT) of the next request.
+    """
+
+    def __init__(self, backend: RateLimitBackend, period_seconds: float = 3600, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.period_seconds = period_seconds
+        self.clock = clock
+
+    def hit(self, key: str, limit: int) -> RateLimitDecision:
+        if limit <= 0:
+            return RateLimitDecision(False, 0, 0, self.period_seconds, self.period_seconds)
+
+        period = self.period_seconds
+        emission_interval = period / limit
+        now = self.clock()
+
+        def apply(stored_tat: Optional[float]):
+            tat = max(stored_tat if stored_tat is not None else now, now)
+            new_tat = tat + emission_interval
+            allow_at = new_tat - period
+            if now < allow_at:
+                remaining = _slots(period - (tat - now), emission_interval)
+                return None, RateLimitDecision(False, limit, remaining, allow_at - now, tat - now)
+            remaining = _slots(period - (new_tat - now), emission_interval)
+            return new_tat, RateLimitDecision(True, limit, remaining, 0.0, new_tat - now)
+
+        return self.backend.update(key, apply)
+
+    async def hit_async(self, key: str, limit: int) -> RateLimitDecision:
+        """hit() for the event loop: a blocking backend's update runs in a worker thread"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.hit, key, limit)
+        return self.hit(key, limit)
+
+
+def _slots(headroom: float, emission_interval: float) -> int:
+    # Epsilon guards against float error turning e.g. 2.0 slots into 1.999...
+    return max(0, math.floor(headroom / emission_interval + 1e-9))
+
+
+def create_backend(spec: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if spec == "memory":
+        return MemoryBackend()
+    if spec == "sqlite":
+        return SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {spec}")
+
+
+rate_limiter = GcraRateLimiter(create_backend(), period_seconds=RATE_LIMIT_PERIOD_SECONDS)
@@ -0,0 +1,146 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from models import BookingDB, BookingItemDB, BookingRollupDB, UserDB
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ("org_id", "day", "mode", "in_policy", "user_id", "policy_id", "currency")
+
+
+def item_in_policy(item: dict) -> bool:
+    # Items booked before policy status was recorded count as in policy (booking_items.is_in_policy DEFAULT 1)
+    return item.get("policyStatus") != "out"
+
+
+def rollup_deltas(org_id: int, user_id: int, policy_id: Optional[int], created_at: datetime,
+                  items: Iterable[dict]) -> List[dict]:
+    """Per-rollup-row increments for one booking's items"""
+    totals: Dict[Tuple, List[float]] = {}
+    for item in items:
+        key = (org_id, created_at.date(), item["mode"], item_in_policy(item), user_id, policy_id or 0,
+               item.get("currency") or "USD")
+        total = totals.setdefault(key, [0, 0.0])
+        total[0] += 1
+        total[1] += float(item.get("price") or 0)
+    return [
+        {**dict(zip(ROLLUP_KEY, key)), "item_count": count, "amount_total": amount}
+        for key, (count, amount) in totals.items()
+    ]
+
+
+def merge_deltas(deltas: Iterable[dict]) -> List[dict]:
+    """Sum increments that land on the same rollup row (one multi-row upsert may not touch a row twice)"""
+    totals: Dict[Tuple, List[float]] = {}
+    for delta in deltas:
+        key = tuple(delta[k] for k in ROLLUP_KEY)
+        total = totals.setdefault(key, [0, 0.0])
+        total[0] += delta["item_count"]
+        total[1] += delta["amount_total"]
+    return [
+        {**dict(zip(ROLLUP_KEY, key)), "item_count": count, "amount_total": amount}
+        for key, (count, amount) in totals.items()
+    ]
+
+
+def upsert_statement(dialect_name: str, rows: List[dict]):
+    """INSERT ... that adds to existing rollup rows instead of failing on the unique key"""
+    table = BookingRollupDB.__table__
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            item_count=table.c.item_count + stmt.inserted.item_count,
+            amount_total=table.c.amount_total + stmt.inserted.amount_total,
+        )
+    if dialect_name in ("sqlite", "postgresql"):
+        if dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={
+                "item_count": table.c.item_count + stmt.excluded.item_count,
+                "amount_total": table.c.amount_total + stmt.excluded.amount_total,
+            },
+        )
+    raise ValueError(f"No rollup upsert for dialect {dialect_name}")
+
+
+async def apply_booking(db, org_id: int, booking: BookingDB) -> None:
+    """Add a new booking to the rollups inside the caller's transaction, so both commit together"""
+    await apply_deltas(db, rollup_deltas(org_id, booking.user_id, booking.policy_id, booking.created_at, booking.items))
+
+
+async def apply_deltas(db, deltas: Iterable[dict], batch_size: int = 500) -> None:
+    """Upsert many bookings' increments (e.g. a batch booking) in the caller's transaction"""
+    rows = merge_deltas(deltas)
+    for offset in range(0, len(rows), batch_size):
+        await db.execute(upsert_statement(db.bind.dialect.name, rows[offset:offset + batch_size]))
+
+
+def rebuild(session_factory, org_id: Optional[int] = None, start: Optional[date] = None,
+            end: Optional[date] = None, batch_size: int = 1000) -> dict:
+    """
+    Recompute rollups for an org and/or day range (inclusive); everything when unscoped.
+    The totals are one GROUP BY over booking_items, so bookings written before booking_items
+    existed must be backfilled first (schema migration 4, applied by manage.py init-db).
+    Runs in one transaction. Bookings created while it runs may be counted twice or missed,
+    so rebuild closed days or run it while booking traffic is paused.
+    """
+    with session_factory() as db:
+        dialect_name = db.get_bind().dialect.name
+
+        clear = delete(BookingRollupDB)
+        if org_id is not None:
+            clear = clear.where(BookingRollupDB.org_id == org_id)
+        if start is not None:
+            clear = clear.where(BookingRollupDB.day >= start)
+        if end is not None:
+            clear = clear.where(BookingRollupDB.day <= end)
+        deleted = db.execute(clear).rowcount
+
+        key_columns = [
+            UserDB.org_id,
+            func.date(BookingDB.created_at).label("day"),
+            BookingItemDB.mode,
+            BookingItemDB.is_in_policy,
+            BookingDB.user_id,
+            func.coalesce(BookingDB.policy_id, 0).label("policy_id"),
+            BookingItemDB.price_currency,
+        ]
+        query = (
+            select(*key_columns, func.count().label("item_count"), func.sum(BookingItemDB.price_amount).label("amount_total"))
+            .select_from(BookingItemDB)
+            .join(BookingDB, BookingDB.id == BookingItemDB.booking_id)
+            .join(UserDB, UserDB.id == BookingDB.user_id)
+            .where(BookingDB.created_at.is_not(None))
+            .group_by(*key_columns)
+        )
+        if org_id is not None:
+            query = query.where(UserDB.org_id == org_id)
+        if start is not None:
+            query = query.where(BookingDB.created_at >= datetime.combine(start, datetime.min.time()))
+        if end is not None:
+            query = query.where(BookingDB.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+        rows = []
+        items = 0
+        for row in db.execute(query):
+            # SQLite's date() returns text
+            day = date.fromisoformat(row.day) if isinstance(row.day, str) else row.day
+            rows.append(dict(zip(ROLLUP_KEY, (row.org_id, day, row.mode, bool(row.is_in_policy), row.user_id,
+                                              row.policy_id, row.price_currency or "USD")),
+                             item_count=row.item_count, amount_total=float(row.amount_total or 0)))
+            items += row.item_count
+        for offset in range(0, len(rows), batch_size):
+            db.execute(upsert_statement(dialect_name, rows[offset:offset + batch_size]))
+        db.commit()
+
+    logger.info("Rebuilt %d rollup rows from %d booking items (%d rows replaced)", len(rows), items, deleted)
+    return {"items": items, "rollup_rows": len(rows), "deleted_rows": deleted}
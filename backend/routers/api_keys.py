@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models import ApiKeyDB, UserDB
 from auth import verify_api_key, require_permissions
+from auth_cache import CachedApiKey, api_key_cache, last_used_writer
+from usage_recorder import usage_recorder
+from config import API_KEY_BOOTSTRAP_ENABLED
+from pagination import KeysetPager, PageParams, page_params, page_response
 from datetime import datetime
 from typing import List, Optional
 import secrets
@@ -10,15 +15,28 @@ import hashlib
 
 router = APIRouter()
 
+api_key_pager = KeysetPager(ApiKeyDB.created_at, ApiKeyDB.id, {
+    "id": ([ApiKeyDB.id], lambda row: row.id),
+    "app_name": ([ApiKeyDB.app_name], lambda row: row.app_name),
+    "api_key": ([ApiKeyDB.api_key], lambda row: row.api_key),
+    "is_active": ([ApiKeyDB.is_active], lambda row: row.is_active),
+    "permissions": ([ApiKeyDB.permissions], lambda row: row.permissions),
+    "rate_limit": ([ApiKeyDB.rate_limit], lambda row: row.rate_limit),
+    "created_at": ([ApiKeyDB.created_at], lambda row: row.created_at.isoformat() if row.created_at else None),
+    "last_used": ([ApiKeyDB.last_used], lambda row: row.last_used.isoformat() if row.last_used else None),
+})
+
 @router.post("/bootstrap", response_model=dict)
-def bootstrap_admin_key(
+async def bootstrap_admin_key(
     app_name: str = "Admin Bootstrap",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create the first admin API key without authentication (bootstrap only)"""
+    """Create the first admin API key without authentication (bootstrap only, API_KEY_BOOTSTRAP_ENABLED=true)"""
+    if not API_KEY_BOOTSTRAP_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
     
     # Check if any API keys exist
-    existing_keys = db.query(ApiKeyDB).count()
+    existing_keys = await db.scalar(select(func.count()).select_from(ApiKeyDB))
     if existing_keys > 0:
         raise HTTPException(status_code=400, detail="Bootstrap key already exists. Use regular generation endpoint.")
     
@@ -40,8 +58,7 @@ def bootstrap_admin_key(
     )
     
     db.add(api_key_record)
-    db.commit()
-    db.refresh(api_key_record)
+    await db.commit()
     
     return {
         "id": api_key_record.id,
@@ -72,13 +89,13 @@ class ApiKeyResponse:
         self.created_at = created_at
 
 @router.post("/generate", response_model=dict)
-def generate_api_key(
+async def generate_api_key(
     app_name: str,
     permissions: List[str] = None,
     rate_limit: int = 1000,
     user_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_api_key: ApiKeyDB = Depends(require_permissions(["admin"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
 ):
     """Generate a new API key and secret"""
     
@@ -100,8 +117,7 @@ def generate_api_key(
     )
     
     db.add(api_key_record)
-    db.commit()
-    db.refresh(api_key_record)
+    await db.commit()
     
     return {
         "id": api_key_record.id,
@@ -115,35 +131,25 @@ def generate_api_key(
     }
 
 @router.get("/", response_model=List[dict])
-def list_api_keys(
-    db: Session = Depends(get_db),
-    current_api_key: ApiKeyDB = Depends(require_permissions(["admin"]))
+async def list_api_keys(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
 ):
-    """List all API keys (admin only)"""
-    api_keys = db.query(ApiKeyDB).all()
-    
-    return [
-        {
-            "id": key.id,
-            "app_name": key.app_name,
-            "api_key": key.api_key,
-            "is_active": key.is_active,
-            "permissions": key.permissions,
-            "rate_limit": key.rate_limit,
-            "created_at": key.created_at.isoformat() if key.created_at else None,
-            "last_used": key.last_used.isoformat() if key.last_used else None
-        }
-        for key in api_keys
-    ]
+    """List API keys (admin only), one keyset page at a time"""
+    result = await db.execute(api_key_pager.statement(page))
+    items, next_cursor = api_key_pager.page(result.all(), page)
+    return page_response(items, next_cursor, page, response)
 
 @router.get("/{api_key_id}", response_model=dict)
-def get_api_key(
+async def get_api_key(
     api_key_id: int,
-    db: Session = Depends(get_db),
-    current_api_key: ApiKeyDB = Depends(require_permissions(["admin"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
 ):
     """Get specific API key details (admin only)"""
-    api_key = db.query(ApiKeyDB).filter(ApiKeyDB.id == api_key_id).first()
+    api_key = await db.get(ApiKeyDB, api_key_id)
     
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
@@ -160,20 +166,21 @@ def get_api_key(
     }
 
 @router.put("/{api_key_id}/toggle", response_model=dict)
-def toggle_api_key(
+async def toggle_api_key(
     api_key_id: int,
-    db: Session = Depends(get_db),
-    current_api_key: ApiKeyDB = Depends(require_permissions(["admin"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
 ):
     """Toggle API key active status (admin only)"""
-    api_key = db.query(ApiKeyDB).filter(ApiKeyDB.id == api_key_id).first()
+    api_key = await db.get(ApiKeyDB, api_key_id)
     
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
     api_key.is_active = not api_key.is_active
     api_key.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    api_key_cache.invalidate(api_key.id)
     
     return {
         "id": api_key.id,
@@ -183,25 +190,43 @@ def toggle_api_key(
     }
 
 @router.delete("/{api_key_id}")
-def delete_api_key(
+async def delete_api_key(
     api_key_id: int,
-    db: Session = Depends(get_db),
-    current_api_key: ApiKeyDB = Depends(require_permissions(["admin"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
 ):
     """Delete API key (admin only)"""
-    api_key = db.query(ApiKeyDB).filter(ApiKeyDB.id == api_key_id).first()
+    api_key = await db.get(ApiKeyDB, api_key_id)
     
     if not api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
-    db.delete(api_key)
-    db.commit()
+    await db.delete(api_key)
+    await db.commit()
+    api_key_cache.invalidate(api_key_id)
     
     return {"message": "API key deleted successfully"}
 
+@router.get("/cache/stats", response_model=dict)
+async def get_api_key_cache_stats(
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
+):
+    """Get API key cache hit/miss counters and last_used writer stats (admin only)"""
+    return {
+        "cache": api_key_cache.stats(),
+        "last_used_writer": last_used_writer.stats()
+    }
+
+@router.get("/usage/stats", response_model=dict)
+async def get_usage_recorder_stats(
+    current_api_key: CachedApiKey = Depends(require_permissions(["admin"]))
+):
+    """Get write-behind usage recorder queue and flush counters (admin only)"""
+    return usage_recorder.stats()
+
 @router.get("/my/status", response_model=dict)
-def get_my_api_key_status(
-    current_api_key: ApiKeyDB = Depends(verify_api_key)
+async def get_my_api_key_status(
+    current_api_key: CachedApiKey = Depends(verify_api_key)
 ):
     """Get current API key status and usage info"""
     return {
@@ -1,74 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models import (
     LoginRequest, LoginResponse, UserDB,
     InitiateRegistrationRequest, InitiateRegistrationResponse,
     RegisterRequest, RegisterResponse
 )
+from password_hashing import password_hasher
+from session_tokens import SessionClaims, current_session, session_tokens
 from pydantic import BaseModel
-import hashlib
-import secrets
-import bcrypt
 from datetime import datetime
 
 router = APIRouter()
 
+def role_for_email(email: str) -> str:
+    """Determine role based on email or use default"""
+    if "admin" in email:
+        return "OrgAdmin"
+    if "tmgr" in email:
+        return "TravelManager"
+    if "arranger" in email:
+        return "Arranger"
+    return "Traveler"
+
 @router.post("/login", response_model=LoginResponse)
-def login(body: LoginRequest, db: Session = Depends(get_db)):
+async def login(body: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     # Find user by email
-    user = db.query(UserDB).filter(UserDB.email == body.email).first()
+    result = await db.execute(select(UserDB).where(UserDB.email == body.email))
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verify password
     if user.password_hash:
-        # Check if it's bcrypt hash (starts with $2b$) or old sha256 hash
-        if user.password_hash.startswith('$2b$'):
-            # New bcrypt hash
-            if not bcrypt.checkpw(body.password.encode('utf-8'), user.password_hash.encode('utf-8')):
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-        else:
-            # Legacy sha256 hash (for existing demo users)
-            password_hash = hashlib.sha256(body.password.encode()).hexdigest()
-            if user.password_hash != password_hash:
-                raise HTTPException(status_code=401, detail="Invalid credentials")
+        # bcrypt runs in the password hashing process pool; legacy sha256 hashes are upgraded on success
+        valid, new_hash = await password_hasher.verify(body.password, user.password_hash)
+        if not valid:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if new_hash:
+            user.password_hash = new_hash
+            user.updated_at = datetime.utcnow()
+            await db.commit()
     else:
         # For demo purposes, accept any password if user exists and has no password_hash
         pass
     
-    # Generate a simple token (in production, use JWT)
-    access_token = secrets.token_urlsafe(32)
-    
-    # Determine role based on email or use default
-    if "admin" in user.email:
-        role = "OrgAdmin"
-    elif "tmgr" in user.email:
-        role = "TravelManager"
-    elif "arranger" in user.email:
-        role = "Arranger"
-    else:
-        role = "Traveler"
+    # Signed session token: later requests are authenticated without a database lookup
+    role = role_for_email(user.email)
+    access_token = session_tokens.issue(user.id, user.org_id, role)
     
     return {"access_token": access_token, "role": role}
 
 @router.post("/initiate-registration", response_model=InitiateRegistrationResponse)
-def initiate_registration(body: InitiateRegistrationRequest, db: Session = Depends(get_db)):
+async def initiate_registration(body: InitiateRegistrationRequest, db: AsyncSession = Depends(get_async_db)):
     """Check if email exists and return whether user is existing or new"""
-    user = db.query(UserDB).filter(UserDB.email == body.email).first()
+    result = await db.execute(select(UserDB.id).where(UserDB.email == body.email).limit(1))
+    user = result.first()
     return {"existing": user is not None}
 
 @router.post("/register", response_model=RegisterResponse)
-def register(body: RegisterRequest, db: Session = Depends(get_db)):
+async def register(body: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """Register a new user with email and password"""
     # Check if user already exists
-    existing_user = db.query(UserDB).filter(UserDB.email == body.email).first()
+    result = await db.execute(select(UserDB.id).where(UserDB.email == body.email).limit(1))
+    existing_user = result.first()
     if existing_user:
         raise HTTPException(status_code=400, detail="User with this email already exists")
     
     # Hash the password
-    password_hash = bcrypt.hashpw(body.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    password_hash = await password_hasher.hash(body.password)
     
     # Create new user
     new_user = UserDB(
@@ -83,21 +85,11 @@ def register(body: RegisterRequest, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     
     # Generate access token
-    access_token = secrets.token_urlsafe(32)
-    
-    # Determine role based on email or use default
-    if "admin" in body.email:
-        role = "OrgAdmin"
-    elif "tmgr" in body.email:
-        role = "TravelManager"
-    elif "arranger" in body.email:
-        role = "Arranger"
-    else:
-        role = "Traveler"
+    role = role_for_email(body.email)
+    access_token = session_tokens.issue(new_user.id, new_user.org_id, role)
     
     return {"access_token": access_token, "role": role}
 
@@ -107,12 +99,19 @@ class UpdateProfileRequest(BaseModel):
     company_name: str
     team_size: str
 
+@router.get("/me")
+async def me(session: SessionClaims = Depends(current_session)):
+    """The caller's identity, straight from the session token"""
+    return {"user_id": session.user_id, "org_id": session.org_id, "role": session.role, "expires_at": session.expires_at}
+
 @router.put("/profile", response_model=dict)
-def update_profile(body: UpdateProfileRequest, db: Session = Depends(get_db)):
-    """Update user profile information"""
-    # Get the current user from the request (in production, this would come from JWT token)
-    # For now, we'll get the most recently created user
-    user = db.query(UserDB).order_by(UserDB.created_at.desc()).first()
+async def update_profile(
+    body: UpdateProfileRequest,
+    session: SessionClaims = Depends(current_session),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Update the signed-in user's profile information"""
+    user = await db.get(UserDB, session.user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -126,7 +125,6 @@ def update_profile(body: UpdateProfileRequest, db: Session = Depends(get_db)):
     }
     user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {"message": "Profile updated successfully"}
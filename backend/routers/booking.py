@@ -1,42 +1,164 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db import get_db
-from models import BookingRequest, BookingResponse, BookingDB, UserDB
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
+from models import (BookingBatchRequest, BookingBatchResponse, BookingBatchResult, BookingItem,
+                    BookingRequest, BookingResponse, BookingDB, BookingItemDB, Offer, UserDB)
+from policy_engine import CompiledPolicy, policy_engine
+from idempotency import REPLAYED_HEADER, REQUEST_ID_HEADER, idempotency
+from session_tokens import SessionClaims, optional_session
+import rollups
+from booking_items import item_rows
 from datetime import datetime
+from typing import Dict, List, Optional
 import secrets
 
 router = APIRouter()
 
-@router.post("", response_model=BookingResponse)
-def create_booking(req: BookingRequest, db: Session = Depends(get_db)):
-    # Generate a unique booking ID
-    booking_id = "CONF" + secrets.token_hex(8).upper()
-    
-    # Calculate total amount
-    total_amount = sum(item.price for item in req.items)
-    
-    # Convert booking items to dict for JSON storage
-    items_dict = [item.dict() for item in req.items]
-    
-    # For now, use a default user (in production, get from auth token)
-    user = db.query(UserDB).first()
-    if not user:
-        raise HTTPException(status_code=400, detail="No users found in database")
-    
-    # Create booking record
-    booking = BookingDB(
-        id=booking_id,
-        user_id=user.id,
-        items=items_dict,
-        total_amount=total_amount,
-        currency=req.items[0].currency if req.items else "USD",
-        status="confirmed",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+def new_booking_id() -> str:
+    return "CONF" + secrets.token_hex(8).upper()
+
+def apply_policy(policy: CompiledPolicy, items: List[BookingItem]) -> None:
+    """Record each item's policy status against the org's policy; a client can only downgrade an item to out"""
+    for item in items:
+        offer = Offer(id=item.id, mode=item.mode, name=item.id, price=item.price,
+                      currency=item.currency, details=item.details)
+        if item.policyStatus != "out":
+            item.policyStatus = "out" if policy.violations(offer) else "in"
+
+def booking_values(booking_id: str, user_id: int, policy: CompiledPolicy, req: BookingRequest, now: datetime) -> dict:
+    return {
+        "id": booking_id,
+        "user_id": user_id,
+        "policy_id": policy.policy_id,
+        "items": [item.dict() for item in req.items],
+        "total_amount": sum(item.price for item in req.items),
+        "currency": req.items[0].currency if req.items else "USD",
+        "status": "confirmed",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+async def resolve_users(db: AsyncSession, emails: List[str]) -> Dict[str, tuple]:
+    """email -> (user id, org id) in one query; the oldest account wins if an email repeats"""
+    if not emails:
+        return {}
+    result = await db.execute(
+        select(UserDB.id, UserDB.org_id, UserDB.email).where(UserDB.email.in_(emails)).order_by(UserDB.id)
     )
-    
+    users = {}
+    for row in result:
+        users.setdefault(row.email, (row.id, row.org_id))
+    return users
+
+async def default_user(db: AsyncSession, session: Optional[SessionClaims]) -> Optional[tuple]:
+    # The signed-in caller (no lookup needed); without a session token, the first user for now
+    if session is not None:
+        return session.user_id, session.org_id
+    result = await db.execute(select(UserDB.id, UserDB.org_id).limit(1))
+    row = result.first()
+    return (row.id, row.org_id) if row else None
+
+def caller_scope(endpoint: str, session: Optional[SessionClaims]) -> str:
+    # Request ids are only unique per client, so two signed-in users never share a replay
+    return f"{endpoint}:{session.user_id}" if session is not None else endpoint
+
+async def idempotent(request_id: Optional[str], scope: str, req, response: Response, execute):
+    """Run `execute` once per X-Request-Id; retries of the same request get the stored response"""
+    body, replayed = await idempotency.run(request_id, scope, req.model_dump(mode="json"), execute)
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return body
+
+@router.post("", response_model=BookingResponse)
+async def create_booking(
+    req: BookingRequest,
+    response: Response,
+    request_id: Optional[str] = Header(None, alias=REQUEST_ID_HEADER, max_length=200),
+    session: Optional[SessionClaims] = Depends(optional_session),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await idempotent(request_id, caller_scope("POST /bookings", session), req, response,
+                            lambda: book(req, session, db))
+
+async def book(req: BookingRequest, session: Optional[SessionClaims], db: AsyncSession) -> dict:
+    if req.traveler_email:
+        user = (await resolve_users(db, [req.traveler_email])).get(req.traveler_email)
+        if user is None:
+            raise HTTPException(status_code=400, detail=f"Unknown traveler: {req.traveler_email}")
+    else:
+        user = await default_user(db, session)
+        if user is None:
+            raise HTTPException(status_code=400, detail="No users found in database")
+    user_id, org_id = user
+
+    policy = await policy_engine.for_org(org_id)
+    apply_policy(policy, req.items)
+
+    booking = BookingDB(**booking_values(new_booking_id(), user_id, policy, req, datetime.utcnow()))
     db.add(booking)
-    db.commit()
-    db.refresh(booking)
-    
-    return {"id": booking_id}
+    await db.flush()
+    # Item rows and rollup increments share the booking's transaction
+    rows = item_rows(booking.id, booking.items)
+    if rows:  # an empty parameter list would be executed as one all-NULL row
+        await db.execute(insert(BookingItemDB), rows)
+    await rollups.apply_booking(db, org_id, booking)
+    await db.commit()
+
+    return {"id": booking.id}
+
+@router.post("/batch", response_model=BookingBatchResponse)
+async def create_bookings(
+    req: BookingBatchRequest,
+    response: Response,
+    request_id: Optional[str] = Header(None, alias=REQUEST_ID_HEADER, max_length=200),
+    session: Optional[SessionClaims] = Depends(optional_session),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Book many travelers at once. Bookings are validated together and every valid one is
+    inserted in a single transaction (one executemany, one rollup upsert); invalid ones
+    are reported per index and do not block the rest.
+    """
+    return await idempotent(request_id, caller_scope("POST /bookings/batch", session), req, response,
+                            lambda: book_batch(req, session, db))
+
+async def book_batch(req: BookingBatchRequest, session: Optional[SessionClaims], db: AsyncSession) -> dict:
+    emails = sorted({b.traveler_email for b in req.bookings if b.traveler_email})
+    users = await resolve_users(db, emails)
+    fallback = await default_user(db, session) if any(not b.traveler_email for b in req.bookings) else None
+
+    now = datetime.utcnow()
+    policies: Dict[int, CompiledPolicy] = {}
+    results: List[BookingBatchResult] = []
+    rows: List[dict] = []
+    items: List[dict] = []
+    deltas: List[dict] = []
+    for index, booking in enumerate(req.bookings):
+        if not booking.items:
+            results.append(BookingBatchResult(index=index, status="error", error="Booking has no items"))
+            continue
+        user = users.get(booking.traveler_email) if booking.traveler_email else fallback
+        if user is None:
+            error = f"Unknown traveler: {booking.traveler_email}" if booking.traveler_email else "No users found in database"
+            results.append(BookingBatchResult(index=index, status="error", error=error))
+            continue
+        user_id, org_id = user
+        if org_id not in policies:
+            policies[org_id] = await policy_engine.for_org(org_id)
+        policy = policies[org_id]
+        apply_policy(policy, booking.items)
+
+        values = booking_values(new_booking_id(), user_id, policy, booking, now)
+        rows.append(values)
+        items.extend(item_rows(values["id"], values["items"]))
+        deltas.extend(rollups.rollup_deltas(org_id, user_id, policy.policy_id, now, values["items"]))
+        results.append(BookingBatchResult(index=index, id=values["id"], status="created"))
+
+    if rows:
+        await db.execute(insert(BookingDB), rows)
+        await db.execute(insert(BookingItemDB), items)
+        await rollups.apply_deltas(db, deltas)
+        await db.commit()
+
+    return BookingBatchResponse(created=len(rows), failed=len(results) - len(rows), results=results).model_dump(mode="json")
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from auth import require_permissions
+import db_pool
+from search_engine import aggregator, search_metrics
+from search_cache import search_cache
+from policy_engine import policy_engine
+from idempotency import idempotency
+from password_hashing import password_hasher
+
+# Operational stats are for operators only: every endpoint needs an API key with the admin permission
+router = APIRouter(dependencies=[Depends(require_permissions(["admin"]))])
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """Connection pool usage per engine: checked-out/overflow connections, checkout wait and exhaustion events"""
+    return db_pool.snapshot()
+
+@router.get("/search-suppliers")
+async def search_suppliers():
+    """Configured search suppliers with their timeout and circuit breaker state"""
+    return aggregator.status()
+
+@router.get("/search-cache")
+async def search_cache_stats():
+    """Search cache size, evictions and per-mode hit ratio / served age"""
+    if search_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **search_cache.stats()}
+
+@router.get("/search-metrics")
+async def search_latency_metrics():
+    """Fan-out duration per mode, plus time-to-first-offer and total duration of streamed searches"""
+    return search_metrics.snapshot()
+
+@router.get("/policy-engine")
+async def policy_engine_stats():
+    """Compiled policy cache size, compiles and hits"""
+    return policy_engine.stats()
+
+@router.get("/idempotency")
+async def idempotency_stats():
+    """Idempotent booking requests: store hits, replays, duplicates that waited for the original, conflicts"""
+    return idempotency.stats()
+
+@router.get("/password-hashing")
+async def password_hashing_stats():
+    """bcrypt process pool: running/queued hashes, rejections (503s) and legacy hashes upgraded"""
+    return password_hasher.stats()
@@ -1,49 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db import get_db
-from models import PolicyDB, Policy, PolicyCreate, PolicyRule, UserDB
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
+from models import (
+    PolicyDB, PolicyRuleDB, PolicyVersionDB, Policy, PolicyCreate, PolicyRule, UserDB,
+    PolicyEvaluateRequest, PolicyEvaluateResponse
+)
+from policy_engine import CompiledRule, policy_engine
+from policy_batch import encode_bitmap, evaluate_columns
+from pagination import KeysetPager, PageParams, page_params, page_response
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 router = APIRouter()
 
+policy_pager = KeysetPager(PolicyDB.created_at, PolicyDB.id, {
+    "id": ([PolicyDB.id], lambda row: row.id),
+    "name": ([PolicyDB.name], lambda row: row.name),
+    "status": ([PolicyDB.status], lambda row: row.status),
+})
+
+async def current_rules(db: AsyncSession, policy_ids: List[int]) -> Dict[int, List[dict]]:
+    """policy id -> rules of the version the policy engine evaluates (the published one, else the newest), in two queries"""
+    rules = {policy_id: [] for policy_id in policy_ids}
+    if not policy_ids:
+        return rules
+    versions = await db.execute(
+        select(PolicyVersionDB.id, PolicyVersionDB.policy_id)
+        .where(PolicyVersionDB.policy_id.in_(policy_ids))
+        .order_by(PolicyVersionDB.policy_id, (PolicyVersionDB.status == "published").desc(),
+                  PolicyVersionDB.version_num.desc())
+    )
+    current = {}
+    for row in versions:
+        current.setdefault(row.policy_id, row.id)
+    policy_by_version = {version_id: policy_id for policy_id, version_id in current.items()}
+    if policy_by_version:
+        result = await db.execute(
+            select(PolicyRuleDB.policy_version_id, PolicyRuleDB.rule_key, PolicyRuleDB.rule_op, PolicyRuleDB.rule_value)
+            .where(PolicyRuleDB.policy_version_id.in_(policy_by_version))
+            .order_by(PolicyRuleDB.id)
+        )
+        for row in result:
+            rules[policy_by_version[row.policy_version_id]].append(
+                {"key": row.rule_key, "op": row.rule_op, "value": row.rule_value}
+            )
+    return rules
+
 @router.get("", response_model=List[Policy])
-def list_policies(db: Session = Depends(get_db)):
-    policies = db.query(PolicyDB).all()
-    return policies
+async def list_policies(response: Response, page: PageParams = Depends(page_params),
+                        db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(policy_pager.statement(page))
+    items, next_cursor = policy_pager.page(result.all(), page)
+    if page.fields is None:
+        # Same shape as create and publish: each policy with its current rules
+        rules = await current_rules(db, [item["id"] for item in items])
+        for item in items:
+            item["rules"] = rules[item["id"]]
+    return page_response(items, next_cursor, page, response, Policy)
 
 @router.post("", response_model=Policy)
-def create_policy(body: PolicyCreate, db: Session = Depends(get_db)):
+async def create_policy(body: PolicyCreate, db: AsyncSession = Depends(get_async_db)):
     # Get the first user to use as created_by
-    user = db.query(UserDB).first()
-    if not user:
+    result = await db.execute(select(UserDB.id).limit(1))
+    user_id = result.scalar()
+    if user_id is None:
         raise HTTPException(status_code=400, detail="No users found in database")
     
-    # Create policy without rules for now (existing schema doesn't have rules column)
+    # Reject rules the engine could not evaluate (e.g. a non-numeric value for "<=")
+    try:
+        for rule in body.rules:
+            CompiledRule.compile(rule.key, rule.op, rule.value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     db_policy = PolicyDB(
         org_id=1,  # Default org for now
         name=body.name,
         status="draft",
-        created_by=user.id,
+        created_by=user_id,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
     )
     
     db.add(db_policy)
-    db.commit()
-    db.refresh(db_policy)
+    await db.flush()
+
+    # Rules live on version 1 of the policy (policy_versions / policy_rules)
+    version = PolicyVersionDB(policy_id=db_policy.id, version_num=1, status="draft")
+    db.add(version)
+    await db.flush()
+    db.add_all([
+        PolicyRuleDB(policy_version_id=version.id, rule_key=rule.key, rule_op=rule.op, rule_value=rule.value)
+        for rule in body.rules
+    ])
+    await db.commit()
     
-    return db_policy
+    return Policy(id=db_policy.id, name=db_policy.name, status=db_policy.status, rules=body.rules)
 
 @router.post("/{policy_id}/publish", response_model=Policy)
-def publish_policy(policy_id: int, db: Session = Depends(get_db)):
-    policy = db.query(PolicyDB).filter(PolicyDB.id == policy_id).first()
+async def publish_policy(policy_id: int, db: AsyncSession = Depends(get_async_db)):
+    policy = await db.get(PolicyDB, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
     policy.status = "published"
     policy.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(policy)
-    
-    return policy
+    # Publishing makes the newest version the live one
+    version = await db.scalar(
+        select(PolicyVersionDB)
+        .where(PolicyVersionDB.policy_id == policy_id)
+        .order_by(PolicyVersionDB.version_num.desc())
+        .limit(1)
+    )
+    if version is not None:
+        version.status = "published"
+    await db.commit()
+
+    # Drop compiled evaluators so the next search picks up the newly published rules
+    policy_engine.invalidate(policy_id=policy_id, org_id=policy.org_id)
+
+    rules = await current_rules(db, [policy_id])
+    return Policy(id=policy.id, name=policy.name, status=policy.status, rules=rules[policy_id])
+
+@router.post("/{policy_id}/evaluate", response_model=PolicyEvaluateResponse)
+async def evaluate_policy(policy_id: int, body: PolicyEvaluateRequest):
+    """Vectorized compliance check of a columnar batch of offers against the policy's current rules"""
+    policy = await policy_engine.for_policy(policy_id)
+    if policy is None:
+        raise HTTPException(status_code=404, detail="Policy not found")
+
+    try:
+        # NumPy work for large batches stays off the event loop
+        result = await run_in_threadpool(evaluate_columns, policy, body.columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    encode = encode_bitmap if body.encoding == "bitmap" else (lambda mask: mask.tolist())
+    return PolicyEvaluateResponse(
+        policyId=policy_id,
+        versionId=policy.version_id,
+        count=result.count,
+        compliantCount=int(result.compliant.sum()),
+        compliant=encode(result.compliant),
+        rules=[
+            {"key": rule.key, "op": rule.op, "value": rule.raw, "violations": int(mask.sum()), "mask": encode(mask)}
+            for rule, mask in zip(result.rules, result.violations)
+        ],
+    )
@@ -1,11 +1,170 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
+from models import BookingRollupDB
+from exports import EXPORTS, stream_export
+from datetime import date, datetime, timedelta
+from typing import List, Literal, Optional, Tuple
 
 router = APIRouter()
 
+# Reports read only the booking_rollups_daily table, never bookings
+R = BookingRollupDB
+
+GROUP_COLUMNS = {
+    "month": [extract("year", R.day).label("year"), extract("month", R.day).label("month")],
+    "day": [R.day],
+    "traveler": [R.user_id],
+    "mode": [R.mode],
+    "policy": [R.policy_id],
+}
+
+def report_range(month: Optional[str], start: Optional[date], end: Optional[date]) -> Tuple[date, date, Optional[str]]:
+    """Inclusive day range: explicit from/to, else the given or current month"""
+    if start or end:
+        if not (start and end) or start > end:
+            raise HTTPException(status_code=400, detail="Both from and to are required, with from <= to")
+        return start, end, None
+    try:
+        first = datetime.strptime(month, "%Y-%m").date() if month else datetime.utcnow().date().replace(day=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return first, last, first.strftime("%Y-%m")
+
+def parse_group_by(group_by: Optional[str]) -> List[str]:
+    names = [g.strip() for g in group_by.split(",") if g.strip()] if group_by else []
+    unknown = [g for g in names if g not in GROUP_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)} (use {', '.join(GROUP_COLUMNS)})")
+    return names
+
+def group_labels(row, names: List[str]) -> dict:
+    labels = {}
+    for name in names:
+        if name == "month":
+            labels["month"] = f"{int(row.year):04d}-{int(row.month):02d}"
+        elif name == "day":
+            labels["day"] = row.day.isoformat()
+        elif name == "traveler":
+            labels["traveler"] = str(row.user_id)
+        elif name == "mode":
+            labels["mode"] = row.mode
+        else:
+            labels["policy"] = row.policy_id or None
+    return labels
+
+async def rollup_totals(db: AsyncSession, org_id: int, currency: str, first: date, last: date, names: List[str]):
+    group_columns = [c for name in names for c in GROUP_COLUMNS[name]]
+    stmt = (
+        select(
+            *group_columns,
+            func.coalesce(func.sum(R.item_count), 0).label("items"),
+            func.coalesce(func.sum(R.amount_total), 0).label("amount"),
+            func.coalesce(func.sum(case((R.in_policy, R.item_count), else_=0)), 0).label("in_items"),
+            func.coalesce(func.sum(case((R.in_policy, R.amount_total), else_=0)), 0).label("in_amount"),
+        )
+        .where(R.org_id == org_id, R.currency == currency, R.day >= first, R.day <= last)
+    )
+    if group_columns:
+        stmt = stmt.group_by(*group_columns).order_by(*group_columns)
+    return (await db.execute(stmt)).all()
+
+def compliance_figures(row) -> dict:
+    items = int(row.items)
+    in_items = int(row.in_items)
+    amount = float(row.amount)
+    return {
+        "inPolicyRate": round(in_items / items, 4) if items else 0.0,
+        "oopRate": round((items - in_items) / items, 4) if items else 0.0,
+        "items": items,
+        "inPolicyItems": in_items,
+        "outOfPolicyItems": items - in_items,
+        "inPolicySpendRate": round(float(row.in_amount) / amount, 4) if amount else 0.0,
+    }
+
 @router.get("/spend")
-def spend():
-    return {"total": 125432.55, "currency": "USD", "month": "2025-10"}
+async def spend(
+    month: Optional[str] = Query(None, description="YYYY-MM; defaults to the current month"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    group_by: Optional[str] = Query(None, description="Comma-separated: month, day, traveler, mode, policy"),
+    currency: str = "USD",
+    db: AsyncSession = Depends(get_async_db),
+):
+    first, last, month_label = report_range(month, start, end)
+    names = parse_group_by(group_by)
+    org_id = 1  # Default org for now
+    total, = await rollup_totals(db, org_id, currency, first, last, [])
+    report = {
+        "total": round(float(total.amount), 2),
+        "currency": currency,
+        "month": month_label,
+        "from": first.isoformat(),
+        "to": last.isoformat(),
+        "items": int(total.items),
+    }
+    if names:
+        report["groups"] = [
+            {**group_labels(row, names), "total": round(float(row.amount), 2), "items": int(row.items)}
+            for row in await rollup_totals(db, org_id, currency, first, last, names)
+        ]
+    return report
 
 @router.get("/compliance")
-def compliance():
-    return {"inPolicyRate": 0.78, "oopRate": 0.22}
+async def compliance(
+    month: Optional[str] = Query(None, description="YYYY-MM; defaults to the current month"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    group_by: Optional[str] = Query(None, description="Comma-separated: month, day, traveler, mode, policy"),
+    currency: str = "USD",
+    db: AsyncSession = Depends(get_async_db),
+):
+    first, last, month_label = report_range(month, start, end)
+    names = parse_group_by(group_by)
+    org_id = 1  # Default org for now
+    total, = await rollup_totals(db, org_id, currency, first, last, [])
+    report = {**compliance_figures(total), "month": month_label, "from": first.isoformat(), "to": last.isoformat()}
+    if names:
+        report["groups"] = [
+            {**group_labels(row, names), **compliance_figures(row)}
+            for row in await rollup_totals(db, org_id, currency, first, last, names)
+        ]
+    return report
+
+@router.get("/export/{kind}")
+async def export(
+    kind: Literal["bookings", "trips"],
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    after_created_at: Optional[datetime] = Query(None, description="Resume after this row: its created_at..."),
+    after_id: Optional[str] = Query(None, description="...and its id"),
+):
+    """
+    Stream every booking or trip created in [from, to] in (created_at, id) order.
+    An interrupted download resumes by passing the last received row's created_at and id.
+    """
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must be <= to")
+    if (after_created_at is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_created_at and after_id go together")
+    spec = EXPORTS[kind]
+    after = None
+    if after_created_at is not None:
+        # Trip ids are integers, booking ids strings
+        if kind == "trips" and not after_id.isdigit():
+            raise HTTPException(status_code=400, detail="after_id must be a trip id")
+        after = (after_created_at, int(after_id) if kind == "trips" else after_id)
+
+    org_id = 1  # Default org for now
+    filename = f"{kind}-{start.isoformat()}-{end.isoformat()}.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(
+        stream_export(spec, org_id, start, end, format, compress=gzip, after=after),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
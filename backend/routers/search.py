@@ -1,32 +1,139 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from models import Offer
+import json
+import time
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Literal, Optional
+from models import Offer, SearchParams
+from fast_json import typed_response
+from search_engine import SearchResult, aggregator, dedupe_key, merge_offers, search_metrics
+from search_cache import search_cache
+from policy_engine import policy_engine
 
 router = APIRouter()
 
-def mk_offers(mode: str) -> List[Offer]:
-    base = []
-    for i in range(10):
-        name = ("Flight" if mode == "flights" else "Hotel" if mode == "hotels" else "Car") + f" {i+1}"
-        base.append(Offer(
-            id=f"{mode}-{i}",
-            mode=mode,  # type: ignore
-            name=name,
-            description="NONSTOP • 2h 10m" if mode == "flights" else None,
-            price=round(120 + i * 12.5, 2),
-            currency="USD",
-            policyStatus="in" if i % 4 != 0 else "out",
-        ))
-    return base
+# Search requests are not tied to a user yet, so offers are checked against the default org's policy
+DEFAULT_ORG_ID = 1
+
+StreamFormat = Optional[Literal["ndjson", "sse"]]
+
+async def run_search(params: SearchParams, response: Response) -> List[Offer]:
+    if search_cache is None:
+        result = await aggregator.search(params)
+    else:
+        result, cache_status, age = await search_cache.get(params, aggregator.search)
+        response.headers["X-Cache"] = cache_status
+        response.headers["Age"] = str(int(age))
+    # Suppliers that timed out, failed or were skipped by their circuit breaker are reported in headers
+    response.headers.update(result.headers())
+    policy = await policy_engine.for_org(DEFAULT_ORG_ID)
+    # Annotated offers are already Offer models: no need to validate them again
+    return typed_response(List[Offer], policy.annotate(result.offers), response, validate=False)
+
+async def cached_batch(offers: List[Offer]):
+    yield "cache", offers
+
+async def search_events(params: SearchParams) -> AsyncIterator[tuple]:
+    """
+    ("offers", {...}) events as suppliers answer, then one ("summary", {...}).
+    An offer is only sent if it is new or cheaper than a duplicate already sent.
+    """
+    started = time.perf_counter()
+    policy = await policy_engine.for_org(DEFAULT_ORG_ID)
+    first_offer_ms = None
+    sent = {}
+    batches = []
+    cached = search_cache.fresh(params) if search_cache is not None else None
+    if cached is not None:
+        result, age = cached
+        source = cached_batch(result.offers)
+        cache_status = "HIT"
+    else:
+        result, age = SearchResult(offers=[]), 0.0
+        source = aggregator.fan_out(params, result)
+        cache_status = "MISS" if search_cache is not None else None
+
+    async for supplier, offers in source:
+        batches.append(offers)
+        fresh = []
+        for offer in offers:
+            key = dedupe_key(offer)
+            if key not in sent or offer.price < sent[key]:
+                sent[key] = offer.price
+                fresh.append(offer)
+        if not fresh:
+            continue
+        if first_offer_ms is None:
+            first_offer_ms = (time.perf_counter() - started) * 1000
+        yield "offers", {"supplier": supplier, "offers": [o.model_dump() for o in policy.annotate(fresh)]}
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    if cached is None:
+        result.offers = merge_offers(batches)
+        result.duration_ms = duration_ms
+        search_metrics.observe(params.mode, duration_ms)
+        if search_cache is not None:
+            search_cache.put(params, result)
+    search_metrics.observe_stream(params.mode, first_offer_ms, duration_ms)
+    yield "summary", {
+        "count": len(result.offers),
+        "suppliers": result.suppliers,
+        "timedOut": result.timed_out,
+        "failed": result.failed,
+        "circuitOpen": result.skipped,
+        "partial": result.partial,
+        "cache": cache_status,
+        "age": int(age),
+        "timeToFirstOfferMs": round(first_offer_ms, 2) if first_offer_ms is not None else None,
+        "durationMs": round(duration_ms, 2),
+    }
+
+def stream_search(params: SearchParams, request: Request, format: StreamFormat) -> StreamingResponse:
+    if format is None:
+        format = "sse" if "text/event-stream" in request.headers.get("accept", "") else "ndjson"
+
+    async def body():
+        async for event, data in search_events(params):
+            if format == "sse":
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            else:
+                yield json.dumps({"event": event, **data}) + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # X-Accel-Buffering stops nginx/ALB-style proxies from holding the stream back
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @router.get("/flights", response_model=List[Offer])
-def flights(origin: Optional[str] = None, destination: Optional[str] = None, departDate: Optional[str] = None):
-    return mk_offers("flights")
+async def flights(response: Response, origin: Optional[str] = None, destination: Optional[str] = None,
+                  departDate: Optional[str] = None, returnDate: Optional[str] = None):
+    params = SearchParams(mode="flights", origin=origin, destination=destination, departDate=departDate, returnDate=returnDate)
+    return await run_search(params, response)
+
+@router.get("/flights/stream")
+async def flights_stream(request: Request, origin: Optional[str] = None, destination: Optional[str] = None,
+                         departDate: Optional[str] = None, returnDate: Optional[str] = None,
+                         format: StreamFormat = Query(None)):
+    params = SearchParams(mode="flights", origin=origin, destination=destination, departDate=departDate, returnDate=returnDate)
+    return stream_search(params, request, format)
 
 @router.get("/hotels", response_model=List[Offer])
-def hotels(city: Optional[str] = None, checkIn: Optional[str] = None, checkOut: Optional[str] = None):
-    return mk_offers("hotels")
+async def hotels(response: Response, city: Optional[str] = None, checkIn: Optional[str] = None, checkOut: Optional[str] = None):
+    params = SearchParams(mode="hotels", city=city, departDate=checkIn, returnDate=checkOut)
+    return await run_search(params, response)
+
+@router.get("/hotels/stream")
+async def hotels_stream(request: Request, city: Optional[str] = None, checkIn: Optional[str] = None,
+                        checkOut: Optional[str] = None, format: StreamFormat = Query(None)):
+    params = SearchParams(mode="hotels", city=city, departDate=checkIn, returnDate=checkOut)
+    return stream_search(params, request, format)
 
 @router.get("/cars", response_model=List[Offer])
-def cars(city: Optional[str] = None, pickup: Optional[str] = None, dropoff: Optional[str] = None):
-    return mk_offers("cars")
+async def cars(response: Response, city: Optional[str] = None, pickup: Optional[str] = None, dropoff: Optional[str] = None):
+    params = SearchParams(mode="cars", city=city, departDate=pickup, returnDate=dropoff)
+    return await run_search(params, response)
+
+@router.get("/cars/stream")
+async def cars_stream(request: Request, city: Optional[str] = None, pickup: Optional[str] = None,
+                      dropoff: Optional[str] = None, format: StreamFormat = Query(None)):
+    params = SearchParams(mode="cars", city=city, departDate=pickup, returnDate=dropoff)
+    return stream_search(params, request, format)
@@ -1,27 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models import UserDB
+from pagination import KeysetPager, PageParams, page_params, page_response
 from typing import Dict, Any, List
 
 router = APIRouter()
 
+traveler_pager = KeysetPager(UserDB.created_at, UserDB.id, {
+    "id": ([UserDB.id], lambda row: str(row.id)),
+    "name": ([UserDB.email], lambda row: row.email.split("@")[0].title()),  # Simple name from email
+    "email": ([UserDB.email], lambda row: row.email),
+    "loyalty": ([], lambda row: {"air": "", "hotel": "", "car": ""}),
+})
+
 @router.get("")
-def list_travelers(db: Session = Depends(get_db)):
-    users = db.query(UserDB).all()
-    return [
-        {
-            "id": str(user.id),
-            "name": user.email.split("@")[0].title(),  # Simple name from email
-            "email": user.email,
-            "loyalty": {"air": "", "hotel": "", "car": ""}
-        }
-        for user in users
-    ]
+async def list_travelers(response: Response, page: PageParams = Depends(page_params),
+                         db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(traveler_pager.statement(page))
+    items, next_cursor = traveler_pager.page(result.all(), page)
+    return page_response(items, next_cursor, page, response)
 
 @router.get("/{traveler_id}")
-def get_traveler(traveler_id: str, db: Session = Depends(get_db)):
-    user = db.query(UserDB).filter(UserDB.id == int(traveler_id)).first()
+async def get_traveler(traveler_id: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(UserDB, int(traveler_id))
     if not user:
         raise HTTPException(status_code=404, detail="Traveler not found")
     
@@ -33,8 +35,8 @@ def get_traveler(traveler_id: str, db: Session = Depends(get_db)):
     }
 
 @router.put("/{traveler_id}")
-def update_traveler(traveler_id: str, body: Dict[str, Any], db: Session = Depends(get_db)):
-    user = db.query(UserDB).filter(UserDB.id == int(traveler_id)).first()
+async def update_traveler(traveler_id: str, body: Dict[str, Any], db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(UserDB, int(traveler_id))
     if not user:
         raise HTTPException(status_code=404, detail="Traveler not found")
     
@@ -44,8 +46,7 @@ def update_traveler(traveler_id: str, body: Dict[str, Any], db: Session = Depend
     if "role" in body:
         user.role = body["role"]
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {
         "id": str(user.id),
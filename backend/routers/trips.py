@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from db import get_db
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_async_db
 from models import Trip as TripModel, TripDB, UserDB
+from pagination import KeysetPager, PageParams, page_params, page_response
 from typing import List
 
 router = APIRouter()
 
+trip_pager = KeysetPager(TripDB.created_at, TripDB.id, {
+    "id": ([TripDB.id], lambda row: str(row.id)),
+    "traveler": ([TripDB.traveler_id], lambda row: str(row.traveler_id)),
+    "segments": ([TripDB.trip_title], lambda row: [row.trip_title] if row.trip_title else []),
+    "startDate": ([TripDB.start_date], lambda row: row.start_date.date().isoformat()),
+    "endDate": ([TripDB.end_date], lambda row: row.end_date.date().isoformat()),
+    "status": ([TripDB.status], lambda row: row.status or "upcoming"),
+})
+
 @router.get("", response_model=List[TripModel])
-def list_trips(db: Session = Depends(get_db)):
+async def list_trips(response: Response, page: PageParams = Depends(page_params),
+                     db: AsyncSession = Depends(get_async_db)):
     # For now, get trips for the first user (in production, get from auth token)
-    user = db.query(UserDB).first()
-    if not user:
+    result = await db.execute(select(UserDB.id).limit(1))
+    user_id = result.scalar()
+    if user_id is None:
         return []
     
-    trips = db.query(TripDB).filter(TripDB.traveler_id == user.id).all()
-    return trips
+    result = await db.execute(trip_pager.statement(page, TripDB.traveler_id == user_id))
+    items, next_cursor = trip_pager.page(result.all(), page)
+    return page_response(items, next_cursor, page, response, TripModel)
@@ -0,0 +1,229 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config import (
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_STALE_SECONDS,
+    SEARCH_CACHE_TTL_FLIGHTS, SEARCH_CACHE_TTL_HOTELS, SEARCH_CACHE_TTL_CARS
+)
+from models import SearchParams
+from search_engine import SearchResult
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[Optional[str], ...]
+Fetch = Callable[[SearchParams], Awaitable[SearchResult]]
+
+# Upper bounds (s) of the served-age histogram buckets
+AGE_BUCKETS_SECONDS = (1, 5, 15, 60, 300, 900)
+
+
+def cache_key(params: SearchParams) -> CacheKey:
+    """Normalized key so 'sfo'/'SFO ' or 'new york'/'New York' share an entry"""
+    def code(value):
+        return value.strip().upper() if value else None
+
+    def text(value):
+        return " ".join(value.split()).lower() if value else None
+
+    return (params.mode, code(params.origin), code(params.destination),
+            text(params.departDate), text(params.returnDate), text(params.city))
+
+
+class CacheEntry:
+    __slots__ = ("result", "stored_at", "fresh_until", "stale_until", "size")
+
+    def __init__(self, result: SearchResult, stored_at: float, fresh_until: float, stale_until: float, size: int):
+        self.result = result
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.size = size
+
+
+class ModeStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.age_total = 0.0
+        self.age_max = 0.0
+        self.age_buckets = [0] * (len(AGE_BUCKETS_SECONDS) + 1)
+
+    def record_age(self, age: float) -> None:
+        self.age_total += age
+        self.age_max = max(self.age_max, age)
+        for i, bound in enumerate(AGE_BUCKETS_SECONDS):
+            if age <= bound:
+                self.age_buckets[i] += 1
+                break
+        else:
+            self.age_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            # Coalesced waiters did not call suppliers themselves, so they count towards the hit ratio
+            "hit_ratio": round((served + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "served_age_avg_seconds": round(self.age_total / served, 3) if served else 0.0,
+            "served_age_max_seconds": round(self.age_max, 3),
+            "served_age_buckets_seconds": {
+                **{f"le_{bound}": count for bound, count in zip(AGE_BUCKETS_SECONDS, self.age_buckets)},
+                "gt_last": self.age_buckets[-1],
+            },
+        }
+
+
+class SearchCache:
+    """
+    Search result cache with per-mode TTLs, LRU eviction under a byte budget,
+    singleflight for concurrent misses and stale-while-revalidate.
+    Partial results (some supplier timed out) are stored already stale, so they are
+    served at most once more before a refresh replaces them.
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, ttls: Dict[str, float], stale_seconds: float, max_bytes: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        self.bytes = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.mode_stats: Dict[str, ModeStats] = {mode: ModeStats() for mode in ttls}
+
+    async def get(self, params: SearchParams, fetch: Fetch) -> Tuple[SearchResult, str, float]:
+        """Returns (result, cache status, age in seconds); status is HIT, STALE, MISS or COALESCED"""
+        key = cache_key(params)
+        stats = self.mode_stats.setdefault(params.mode, ModeStats())
+        now = self.clock()
+        entry = self._entries.get(key)
+
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            age = now - entry.stored_at
+            stats.record_age(age)
+            if now < entry.fresh_until:
+                stats.hits += 1
+                return entry.result, "HIT", age
+            stats.stale_hits += 1
+            if key not in self._inflight:
+                self.refreshes += 1
+                self._start_fetch(key, params, fetch, background=True)
+            return entry.result, "STALE", age
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats.coalesced += 1
+            status = "COALESCED"
+        else:
+            stats.misses += 1
+            status = "MISS"
+            task = self._start_fetch(key, params, fetch)
+        # shield(): a client disconnecting must not cancel the fetch other waiters share
+        result = await asyncio.shield(task)
+        return result, status, 0.0
+
+    def fresh(self, params: SearchParams) -> Optional[Tuple[SearchResult, float]]:
+        """(result, age) if a fresh entry exists, else None; for callers that fetch on their own (streaming)"""
+        key = cache_key(params)
+        stats = self.mode_stats.setdefault(params.mode, ModeStats())
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is None or now >= entry.fresh_until:
+            stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        age = now - entry.stored_at
+        stats.record_age(age)
+        stats.hits += 1
+        return entry.result, age
+
+    def put(self, params: SearchParams, result: SearchResult) -> None:
+        self._store(cache_key(params), params.mode, result)
+
+    def _start_fetch(self, key: CacheKey, params: SearchParams, fetch: Fetch, background: bool = False) -> asyncio.Task:
+        async def run():
+            try:
+                result = await fetch(params)
+                self._store(key, params.mode, result)
+                return result
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        if background:
+            # Requests that coalesce onto a refresh see its exception; the refresh itself only logs it
+            task.add_done_callback(functools.partial(self._refresh_done, key))
+        return task
+
+    def _refresh_done(self, key: CacheKey, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        self.refresh_errors += 1
+        logger.error("Background search refresh failed for %s", key, exc_info=task.exception())
+
+    def _store(self, key: CacheKey, mode: str, result: SearchResult) -> None:
+        if not result.suppliers:
+            return
+        now = self.clock()
+        ttl = self.ttls.get(mode, 0)
+        fresh_until = now if result.partial else now + ttl
+        size = sum(len(offer.model_dump_json()) for offer in result.offers) + 256
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = CacheEntry(result, now, fresh_until, now + ttl + self.stale_seconds, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        now = self.clock()
+        fresh = sum(1 for e in self._entries.values() if now < e.fresh_until)
+        return {
+            "entries": len(self._entries),
+            "fresh_entries": fresh,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "ttl_seconds": self.ttls,
+            "stale_seconds": self.stale_seconds,
+            "modes": {mode: stats.snapshot() for mode, stats in self.mode_stats.items()},
+        }
+
+
+search_cache = SearchCache(
+    {"flights": SEARCH_CACHE_TTL_FLIGHTS, "hotels": SEARCH_CACHE_TTL_HOTELS, "cars": SEARCH_CACHE_TTL_CARS},
+    stale_seconds=SEARCH_CACHE_STALE_SECONDS,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+) if SEARCH_CACHE_ENABLED else None
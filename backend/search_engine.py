@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from config import (
+    SEARCH_DEADLINE_SECONDS, SEARCH_SUPPLIERS_JSON, SEARCH_SYNTHETIC_SUPPLIERS,
+    SEARCH_SYNTHETIC_LATENCY_MS, SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_RESET_SECONDS
+)
+from models import Offer, SearchParams
+
+logger = logging.getLogger(__name__)
+
+CARRIERS = ["AA", "UA", "DL", "B6", "AS", "WN"]
+CABINS = ["Economy", "Economy", "Economy", "PremiumEconomy", "Business"]
+HOTEL_CHAINS = ["Marriott", "Hilton", "Hyatt", "IHG", "Accor", "Best Western"]
+CAR_CLASSES = ["Economy", "Compact", "Intermediate", "Standard", "FullSize", "SUV"]
+CAR_VENDORS = ["Hertz", "Avis", "Enterprise", "National", "Budget"]
+
+
+def _seed(*parts: Optional[str]) -> int:
+    digest = hashlib.sha256("|".join(p or "" for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _offer_id(*parts: Optional[str]) -> str:
+    # Optional parts (e.g. no departDate) are left out rather than leaving a trailing ":"
+    return ":".join(p for p in parts if p)
+
+
+def mk_offers(params: SearchParams, supplier: str, count: int = 10) -> List[Offer]:
+    """
+    Deterministic synthetic inventory for a search.
+    The schedule/property list depends only on the search itself, so different suppliers
+    return overlapping inventory at different prices (which the aggregator de-duplicates).
+    """
+    mode = params.mode
+    inventory = random.Random(_seed(mode, params.origin, params.destination, params.city, params.departDate))
+    pricing = random.Random(_seed(supplier, mode, params.origin, params.destination, params.city, params.departDate))
+    route = "-".join(p for p in (params.origin, params.destination) if p)
+    offers = []
+    for i in range(count):
+        markup = 1 + pricing.uniform(-0.08, 0.12)
+        if mode == "flights":
+            carrier = inventory.choice(CARRIERS)
+            flight_number = f"{carrier}{inventory.randint(100, 2999)}"
+            cabin = inventory.choice(CABINS)
+            minutes = inventory.randint(65, 390)
+            stops = 0 if inventory.random() < 0.6 else 1
+            base = 90 + minutes * 0.9 + (250 if cabin == "Business" else 60 if cabin == "PremiumEconomy" else 0)
+            offers.append(Offer(
+                id=_offer_id(supplier, flight_number, params.departDate),
+                mode="flights",
+                name=f"{carrier} {flight_number[len(carrier):]} {route}".strip(),
+                description=f"{'NONSTOP' if stops == 0 else '1 STOP'} • {minutes // 60}h {minutes % 60}m",
+                price=round(base * markup, 2),
+                currency="USD",
+                details={
+                    "supplier": supplier,
+                    "carrier": carrier,
+                    "flightNumber": flight_number,
+                    "origin": params.origin,
+                    "destination": params.destination,
+                    "departDate": params.departDate,
+                    "cabin": cabin,
+                    "stops": stops,
+                    "durationMinutes": minutes,
+                },
+            ))
+        elif mode == "hotels":
+            chain = inventory.choice(HOTEL_CHAINS)
+            hotel_code = f"{chain[:3].upper()}{inventory.randint(1000, 9999)}"
+            nightly_rate = round((110 + inventory.random() * 260) * markup, 2)
+            offers.append(Offer(
+                id=_offer_id(supplier, hotel_code, params.departDate),
+                mode="hotels",
+                name=f"{chain} {params.city or 'Downtown'} #{i + 1}",
+                price=nightly_rate,
+                currency="USD",
+                details={
+                    "supplier": supplier,
+                    "hotelCode": hotel_code,
+                    "city": params.city,
+                    "checkIn": params.departDate,
+                    "checkOut": params.returnDate,
+                    "nightly_rate": nightly_rate,
+                },
+            ))
+        else:
+            vendor = inventory.choice(CAR_VENDORS)
+            vehicle_class = inventory.choice(CAR_CLASSES)
+            daily_rate = round((35 + CAR_CLASSES.index(vehicle_class) * 12 + inventory.random() * 20) * markup, 2)
+            offers.append(Offer(
+                id=f"{supplier}:{vendor}:{vehicle_class}:{i}",
+                mode="cars",
+                name=f"{vendor} {vehicle_class}",
+                price=daily_rate,
+                currency="USD",
+                details={
+                    "supplier": supplier,
+                    "vendor": vendor,
+                    "vehicleClass": vehicle_class,
+                    "city": params.city,
+                    "pickup": params.departDate,
+                    "dropoff": params.returnDate,
+                    "daily_rate": daily_rate,
+                },
+            ))
+    return offers
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one trial call through after `reset_timeout`"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        # A call abandoned without an outcome (cancelled): a half-open breaker lets the next trial through
+        self._trial_in_flight = False
+
+
+class SupplierAdapter(ABC):
+    """One inventory source. Subclasses implement fetch() for the modes they serve."""
+
+    def __init__(self, name: str, modes: Iterable[str], timeout: float):
+        self.name = name
+        self.modes = set(modes)
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_RESET_SECONDS)
+
+    def supports(self, mode: str) -> bool:
+        return mode in self.modes
+
+    @abstractmethod
+    async def fetch(self, params: SearchParams) -> List[Offer]:
+        ...
+
+
+class SyntheticSupplier(SupplierAdapter):
+    """In-process supplier backed by mk_offers(), with optional simulated latency"""
+
+    def __init__(self, name: str, modes: Iterable[str], timeout: float, latency_ms: float = 0, count: int = 10):
+        super().__init__(name, modes, timeout)
+        self.latency_ms = latency_ms
+        self.count = count
+
+    async def fetch(self, params: SearchParams) -> List[Offer]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return mk_offers(params, self.name, self.count)
+
+
+class HttpSupplier(SupplierAdapter):
+    """Supplier reached over HTTP: GET {url}/search/{mode} returning a JSON list of offers"""
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(self, name: str, modes: Iterable[str], timeout: float, url: str):
+        super().__init__(name, modes, timeout)
+        self.url = url.rstrip("/")
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        # One pooled client for all HTTP suppliers; per-call deadlines come from the aggregator
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=200, max_keepalive_connections=50))
+        return cls._client
+
+    async def fetch(self, params: SearchParams) -> List[Offer]:
+        query = {k: v for k, v in params.model_dump(exclude={"mode"}).items() if v is not None}
+        response = await self.client().get(f"{self.url}/search/{params.mode}", params=query, timeout=self.timeout)
+        response.raise_for_status()
+        return [Offer(**{**offer, "id": f"{self.name}:{offer['id']}"}) for offer in response.json()]
+
+
+@dataclass
+class SearchResult:
+    offers: List[Offer]
+    suppliers: List[str] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out or self.failed or self.skipped)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-Search-Suppliers": str(len(self.suppliers)),
+            "X-Search-Partial": "true" if self.partial else "false",
+        }
+        if self.timed_out:
+            headers["X-Search-Timed-Out"] = ",".join(self.timed_out)
+        if self.failed:
+            headers["X-Search-Failed"] = ",".join(self.failed)
+        if self.skipped:
+            headers["X-Search-Circuit-Open"] = ",".join(self.skipped)
+        return headers
+
+
+def dedupe_key(offer: Offer) -> tuple:
+    details = offer.details or {}
+    if offer.mode == "flights" and details.get("flightNumber"):
+        return ("flights", details["flightNumber"], details.get("departDate"), details.get("cabin"))
+    if offer.mode == "hotels" and details.get("hotelCode"):
+        return ("hotels", details["hotelCode"], details.get("checkIn"))
+    return (offer.mode, offer.name.lower(), details.get("vehicleClass"))
+
+
+def merge_offers(batches: Iterable[List[Offer]]) -> List[Offer]:
+    """Merge supplier results, keeping the cheapest offer for each de-duplication key"""
+    best: Dict[tuple, Offer] = {}
+    for batch in batches:
+        for offer in batch:
+            key = dedupe_key(offer)
+            current = best.get(key)
+            if current is None or offer.price < current.price:
+                best[key] = offer
+    return sorted(best.values(), key=lambda o: o.price)
+
+
+# Upper bounds (ms) of the search latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 200, 400, 800, 1600, 3200)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, value_ms: float) -> None:
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": {
+                **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                "gt_last": self.buckets[-1],
+            },
+        }
+
+
+class SearchMetrics:
+    """Per-mode supplier fan-out duration, plus time-to-first-offer and total duration of streamed searches"""
+
+    def __init__(self):
+        self.duration: Dict[str, LatencyHistogram] = {}
+        self.stream_first_offer: Dict[str, LatencyHistogram] = {}
+        self.stream_duration: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, mode: str, duration_ms: float) -> None:
+        self.duration.setdefault(mode, LatencyHistogram()).observe(duration_ms)
+
+    def observe_stream(self, mode: str, first_offer_ms: Optional[float], duration_ms: float) -> None:
+        if first_offer_ms is not None:
+            self.stream_first_offer.setdefault(mode, LatencyHistogram()).observe(first_offer_ms)
+        self.stream_duration.setdefault(mode, LatencyHistogram()).observe(duration_ms)
+
+    def snapshot(self) -> dict:
+        return {
+            "fan_out_duration": {mode: h.snapshot() for mode, h in self.duration.items()},
+            "stream_time_to_first_offer": {mode: h.snapshot() for mode, h in self.stream_first_offer.items()},
+            "stream_duration": {mode: h.snapshot() for mode, h in self.stream_duration.items()},
+        }
+
+
+search_metrics = SearchMetrics()
+
+
+class SearchAggregator:
+    """Fans a search out to every supplier for the mode concurrently and merges what returns in time"""
+
+    def __init__(self, suppliers: List[SupplierAdapter], deadline: float):
+        self.suppliers = suppliers
+        self.deadline = deadline
+
+    def suppliers_for(self, mode: str) -> List[SupplierAdapter]:
+        return [s for s in self.suppliers if s.supports(mode)]
+
+    async def _call(self, supplier: SupplierAdapter, params: SearchParams) -> List[Offer]:
+        try:
+            offers = await asyncio.wait_for(supplier.fetch(params), supplier.timeout)
+        except asyncio.CancelledError:
+            supplier.breaker.release()
+            raise
+        except Exception:
+            supplier.breaker.record_failure()
+            raise
+        supplier.breaker.record_success()
+        return offers
+
+    async def fan_out(self, params: SearchParams, result: SearchResult) -> AsyncIterator[Tuple[str, List[Offer]]]:
+        """
+        Yields (supplier name, offers) as each supplier answers, until all are done or the deadline passes.
+        Supplier outcomes (ok / timed out / failed / circuit open) are recorded on `result`.
+        """
+        tasks = {}
+        for supplier in self.suppliers_for(params.mode):
+            if not supplier.breaker.allow():
+                result.skipped.append(supplier.name)
+                continue
+            tasks[asyncio.ensure_future(self._call(supplier, params))] = supplier
+
+        deadline = time.monotonic() + self.deadline
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    supplier = tasks[task]
+                    error = task.exception()
+                    if error is None:
+                        result.suppliers.append(supplier.name)
+                        yield supplier.name, task.result()
+                    elif isinstance(error, asyncio.TimeoutError):
+                        result.timed_out.append(supplier.name)
+                    else:
+                        logger.warning("Supplier %s failed: %r", supplier.name, error)
+                        result.failed.append(supplier.name)
+            for task in pending:
+                # Over the overall deadline: return what we have and count it against the supplier
+                task.cancel()
+                tasks[task].breaker.record_failure()
+                result.timed_out.append(tasks[task].name)
+        finally:
+            # Consumer went away (e.g. client disconnected mid-stream): drop outstanding calls. A task
+            # cancelled before it started never reaches _call's handler, so release its breaker here
+            for task in pending:
+                task.cancel()
+                tasks[task].breaker.release()
+
+    async def search(self, params: SearchParams) -> SearchResult:
+        started = time.perf_counter()
+        result = SearchResult(offers=[])
+        batches = [offers async for _, offers in self.fan_out(params, result)]
+        result.offers = merge_offers(batches)
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        search_metrics.observe(params.mode, result.duration_ms)
+        return result
+
+    def status(self) -> List[dict]:
+        return [
+            {"name": s.name, "modes": sorted(s.modes), "timeout": s.timeout,
+             "breaker": s.breaker.state, "consecutive_failures": s.breaker.failures}
+            for s in self.suppliers
+        ]
+
+
+def build_suppliers(spec: str = SEARCH_SUPPLIERS_JSON) -> List[SupplierAdapter]:
+    """
+    Suppliers from SEARCH_SUPPLIERS_JSON, e.g.
+    [{"name": "fake-air", "modes": ["flights"], "url": "http://localhost:9101", "timeout_ms": 500}]
+    Without it, N synthetic in-process suppliers per mode are used.
+    """
+    if spec:
+        suppliers: List[SupplierAdapter] = []
+        for entry in json.loads(spec):
+            timeout = entry.get("timeout_ms", 500) / 1000
+            if entry.get("url"):
+                suppliers.append(HttpSupplier(entry["name"], entry["modes"], timeout, entry["url"]))
+            else:
+                suppliers.append(SyntheticSupplier(entry["name"], entry["modes"], timeout, entry.get("latency_ms", 0)))
+        return suppliers
+
+    labels = {"flights": "air", "hotels": "hotel", "cars": "car"}
+    return [
+        SyntheticSupplier(f"synthetic-{labels[mode]}-{n + 1}", [mode], SEARCH_DEADLINE_SECONDS, SEARCH_SYNTHETIC_LATENCY_MS)
+        for mode in labels
+        for n in range(SEARCH_SYNTHETIC_SUPPLIERS)
+    ]
+
+
+aggregator = SearchAggregator(build_suppliers(), deadline=SEARCH_DEADLINE_SECONDS)
@@ -0,0 +1,138 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from config import DEV_MODE, SESSION_ACTIVE_KID, SESSION_SIGNING_KEYS, SESSION_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _encode_header(kid: str) -> str:
+    return _b64encode(json.dumps({"alg": "HS256", "typ": "JWT", "kid": kid}, separators=(",", ":")).encode("utf-8"))
+
+
+class InvalidToken(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SessionClaims:
+    user_id: int
+    org_id: int
+    role: str
+    issued_at: int
+    expires_at: int
+
+
+class SessionTokens:
+    """
+    HS256 JWTs carrying user id, org id and role. The header's kid names the signing key,
+    so keys rotate by adding a new kid, making it active, and dropping the old one once
+    its tokens have expired. Verification is CPU only: no database or cache lookups.
+    """
+
+    def __init__(self, keys: Dict[str, str], active_kid: str, ttl_seconds: int,
+                 clock: Callable[[], float] = time.time, allow_dev_key: bool = False):
+        if not keys:
+            if not allow_dev_key:
+                raise ValueError("SESSION_SIGNING_KEYS is not set (APP_ENV=development allows a random per-process key)")
+            # Dev fallback: tokens only verify in this process and die with it
+            logger.warning("SESSION_SIGNING_KEYS is not set; using a random per-process signing key")
+            keys = {"dev": secrets.token_urlsafe(32)}
+            active_kid = "dev"
+        if active_kid not in keys:
+            raise ValueError(f"SESSION_ACTIVE_KID {active_kid!r} is not in SESSION_SIGNING_KEYS")
+        self.active_kid = active_kid
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # Keyed HMAC states, copied per token instead of re-deriving the key pads each time
+        self._macs = {kid: hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256) for kid, secret in keys.items()}
+        # Headers we issue never change: encode them once, and recognise them on verify without decoding
+        self._kid_by_header = {_encode_header(kid): kid for kid in keys}
+        self._header = _encode_header(active_kid)
+
+    def _sign(self, kid: str, signing_input: bytes) -> bytes:
+        mac = self._macs[kid].copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def issue(self, user_id: int, org_id: int, role: str) -> str:
+        now = int(self.clock())
+        payload = _b64encode(json.dumps(
+            {"sub": str(user_id), "org": org_id, "role": role, "iat": now, "exp": now + self.ttl_seconds},
+            separators=(",", ":"),
+        ).encode("utf-8"))
+        signing_input = f"{self._header}.{payload}"
+        return f"{signing_input}.{_b64encode(self._sign(self.active_kid, signing_input.encode('ascii')))}"
+
+    def verify(self, token: str) -> SessionClaims:
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            kid = self._kid_by_header.get(header_b64)
+            if kid is None:
+                header = json.loads(_b64decode(header_b64))
+                kid = header.get("kid")
+                if header.get("alg") != "HS256" or kid not in self._macs:
+                    raise InvalidToken("Unknown signing key")
+            expected = self._sign(kid, f"{header_b64}.{payload_b64}".encode("ascii"))
+            if not hmac.compare_digest(expected, _b64decode(signature_b64)):
+                raise InvalidToken("Bad signature")
+            claims = json.loads(_b64decode(payload_b64))
+            session = SessionClaims(int(claims["sub"]), int(claims["org"]), claims["role"],
+                                    int(claims["iat"]), int(claims["exp"]))
+        except InvalidToken:
+            raise
+        except (ValueError, KeyError, TypeError, AttributeError, UnicodeError, binascii.Error):
+            raise InvalidToken("Malformed token")
+        if session.expires_at <= self.clock():
+            raise InvalidToken("Token expired")
+        return session
+
+
+session_tokens = SessionTokens(SESSION_SIGNING_KEYS, SESSION_ACTIVE_KID, SESSION_TTL_SECONDS, allow_dev_key=DEV_MODE)
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def looks_like_session_token(token: str) -> bool:
+    # header.payload.signature; API key credentials (ak_...:secret) never contain a dot
+    return token.count(".") == 2
+
+
+async def optional_session(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> Optional[SessionClaims]:
+    """
+    The caller's session, or None when no session token was sent (e.g. an API key bearer);
+    a session token that does not verify is a 401
+    """
+    if credentials is None or not looks_like_session_token(credentials.credentials):
+        return None
+    return await current_session(credentials)
+
+
+async def current_session(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> SessionClaims:
+    """The caller's session; 401 without a valid, unexpired session token"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return session_tokens.verify(credentials.credentials)
+    except InvalidToken as exc:
+        raise HTTPException(status_code=401, detail=f"Invalid session token: {exc}",
+                            headers={"WWW-Authenticate": "Bearer"})
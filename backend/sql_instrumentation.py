@@ -0,0 +1,194 @@
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SQL_INSTRUMENTATION_ENABLED, SQL_N_PLUS_ONE_THRESHOLD, SQL_SERVER_TIMING, SQL_SLOW_QUERY_MS
+from observability import UNMATCHED_ROUTE, _escape
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_ROUTE = "<background>"
+
+# Quoted literals in statement text (e.g. from text() with inline values) are redacted in logs too
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.$])\d+(?:\.\d+)?\b")
+
+
+def redact_statement(statement: str) -> str:
+    return _NUMBER_LITERAL.sub("?", _STRING_LITERAL.sub("'?'", " ".join(statement.split())))
+
+
+def describe_parameters(parameters) -> str:
+    """Shape of the bound parameters, never their values"""
+    if not parameters:
+        return "none"
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{len(parameters)} rows (executemany)"
+    count = len(parameters) if hasattr(parameters, "__len__") else 1
+    return f"{count} redacted"
+
+
+class RequestQueries:
+    """SQL issued while handling one request; shared by every task and thread the request spawns"""
+    __slots__ = ("count", "seconds", "statements", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+        self.slow = 0
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements issued at least `threshold` times: N+1 candidates"""
+        return sorted(((s, n) for s, n in self.statements.items() if n >= threshold), key=lambda x: -x[1])
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("sql_request_queries", default=None)
+
+
+class _RouteTotals:
+    __slots__ = ("requests", "queries", "seconds", "n_plus_one", "slow")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.n_plus_one = 0
+        self.slow = 0
+
+
+class SqlMetrics:
+    """Per route template: queries, DB time, requests flagged for N+1, slow statements"""
+
+    def __init__(self, slow_ms: float, n_plus_one_threshold: int):
+        self.slow_seconds = slow_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._routes: Dict[str, _RouteTotals] = {}
+        self._lock = threading.Lock()
+        self.background_queries = 0
+        self.background_seconds = 0.0
+        self.background_slow = 0
+
+    def record_query(self, statement: str, parameters, seconds: float) -> None:
+        queries = _current.get()
+        slow = seconds >= self.slow_seconds
+        if queries is None:
+            # Background threads: count only, never attributed to whichever request is running
+            self.background_queries += 1
+            self.background_seconds += seconds
+            self.background_slow += slow
+        else:
+            queries.count += 1
+            queries.seconds += seconds
+            queries.statements[statement] = queries.statements.get(statement, 0) + 1
+            queries.slow += slow
+        if slow:
+            logger.warning("Slow query %.1f ms (params: %s): %s", seconds * 1000,
+                           describe_parameters(parameters), redact_statement(statement))
+
+    def finish_request(self, method: str, route: str, queries: RequestQueries) -> None:
+        repeated = queries.repeated(self.n_plus_one_threshold)
+        if repeated:
+            statement, count = repeated[0]
+            logger.warning("Possible N+1 in %s %s: statement ran %d times (%d queries total): %s",
+                           method, route, count, queries.count, redact_statement(statement))
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = _RouteTotals()
+            totals.requests += 1
+            totals.queries += queries.count
+            totals.seconds += queries.seconds
+            totals.n_plus_one += bool(repeated)
+            totals.slow += queries.slow
+
+    def render(self) -> str:
+        """Prometheus text format, appended to /metrics"""
+        with self._lock:
+            routes = sorted((route, t.queries, t.seconds, t.n_plus_one, t.slow) for route, t in self._routes.items())
+        # Queries outside any request: write-behind threads, startup, management commands
+        routes.append((BACKGROUND_ROUTE, self.background_queries, self.background_seconds, 0, self.background_slow))
+        series = [
+            ("db_queries_total", "counter", "SQL statements executed while handling requests.", 1),
+            ("db_query_seconds_total", "counter", "Time spent in SQL statements while handling requests.", 2),
+            ("db_n_plus_one_requests_total", "counter", "Requests that repeated one statement N+1 style.", 3),
+            ("db_slow_queries_total", "counter", "Statements slower than SQL_SLOW_QUERY_MS.", 4),
+        ]
+        lines: List[str] = []
+        for name, kind, help_text, index in series:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for row in routes:
+                value = f"{row[index]:.6f}" if isinstance(row[index], float) else row[index]
+                lines.append(f'{name}{{route="{_escape(row[0])}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+sql_metrics = SqlMetrics(SQL_SLOW_QUERY_MS, SQL_N_PLUS_ONE_THRESHOLD)
+
+
+def attach_query_tracking(engine: Engine, metrics: SqlMetrics = sql_metrics) -> None:
+    """Time every cursor execution on `engine` (for async engines pass engine.sync_engine)"""
+    if not SQL_INSTRUMENTATION_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        metrics.record_query(statement, parameters, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # The statement failed, so after_cursor_execute will not pop its start time
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class QueryTrackingMiddleware:
+    """
+    ASGI middleware attributing SQL to the request: a Server-Timing header with DB time and
+    query count so far (sent with the response headers), per-route totals once the body is done,
+    and an N+1 warning when one statement repeats SQL_N_PLUS_ONE_THRESHOLD times or more.
+    The totals are also left in scope["state"]["sql"] for the http_request log.
+    """
+
+    def __init__(self, app, metrics: SqlMetrics = sql_metrics, server_timing: bool = SQL_SERVER_TIMING):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        scope.setdefault("state", {})["sql"] = queries
+        token = _current.set(queries)
+
+        async def send_wrapper(message):
+            if self.server_timing and message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", queries.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.metrics.finish_request(scope["method"], route, queries)
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import uuid
+
+# Settings are read at import time, so point every engine at a throwaway database before any app module loads
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="laasy-tests-"), "test.db")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["HTTP_LOG_ENABLED"] = "false"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ.setdefault("SESSION_SIGNING_KEYS", "test:" + "t" * 32)
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import migrations
+    from db import engine
+    from main import app
+
+    migrations.upgrade(engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(client):
+    """A freshly registered traveler: their email and Authorization headers"""
+    email = f"traveler-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/auth/register", json={"email": email, "password": "correct horse battery"})
+    assert response.status_code == 200, response.text
+    return {"email": email, "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
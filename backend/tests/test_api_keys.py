@@ -0,0 +1,21 @@
+import routers.api_keys
+from auth_cache import api_key_cache, credential_digest
+
+
+def test_bootstrap_is_hidden_unless_enabled(client):
+    assert client.post("/api-keys/bootstrap").status_code == 404
+
+
+def test_bootstrap_key_reaches_internal_stats_without_mutating_the_cache(client, monkeypatch):
+    monkeypatch.setattr(routers.api_keys, "API_KEY_BOOTSTRAP_ENABLED", True)
+    response = client.post("/api-keys/bootstrap")
+    assert response.status_code == 200, response.text
+    key = response.json()
+    headers = {"Authorization": f"Bearer {key['api_key']}:{key['api_secret']}"}
+
+    assert client.get("/internal/db-pool", headers=headers).status_code == 200
+    assert client.get("/internal/db-pool", headers=headers).status_code == 200
+    # last_used is stamped on a per-request copy, never on the record other requests share
+    cached = api_key_cache.get(credential_digest(key["api_key"], key["api_secret"]))
+    assert cached is not None and cached.last_used is None
+    assert client.post("/api-keys/bootstrap").status_code == 400
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+import rollups
+from booking_items import backfill, item_rows
+from db import SessionLocal, engine
+from models import BookingDB, BookingItemDB
+
+
+def booking_item_rows(booking_id):
+    with SessionLocal() as db:
+        return db.execute(select(BookingItemDB).where(BookingItemDB.booking_id == booking_id)).scalars().all()
+
+
+def spend(client):
+    return client.get("/reports/spend", params={"group_by": "mode"}).json()
+
+
+def test_item_rows_default_missing_fields():
+    rows = item_rows("CONF1", [{"mode": "cars", "id": "car-1"}, {"mode": "flights", "price": 99.999, "policyStatus": "out"}])
+    assert [(r["mode"], r["supplier_ref"], r["is_in_policy"], r["price_amount"], r["price_currency"]) for r in rows] == [
+        ("cars", "car-1", True, 0.0, "USD"),
+        ("flights", None, False, 100.0, "USD"),
+    ]
+
+
+def test_rollup_deltas_group_items_by_key():
+    created = datetime(2025, 3, 4, 12)
+    items = [
+        {"mode": "flights", "price": 100, "currency": "USD"},
+        {"mode": "flights", "price": 50, "currency": "USD"},
+        {"mode": "flights", "price": 20, "currency": "USD", "policyStatus": "out"},
+    ]
+    deltas = rollups.rollup_deltas(1, 7, None, created, items)
+    by_policy = {d["in_policy"]: (d["item_count"], d["amount_total"], d["policy_id"]) for d in deltas}
+    assert by_policy == {True: (2, 150.0, 0), False: (1, 20.0, 0)}
+    assert rollups.merge_deltas(deltas + deltas)[0]["item_count"] == 4
+
+
+def test_booking_writes_item_rows_and_rollups(client, user):
+    before = spend(client)
+    body = {"items": [
+        {"id": "UA-1", "mode": "flights", "price": 250.5},
+        {"id": "HOTEL-1", "mode": "hotels", "price": 120},
+    ]}
+    response = client.post("/bookings", json=body, headers=user["headers"])
+    assert response.status_code == 200, response.text
+
+    rows = booking_item_rows(response.json()["id"])
+    assert sorted((r.mode, r.supplier_ref, float(r.price_amount)) for r in rows) == [
+        ("flights", "UA-1", 250.5), ("hotels", "HOTEL-1", 120.0),
+    ]
+    after = spend(client)
+    assert after["items"] == before["items"] + 2
+    assert round(after["total"] - before["total"], 2) == 370.5
+
+
+def test_booking_without_items(client, user):
+    before = spend(client)
+    response = client.post("/bookings", json={"items": []}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    assert booking_item_rows(response.json()["id"]) == []
+    assert spend(client)["items"] == before["items"]
+
+
+
+def test_backfill_copies_items_of_bookings_without_item_rows(client, user):
+    now = datetime.utcnow()
+    legacy = {"id": "LEGACY" + now.strftime("%H%M%S%f"), "user_id": 1, "policy_id": None, "total_amount": 80.0,
+              "currency": "USD", "status": "confirmed", "created_at": now, "updated_at": now,
+              "items": [{"id": "CAR-1", "mode": "cars", "price": 80}]}
+    with engine.begin() as conn:
+        conn.execute(insert(BookingDB), [legacy])
+        assert backfill(conn, batch_size=1)["items"] >= 1
+    assert [(r.mode, r.supplier_ref) for r in booking_item_rows(legacy["id"])] == [("cars", "CAR-1")]
+
+    # Re-running copies nothing (bookings without items are scanned again but have nothing to copy)
+    with engine.begin() as conn:
+        assert backfill(conn)["items"] == 0
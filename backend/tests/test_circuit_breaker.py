@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+from models import SearchParams
+from search_engine import CircuitBreaker, SearchAggregator, SearchResult, SupplierAdapter
+
+
+class ScriptedSupplier(SupplierAdapter):
+    """Fails, hangs or answers as told"""
+
+    def __init__(self, name="scripted", timeout=1.0):
+        super().__init__(name, ["flights"], timeout)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.behaviour = "ok"
+
+    async def fetch(self, params):
+        if self.behaviour == "fail":
+            raise RuntimeError("supplier down")
+        if self.behaviour == "hang":
+            await asyncio.sleep(3600)
+        return []
+
+
+def open_breaker(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def make_half_open(breaker):
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    assert breaker.state == "half-open"
+
+
+async def collect(aggregator, result):
+    return [batch async for batch in aggregator.fan_out(SearchParams(mode="flights"), result)]
+
+
+def test_breaker_opens_after_threshold_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    open_breaker(breaker)
+    make_half_open(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_open_breaker_skips_supplier():
+    supplier = ScriptedSupplier()
+    open_breaker(supplier.breaker)
+    result = SearchResult(offers=[])
+    assert asyncio.run(collect(SearchAggregator([supplier], deadline=1.0), result)) == []
+    assert result.skipped == ["scripted"]
+
+
+def test_failures_through_the_aggregator_open_the_breaker():
+    supplier = ScriptedSupplier()
+    supplier.behaviour = "fail"
+    aggregator = SearchAggregator([supplier], deadline=1.0)
+    for _ in range(2):
+        result = SearchResult(offers=[])
+        asyncio.run(collect(aggregator, result))
+        assert result.failed == ["scripted"]
+    assert supplier.breaker.state == "open"
+
+
+def test_deadline_counts_as_a_failure():
+    supplier = ScriptedSupplier()
+    supplier.behaviour = "hang"
+    result = SearchResult(offers=[])
+    asyncio.run(collect(SearchAggregator([supplier], deadline=0.01), result))
+    assert result.timed_out == ["scripted"]
+    assert supplier.breaker.failures == 1
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    supplier = ScriptedSupplier()
+    supplier.behaviour = "hang"
+    open_breaker(supplier.breaker)
+    make_half_open(supplier.breaker)
+    aggregator = SearchAggregator([supplier], deadline=60)
+
+    async def cancel_mid_trial():
+        search = asyncio.ensure_future(collect(aggregator, SearchResult(offers=[])))
+        await asyncio.sleep(0.01)
+        search.cancel()
+        await asyncio.gather(search, return_exceptions=True)
+
+    asyncio.run(cancel_mid_trial())
+    assert supplier.breaker.state == "half-open"
+    supplier.behaviour = "ok"
+    result = SearchResult(offers=[])
+    asyncio.run(collect(aggregator, result))
+    assert result.suppliers == ["scripted"]
+    assert supplier.breaker.state == "closed"
+
@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from db_pool import attach_pool_stats, pool_options, pool_stats
+
+
+def test_pool_stats_count_checkouts_and_exhaustion(tmp_path):
+    url = "sqlite:///" + str(tmp_path / "pool.db")
+    engine = create_engine(url, **pool_options(url, "test-pool", 1, 0, 0.05))
+    attach_pool_stats(engine, "test-pool")
+    try:
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+            snapshot = pool_stats["test-pool"].snapshot()
+            assert snapshot["checked_out"] == 1
+        snapshot = pool_stats["test-pool"].snapshot()
+        assert (snapshot["checkouts"], snapshot["checkins"], snapshot["connects"]) == (1, 1, 1)
+        assert snapshot["exhausted"] == 1
+        assert (snapshot["pool_size"], snapshot["max_overflow"]) == (1, 0)
+    finally:
+        engine.dispose()
+        pool_stats.pop("test-pool", None)
+
+
+def test_internal_endpoints_need_an_api_key(client):
+    assert client.get("/internal/db-pool").status_code in (401, 403)
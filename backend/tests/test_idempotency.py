@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from idempotency import CLAIM_SECONDS, REPLAYED_HEADER, REQUEST_ID_HEADER, IdempotencyGuard, MemoryStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_handler():
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    return calls, execute
+
+
+def test_replay_returns_the_stored_response():
+    guard = IdempotencyGuard(MemoryStore(60, 100), wait_seconds=1)
+    calls, execute = counting_handler()
+    first = asyncio.run(guard.run("r1", "bookings", {"a": 1}, execute))
+    second = asyncio.run(guard.run("r1", "bookings", {"a": 1}, execute))
+    assert first == ({"n": 1}, False)
+    assert second == ({"n": 1}, True)
+    assert len(calls) == 1
+
+
+def test_same_id_with_a_different_body_is_a_conflict():
+    guard = IdempotencyGuard(MemoryStore(60, 100), wait_seconds=1)
+    _, execute = counting_handler()
+    asyncio.run(guard.run("r1", "bookings", {"a": 1}, execute))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(guard.run("r1", "bookings", {"a": 2}, execute))
+    assert error.value.status_code == 422
+    assert guard.conflicts == 1
+
+
+def test_failed_request_releases_its_claim():
+    guard = IdempotencyGuard(MemoryStore(60, 100), wait_seconds=1)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(guard.run("r1", "bookings", {}, fail))
+    _, execute = counting_handler()
+    assert asyncio.run(guard.run("r1", "bookings", {}, execute)) == ({"n": 1}, False)
+
+
+def test_concurrent_duplicate_waits_for_the_original():
+    guard = IdempotencyGuard(MemoryStore(60, 100), wait_seconds=5)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def both():
+        return await asyncio.gather(guard.run("r1", "s", {}, slow), guard.run("r1", "s", {}, slow))
+
+    assert sorted(asyncio.run(both()), key=lambda r: r[1]) == [({"ok": True}, False), ({"ok": True}, True)]
+    assert len(calls) == 1 and guard.waits == 1
+
+
+def test_full_store_never_evicts_an_in_flight_claim():
+    clock = Clock()
+    store = MemoryStore(ttl_seconds=60, max_entries=2, clock=clock)
+
+    async def scenario():
+        assert await store.claim("in-flight", "f")
+        for i in range(5):
+            assert await store.claim(f"done-{i}", "f")
+            await store.complete(f"done-{i}", {"i": i})
+        # Still claimed: a duplicate must not be allowed to execute
+        assert not await store.claim("in-flight", "f")
+        assert (await store.get("done-0")) is None and (await store.get("done-4")).response == {"i": 4}
+        clock.now += CLAIM_SECONDS
+        # A claim abandoned by a dead worker expires
+        assert await store.claim("in-flight", "f")
+
+    asyncio.run(scenario())
+    assert store.stats()["evictions"] == 3
+
+
+def test_booking_retry_is_replayed(client, user):
+    headers = {**user["headers"], REQUEST_ID_HEADER: uuid.uuid4().hex}
+    body = {"items": [{"id": "UA-9", "mode": "flights", "price": 99}]}
+    first = client.post("/bookings", json=body, headers=headers)
+    retry = client.post("/bookings", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers.get(REPLAYED_HEADER) == "true"
+    changed = client.post("/bookings", json={"items": []}, headers=headers)
+    assert changed.status_code == 422
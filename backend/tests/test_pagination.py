@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert
+
+from pagination import NEXT_CURSOR_HEADER, KeysetPager, PageParams, decode_cursor, encode_cursor
+
+metadata = MetaData()
+things = Table(
+    "things", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(20)),
+    Column("created_at", DateTime, nullable=True),
+)
+pager = KeysetPager(things.c.created_at, things.c.id, {
+    "id": ([things.c.id], lambda row: row.id),
+    "name": ([things.c.name], lambda row: row.name),
+})
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    same = datetime(2025, 1, 1)
+    rows = [{"id": i, "name": f"n{i}", "created_at": None if i % 5 == 0 else same if i % 3 == 0 else datetime(2025, 1, 1 + i % 7)}
+            for i in range(1, 41)]
+    with engine.begin() as connection:
+        connection.execute(insert(things), rows)
+    with engine.connect() as connection:
+        yield connection
+
+
+def walk(conn, limit, fields=None):
+    pages, after = [], None
+    while True:
+        page = PageParams(limit=limit, after=after, fields=fields)
+        items, cursor = pager.page(conn.execute(pager.statement(page)).all(), page)
+        pages.append(items)
+        if cursor is None:
+            return pages
+        after = decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 40, 100])
+def test_pages_cover_every_row_once_in_keyset_order(conn, limit):
+    ids = [item["id"] for items in walk(conn, limit) for item in items]
+    expected = [row.id for row in conn.execute(things.select().order_by(things.c.created_at, things.c.id))]
+    assert ids == expected and len(ids) == 40
+
+
+def test_projection_selects_only_requested_fields(conn):
+    page = PageParams(limit=5, after=None, fields=["name"])
+    statement = pager.statement(page)
+    assert set(statement.selected_columns.keys()) == {"created_at", "id", "name"}
+    items, _ = pager.page(conn.execute(statement).all(), page)
+    assert all(list(item) == ["name"] for item in items)
+
+
+def test_cursor_round_trip_and_errors():
+    assert decode_cursor(encode_cursor(datetime(2025, 3, 4, 5, 6), 9)) == (datetime(2025, 3, 4, 5, 6), 9)
+    assert decode_cursor(encode_cursor(None, "CONF1")) == (None, "CONF1")
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not a cursor")
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException):
+        pager.selected_fields(PageParams(limit=1, after=None, fields=["password"]))
+
+
+def test_travelers_endpoint_follows_the_next_cursor(client, user):
+    seen, params = [], {"limit": 2}
+    while True:
+        response = client.get("/travelers", params=params)
+        assert response.status_code == 200, response.text
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+        params = {"limit": 2, "cursor": cursor}
+    assert len(seen) == len(set(seen)) >= 1
+    assert client.get("/travelers", params={"cursor": "%%%"}).status_code == 400
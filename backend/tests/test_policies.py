@@ -0,0 +1,15 @@
+RULES = [{"key": "flights.max_price", "op": "<=", "value": "500"}]
+
+
+def test_create_publish_and_list_return_the_same_shape(client, user):
+    created = client.post("/policies", json={"name": "Travel policy", "rules": RULES})
+    assert created.status_code == 200, created.text
+    policy = created.json()
+    assert policy["rules"] == RULES
+
+    published = client.post(f"/policies/{policy['id']}/publish")
+    assert published.status_code == 200, published.text
+    assert published.json() == {**policy, "status": "published"}
+
+    listed = {p["id"]: p for p in client.get("/policies", params={"limit": 1000}).json()}
+    assert listed[policy["id"]] == {**policy, "status": "published"}
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+from rate_limit import GcraRateLimiter, MemoryBackend, SQLiteBackend
+
+
+class RecordingSQLiteBackend(SQLiteBackend):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def update(self, key, fn):
+        self.threads.append(threading.current_thread())
+        return super().update(key, fn)
+
+
+def test_sqlite_backend_updates_off_the_event_loop(tmp_path):
+    backend = RecordingSQLiteBackend(str(tmp_path / "rate-limit.sqlite3"))
+    limiter = GcraRateLimiter(backend, period_seconds=60, clock=lambda: 1000.0)
+
+    async def hits():
+        return await asyncio.gather(*(limiter.hit_async("k", 2) for _ in range(3)))
+
+    assert [decision.allowed for decision in asyncio.run(hits())].count(True) == 2
+    assert len(backend.threads) == 3
+    assert threading.main_thread() not in backend.threads
+
+
+def test_memory_backend_updates_inline():
+    limiter = GcraRateLimiter(MemoryBackend(), period_seconds=60, clock=lambda: 1000.0)
+    assert asyncio.run(limiter.hit_async("k", 1)).allowed
+    assert not asyncio.run(limiter.hit_async("k", 1)).allowed
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_gcra_allows_a_burst_of_limit_then_one_per_emission_interval():
+    clock = Clock()
+    limiter = GcraRateLimiter(MemoryBackend(), period_seconds=60, clock=clock)
+    decisions = [limiter.hit("k", 3) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    assert decisions[-1].retry_after == 20
+    assert decisions[-1].headers()["Retry-After"] == "20"
+
+    clock.now += 19.9
+    assert not limiter.hit("k", 3).allowed
+    clock.now += 0.1
+    assert limiter.hit("k", 3).allowed
+
+
+def test_gcra_recovers_the_full_burst_after_a_period():
+    clock = Clock()
+    limiter = GcraRateLimiter(MemoryBackend(), period_seconds=60, clock=clock)
+    for _ in range(3):
+        limiter.hit("k", 3)
+    clock.now += 60
+    assert limiter.hit("k", 3).remaining == 2
+
+
+def test_gcra_keys_are_independent_and_denials_do_not_consume():
+    clock = Clock()
+    limiter = GcraRateLimiter(MemoryBackend(), period_seconds=60, clock=clock)
+    assert limiter.hit("a", 1).allowed
+    for _ in range(5):
+        assert not limiter.hit("a", 1).allowed
+    assert limiter.hit("b", 1).allowed
+    clock.now += 60
+    assert limiter.hit("a", 1).allowed
+
+
+def test_zero_limit_denies_everything():
+    decision = GcraRateLimiter(MemoryBackend(), period_seconds=60).hit("k", 0)
+    assert not decision.allowed and decision.limit == 0
+
+
+def test_sqlite_backend_state_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    clock = Clock()
+    first = GcraRateLimiter(SQLiteBackend(path), period_seconds=60, clock=clock)
+    second = GcraRateLimiter(SQLiteBackend(path), period_seconds=60, clock=clock)
+    assert first.hit("k", 2).allowed
+    assert second.hit("k", 2).allowed
+    assert not first.hit("k", 2).allowed
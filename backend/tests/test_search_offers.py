@@ -0,0 +1,25 @@
+from models import SearchParams
+from search_engine import mk_offers
+
+
+def test_flight_offers_without_route_or_date():
+    offer = mk_offers(SearchParams(mode="flights"), "s1", count=1)[0]
+    assert not offer.name.endswith("-") and not offer.name.endswith(" ")
+    assert offer.id == f"s1:{offer.details['flightNumber']}"
+
+
+def test_flight_offers_with_route_and_date():
+    params = SearchParams(mode="flights", origin="SFO", destination="JFK", departDate="2025-11-03")
+    offer = mk_offers(params, "s1", count=1)[0]
+    assert offer.name.endswith(" SFO-JFK")
+    assert offer.id == f"s1:{offer.details['flightNumber']}:2025-11-03"
+
+
+def test_one_sided_route_has_no_dangling_dash():
+    offer = mk_offers(SearchParams(mode="flights", destination="JFK"), "s1", count=1)[0]
+    assert offer.name.endswith(" JFK")
+
+
+def test_hotel_offer_id_without_date():
+    offer = mk_offers(SearchParams(mode="hotels", city="Austin"), "s1", count=1)[0]
+    assert offer.id == f"s1:{offer.details['hotelCode']}"
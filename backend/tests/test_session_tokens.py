@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from session_tokens import InvalidToken, SessionTokens, optional_session
+
+OLD = {"k1": "a" * 40}
+ROTATED = {"k1": "a" * 40, "k2": "b" * 40}
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_round_trip():
+    tokens = SessionTokens(OLD, "k1", 60, clock=lambda: 1000)
+    claims = tokens.verify(tokens.issue(42, 7, "Traveler"))
+    assert (claims.user_id, claims.org_id, claims.role, claims.expires_at) == (42, 7, "Traveler", 1060)
+
+
+def test_rotation_keeps_old_tokens_valid_until_the_key_is_dropped():
+    before = SessionTokens(OLD, "k1", 60, clock=lambda: 1000)
+    during = SessionTokens(ROTATED, "k2", 60, clock=lambda: 1000)
+    after = SessionTokens({"k2": ROTATED["k2"]}, "k2", 60, clock=lambda: 1000)
+
+    old_token = before.issue(1, 1, "Traveler")
+    new_token = during.issue(2, 1, "Traveler")
+    assert during.verify(old_token).user_id == 1
+    assert after.verify(new_token).user_id == 2
+    with pytest.raises(InvalidToken, match="Unknown signing key"):
+        after.verify(old_token)
+    with pytest.raises(InvalidToken, match="Unknown signing key"):
+        before.verify(new_token)
+
+
+def test_rejects_tampered_and_expired_tokens():
+    now = [1000]
+    tokens = SessionTokens(OLD, "k1", 60, clock=lambda: now[0])
+    header, payload, signature = tokens.issue(1, 1, "Traveler").split(".")
+    forged = SessionTokens({"k1": "c" * 40}, "k1", 60, clock=lambda: now[0]).issue(1, 1, "OrgAdmin").split(".")[1]
+    with pytest.raises(InvalidToken, match="Bad signature"):
+        tokens.verify(f"{header}.{forged}.{signature}")
+    with pytest.raises(InvalidToken, match="Malformed"):
+        tokens.verify("not-a-token")
+    now[0] = 1060
+    with pytest.raises(InvalidToken, match="expired"):
+        tokens.verify(f"{header}.{payload}.{signature}")
+
+
+def test_signing_keys_are_required_outside_development():
+    with pytest.raises(ValueError, match="SESSION_SIGNING_KEYS"):
+        SessionTokens({}, "", 60)
+    assert SessionTokens({}, "", 60, allow_dev_key=True).active_kid == "dev"
+
+
+def test_optional_session_ignores_api_key_credentials():
+    assert asyncio.run(optional_session(None)) is None
+    assert asyncio.run(optional_session(bearer("ak_abc:secret"))) is None
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(optional_session(bearer("a.b.c")))
+    assert error.value.status_code == 401
+
+
+def test_booking_with_an_api_key_bearer_is_not_rejected(client, user):
+    response = client.post("/bookings", json={"items": []}, headers={"Authorization": "Bearer ak_unknown:secret"})
+    assert response.status_code == 200, response.text
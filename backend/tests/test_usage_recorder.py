@@ -0,0 +1,38 @@
+import asyncio
+
+from usage_recorder import UsageRecorder
+
+
+class RecordingRecorder(UsageRecorder):
+    def __init__(self, **kwargs):
+        super().__init__(session_factory=None, **kwargs)
+        self.rows = []
+
+    def _write(self, batch):
+        self.rows.extend(batch)
+
+
+def test_stop_flushes_queued_rows():
+    recorder = RecordingRecorder(max_queue=100, batch_size=50, flush_interval=60)
+    recorder.start()
+    for i in range(3):
+        assert recorder.record({"i": i})
+    recorder.stop()
+    assert [row["i"] for row in recorder.rows] == [0, 1, 2]
+
+
+def test_rows_recorded_after_stop_are_written():
+    recorder = RecordingRecorder(max_queue=100, batch_size=50, flush_interval=60)
+    recorder.start()
+    recorder.stop()
+    assert recorder.record({"i": "late"})
+    assert asyncio.run(recorder.record_async({"i": "later"}))
+    assert [row["i"] for row in recorder.rows] == ["late", "later"]
+    assert recorder.stats()["queued"] == 0
+
+
+def test_full_queue_drops_rows():
+    recorder = RecordingRecorder(max_queue=1, batch_size=50, flush_interval=60)
+    assert recorder.record({"i": 0})
+    assert not recorder.record({"i": 1})
+    assert recorder.stats()["dropped"] == 1
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import insert
+from config import USAGE_QUEUE_MAX_SIZE, USAGE_BATCH_SIZE, USAGE_FLUSH_INTERVAL_SECONDS, USAGE_ENQUEUE_TIMEOUT_SECONDS
+from db import SessionLocal
+from models import ApiKeyUsageDB
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+# How often a request waiting for room in a full queue (USAGE_ENQUEUE_TIMEOUT_SECONDS) retries
+ENQUEUE_POLL_SECONDS = 0.005
+
+
+class UsageRecorder:
+    """
+    Write-behind recorder for ApiKeyUsageDB rows.
+    Requests enqueue plain dicts; a background thread flushes them with multi-row INSERTs
+    whenever `batch_size` rows are waiting or `flush_interval` seconds have passed.
+    Once stopped, rows (e.g. from requests still finishing during shutdown) are written directly.
+    """
+
+    def __init__(self, session_factory, max_queue: int, batch_size: int,
+                 flush_interval: float, enqueue_timeout: float = 0.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="usage-recorder", daemon=True)
+                self._thread.start()
+            self._stopped = False
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the worker"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        # Rows queued after the worker's final drain would otherwise never be written
+        self._write(self._drain())
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        # Requests and the writer thread both update the counters
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record(self, row: dict) -> bool:
+        """Queue a usage row without blocking; returns False (and counts a drop) when the queue is full"""
+        if self._stopped:
+            self._write([row])
+            return True
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    async def record_async(self, row: dict) -> bool:
+        """
+        record() for the event loop: with enqueue_timeout > 0 a full queue makes this
+        request wait up to that long for room (polling, never blocking the loop) before
+        the row is dropped.
+        """
+        if self._stopped:
+            await asyncio.to_thread(self._write, [row])
+            return True
+        deadline = time.monotonic() + self.enqueue_timeout
+        while True:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._count("dropped")
+                    return False
+                await asyncio.sleep(min(ENQUEUE_POLL_SECONDS, remaining))
+                continue
+            self._count("enqueued")
+            return True
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counters = {
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "batches": self.batches,
+                "failed": self.failed,
+            }
+        return {"queued": self._queue.qsize(), "max_queue": self._queue.maxsize, **counters}
+
+    def _run(self) -> None:
+        batch: List[dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                # Drain whatever arrived before shutdown, then exit
+                self._write(batch + self._drain())
+                return
+
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _drain(self) -> List[dict]:
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            if item is not _STOP:
+                rows.append(item)
+
+    def _write(self, batch: List[dict]) -> None:
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            db = self.session_factory()
+            try:
+                # A list of parameter dicts is sent as a single multi-row INSERT
+                db.execute(insert(ApiKeyUsageDB), chunk)
+                db.commit()
+                self._count("written", len(chunk))
+                self._count("batches")
+            except Exception:
+                db.rollback()
+                self._count("failed", len(chunk))
+                logger.exception("Failed to write %d api_key_usage rows", len(chunk))
+            finally:
+                db.close()
+
+
+class UsageLoggingMiddleware:
+    """
+    ASGI middleware that records API key usage after the response has been sent,
+    so the row carries the real response_code and no commit happens before the handler.
+    verify_api_key leaves the pending row in request.state.api_usage.
+    """
+
+    def __init__(self, app, recorder: UsageRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Share one state dict with the endpoint so dependencies can hand us the pending row
+        state = scope.setdefault("state", {})
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            usage = state.get("api_usage")
+            if usage is not None:
+                usage["response_code"] = status_code
+                await self.recorder.record_async(usage)
+
+
+usage_recorder = UsageRecorder(
+    SessionLocal,
+    max_queue=USAGE_QUEUE_MAX_SIZE,
+    batch_size=USAGE_BATCH_SIZE,
+    flush_interval=USAGE_FLUSH_INTERVAL_SECONDS,
+    enqueue_timeout=USAGE_ENQUEUE_TIMEOUT_SECONDS,
+)
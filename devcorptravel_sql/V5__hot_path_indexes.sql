@@ -0,0 +1,5 @@
+-- Flyway V5, after the bundle's V1-V4 (liquibase: add as a 5th sqlFile changeSet).
+-- ux_users_org_email leads with org_id, so lookups by email alone (login, registration,
+-- booking's traveler_email) scanned users; trips is listed by traveler in (created_at, id) order.
+CREATE INDEX ix_users_email_id ON users (email, id);
+CREATE INDEX ix_trips_traveler_created_at_id ON trips (traveler_id, created_at, id);
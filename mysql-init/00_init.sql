@@ -6,7 +6,7 @@ INSERT IGNORE INTO lookup_status (status_key) VALUES
 CREATE TABLE IF NOT EXISTS lookup_mode (mode_key VARCHAR(20) PRIMARY KEY) ENGINE=InnoDB;
 INSERT IGNORE INTO lookup_mode (mode_key) VALUES ('flights'),('hotels'),('cars');
 CREATE TABLE IF NOT EXISTS organizations (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, external_id VARCHAR(64) UNIQUE, name VARCHAR(200), domain VARCHAR(200), status VARCHAR(40) DEFAULT 'active') ENGINE=InnoDB;
-CREATE TABLE IF NOT EXISTS users (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NOT NULL, email VARCHAR(254) NOT NULL, display_name VARCHAR(200), auth_provider VARCHAR(40), password_hash VARCHAR(255), INDEX(org_id)) ENGINE=InnoDB;
+CREATE TABLE IF NOT EXISTS users (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NOT NULL, email VARCHAR(254) NOT NULL, display_name VARCHAR(200), auth_provider VARCHAR(40), password_hash VARCHAR(255), INDEX(org_id), KEY ix_users_email_id (email, id)) ENGINE=InnoDB;
 CREATE TABLE IF NOT EXISTS roles (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NULL, name VARCHAR(100) NOT NULL, UNIQUE KEY (org_id, name)) ENGINE=InnoDB;
 CREATE TABLE IF NOT EXISTS user_roles (user_id BIGINT UNSIGNED NOT NULL, role_id BIGINT UNSIGNED NOT NULL, PRIMARY KEY(user_id, role_id)) ENGINE=InnoDB;
 CREATE TABLE IF NOT EXISTS permissions (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, code VARCHAR(120) UNIQUE) ENGINE=InnoDB;
@@ -16,8 +16,8 @@ CREATE TABLE IF NOT EXISTS policies (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREME
 CREATE TABLE IF NOT EXISTS policy_versions (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, policy_id BIGINT UNSIGNED NOT NULL, version_num INT NOT NULL, status VARCHAR(40) DEFAULT 'draft') ENGINE=InnoDB;
 CREATE TABLE IF NOT EXISTS policy_rules (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, policy_version_id BIGINT UNSIGNED NOT NULL, rule_key VARCHAR(120), rule_op VARCHAR(8), rule_value VARCHAR(255)) ENGINE=InnoDB;
 CREATE TABLE IF NOT EXISTS bookings (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NOT NULL, traveler_id BIGINT UNSIGNED NOT NULL, arranger_user_id BIGINT UNSIGNED NULL, status VARCHAR(40), total_amount DECIMAL(12,2) DEFAULT 0, total_currency CHAR(3) DEFAULT 'USD', confirmation_code VARCHAR(64), created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP) ENGINE=InnoDB;
-CREATE TABLE IF NOT EXISTS booking_items (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, booking_id BIGINT UNSIGNED NOT NULL, mode VARCHAR(20), supplier_ref VARCHAR(200), is_in_policy TINYINT(1) DEFAULT 1, price_amount DECIMAL(12,2), price_currency CHAR(3) DEFAULT 'USD', item_json JSON) ENGINE=InnoDB;
-CREATE TABLE IF NOT EXISTS trips (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NOT NULL, traveler_id BIGINT UNSIGNED NOT NULL, booking_id BIGINT UNSIGNED NOT NULL, start_date DATE, end_date DATE, status VARCHAR(40)) ENGINE=InnoDB;
+CREATE TABLE IF NOT EXISTS booking_items (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, booking_id VARCHAR(50) NOT NULL, mode VARCHAR(20), supplier_ref VARCHAR(200), is_in_policy TINYINT(1) DEFAULT 1, price_amount DECIMAL(12,2), price_currency CHAR(3) DEFAULT 'USD', item_json JSON, KEY ix_booking_items_booking_id (booking_id), KEY ix_booking_items_mode_in_policy (mode, is_in_policy)) ENGINE=InnoDB;
+CREATE TABLE IF NOT EXISTS trips (id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT, org_id BIGINT UNSIGNED NOT NULL, traveler_id BIGINT UNSIGNED NOT NULL, booking_id BIGINT UNSIGNED NOT NULL, start_date DATE, end_date DATE, status VARCHAR(40), KEY ix_trips_traveler_id (traveler_id)) ENGINE=InnoDB;
 INSERT IGNORE INTO permissions (code) VALUES ('policy.read'),('policy.write'),('policy.publish'),('user.manage'),('arranger.manage'),('traveler.read'),('traveler.write'),('profile.read'),('profile.write'),('search.execute'),('booking.create'),('booking.cancel'),('trip.read'),('trip.write'),('report.read'),('report.export'),('notifications.send'),('webhook.manage'),('audit.read');
 INSERT IGNORE INTO roles (org_id, name) VALUES (NULL,'OrgAdmin'),(NULL,'TravelManager'),(NULL,'Arranger'),(NULL,'Traveler');
 INSERT IGNORE INTO organizations (external_id, name, domain, status) VALUES ('acme-001','Acme Corporation','acme.com','active');
@@ -8,9 +8,9 @@ const USER = __ENV.USER || 'admin@acme.com';
 const PASS = __ENV.PASS || 'secret';
 
 function token() {
-  const res = http.post(`${BASE}/auth/token`, {
-    username: USER, password: PASS
-  }, { headers: { 'X-Org-External-Id': ORG }});
+  const res = http.post(`${BASE}/auth/login`, JSON.stringify({
+    email: USER, password: PASS
+  }), { headers: { 'X-Org-External-Id': ORG, 'Content-Type': 'application/json' }});
   check(res, { 'token 200': r => r.status === 200 });
   return res.json().access_token;
 }
@@ -29,7 +29,7 @@ export const options = {
 };
 
 export function authScenario() {
-  const res = http.post(`${BASE}/auth/token`, { username: USER, password: PASS }, { headers: { 'X-Org-External-Id': ORG }});
+  const res = http.post(`${BASE}/auth/login`, JSON.stringify({ email: USER, password: PASS }), { headers: { 'X-Org-External-Id': ORG, 'Content-Type': 'application/json' }});
   check(res, { 'auth 200': r => r.status === 200 });
   sleep(1);
 }
@@ -37,7 +37,7 @@ export function authScenario() {
 export function searchScenario() {
   const tok = token();
   const h = { 'Authorization': `Bearer ${tok}`, 'X-Org-External-Id': ORG };
-  const res = http.get(`${BASE}/search/flights?origin=ORD&dest=JFK&date=2025-11-25`, { headers: h });
+  const res = http.get(`${BASE}/search/flights?origin=ORD&destination=JFK&departDate=2025-11-25`, { headers: h });
   check(res, { 'search 200': r => r.status === 200 });
   sleep(0.5);
 }
@@ -49,7 +49,7 @@ export function bookingScenario() {
     traveler_email: USER,
     items: [{ id: 'flights-1', mode: 'flights', price: 350, currency: 'USD' }]
   });
-  const res = http.post(`${BASE}/booking`, payload, { headers: h });
+  const res = http.post(`${BASE}/bookings`, payload, { headers: h });
   check(res, { 'booking 200': r => r.status === 200 });
   // follow-up validation: trips query
   const res2 = http.get(`${BASE}/trips`, { headers: { 'Authorization': `Bearer ${tok}`, 'X-Org-External-Id': ORG } });